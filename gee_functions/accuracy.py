@@ -0,0 +1,196 @@
+"""
+Functions for the accuracy assessment of classification results using error (confusion) matrices. Error matrices can be
+calculated on the EE for raster pairs or locally for downloaded rasters.
+
+The error matrices are organised with the classified (map) classes as rows and the reference classes as columns.
+"""
+
+import ee
+import numpy as np
+
+from typing import Dict, Iterable, List, Tuple
+
+
+def calc_error_matrix(
+        classified: ee.Image,
+        reference: ee.Image,
+        region: ee.FeatureCollection,
+        class_values: List[int],
+        scale: int = 30,
+        tile_scale: int = 2,
+        max_pixels: int = 1e13,
+        crs: str = 'EPSG:32630') -> np.ndarray:
+    """
+    Calculates an error matrix directly from a classified and a reference raster using a grouped frequency histogram,
+    without the need to vectorize or sample the reference map.
+
+    :param classified: EE Image with the classification result in the first band
+    :param reference: EE Image with the reference classes in the first band
+    :param region: EE Geometry acting as extent for the calculation
+    :param class_values: pixel values of the classes, in the order used for the rows and columns of the matrix
+    :param scale: a nominal scale in meters of the projection to work in
+    :param tile_scale: a scaling factor used to reduce aggregation tile size; using a larger tileScale (e.g. 2 or 4)
+    may enable computations that run out of memory with the default
+    :param max_pixels: the maximum number of pixels to reduce.
+    :param crs: projection to work in
+    :return: error matrix (int64) with the classified classes as rows and the reference classes as columns
+    """
+    pairs = classified.select([0]).toInt().rename('classified').addBands(
+        reference.select([0]).toInt().rename('reference'))
+
+    groups = pairs.reduceRegion(
+        reducer=ee.Reducer.frequencyHistogram().group(groupField=1, groupName='reference'),
+        geometry=region,
+        scale=scale,
+        tileScale=tile_scale,
+        maxPixels=max_pixels,
+        crs=crs,
+    ).get('groups').getInfo()
+
+    class_index = {int(value): ind for ind, value in enumerate(class_values)}
+    # the counts of pixels partially inside the region are weighted, they are summed before rounding
+    error_matrix = np.zeros((len(class_values), len(class_values)), dtype=np.float64)
+
+    for group in groups:
+        col = class_index.get(int(group['reference']))
+        if col is None:
+            continue
+        for classified_value, count in group['histogram'].items():
+            row = class_index.get(int(float(classified_value)))
+            if row is not None:
+                error_matrix[row, col] += count
+
+    return np.rint(error_matrix).astype(np.int64)
+
+
+def calc_error_matrix_from_chunks(
+        chunks: Iterable[Tuple[np.ndarray, np.ndarray]],
+        class_values: List[int]) -> np.ndarray:
+    """
+    Calculates an error matrix from pairs of classified and reference arrays, accumulating the counts of each pair with
+    a single np.bincount. Only one pair has to be held in memory at a time. Pixels with values that are not part of the
+    class values (e.g. nodata) are ignored.
+
+    :param chunks: iterable with tuples of equally shaped arrays containing the classified and reference values
+    :param class_values: pixel values of the classes, in the order used for the rows and columns of the matrix
+    :return: error matrix (int64) with the classified classes as rows and the reference classes as columns
+    """
+    class_values = np.asarray(class_values)
+    n_classes = len(class_values)
+    order = np.argsort(class_values)
+    sorted_values = class_values[order]
+
+    def to_index(values):
+        # index of every pixel value in the class values, -1 for values that are not a class
+        pos = np.searchsorted(sorted_values, values).clip(0, n_classes - 1)
+        return np.where(sorted_values[pos] == values, order[pos], -1)
+
+    counts = np.zeros(n_classes * n_classes, dtype=np.int64)
+
+    for classified, reference in chunks:
+        row = to_index(np.ravel(classified))
+        col = to_index(np.ravel(reference))
+        valid = (row >= 0) & (col >= 0)
+        counts += np.bincount(row[valid] * n_classes + col[valid], minlength=n_classes * n_classes)
+
+    return counts.reshape(n_classes, n_classes)
+
+
+def calc_error_matrix_from_arrays(
+        classified: np.ndarray,
+        reference: np.ndarray,
+        class_values: List[int],
+        chunk_rows: int = 1024) -> np.ndarray:
+    """
+    Calculates an error matrix for two (memory mapped) rasters, processing them in windows of rows.
+
+    :param classified: 2-D array with the classification result, e.g. loaded with np.load(..., mmap_mode='r')
+    :param reference: 2-D array with the reference classes on the same grid as the classified array
+    :param class_values: pixel values of the classes, in the order used for the rows and columns of the matrix
+    :param chunk_rows: number of rows to process at once
+    :return: error matrix with the classified classes as rows and the reference classes as columns
+    """
+    if classified.shape != reference.shape:
+        raise ValueError('the classified and reference rasters need to have the same shape')
+
+    chunks = (
+        (classified[start:start + chunk_rows], reference[start:start + chunk_rows])
+        for start in range(0, classified.shape[0], chunk_rows)
+    )
+
+    return calc_error_matrix_from_chunks(chunks, class_values)
+
+
+def iter_raster_windows(
+        classified_path: str,
+        reference_path: str,
+        band: int = 1) -> Iterable[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Reads two downloaded rasters, e.g. GeoTIFFs exported from the EE, window by window. Both rasters need to share the
+    same grid. Requires rasterio.
+
+    :param classified_path: path to the raster with the classification result
+    :param reference_path: path to the raster with the reference classes
+    :param band: band to read from both rasters
+    :return: generator of tuples with the classified and reference values of each window
+    """
+    import rasterio
+
+    with rasterio.open(classified_path) as classified, rasterio.open(reference_path) as reference:
+        if classified.shape != reference.shape or classified.transform != reference.transform:
+            raise ValueError('the classified and reference rasters need to share the same grid')
+
+        for _, window in classified.block_windows(band):
+            yield classified.read(band, window=window), reference.read(band, window=window)
+
+
+def calc_accuracy_metrics(error_matrix: np.ndarray, class_areas: List[float] = None) -> Dict[str, np.ndarray]:
+    """
+    Calculates the accuracy metrics for an error matrix. If the mapped area of each class is provided, area-adjusted
+    estimates following Olofsson et al. (2014), 'Good practices for estimating area and assessing accuracy of land
+    change', are added to the results.
+
+    :param error_matrix: error matrix with the classified classes as rows and the reference classes as columns
+    :param class_areas: optional, mapped area of each class in the order of the error matrix
+    :return: dictionary with the overall accuracy, kappa, user's and producer's accuracy and, if class areas are
+    provided, the area-adjusted accuracies and area estimates with their standard errors
+    """
+    error_matrix = np.asarray(error_matrix, dtype=np.float64)
+    total = error_matrix.sum()
+    diagonal = np.diag(error_matrix)
+    row_totals = error_matrix.sum(axis=1)
+    col_totals = error_matrix.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        overall_accuracy = diagonal.sum() / total
+        expected_accuracy = (row_totals * col_totals).sum() / total ** 2
+        metrics = {
+            'overall_accuracy': overall_accuracy,
+            'kappa': (overall_accuracy - expected_accuracy) / (1 - expected_accuracy),
+            'users_accuracy': diagonal / row_totals,
+            'producers_accuracy': diagonal / col_totals,
+        }
+
+        if class_areas is not None:
+            class_areas = np.asarray(class_areas, dtype=np.float64)
+            total_area = class_areas.sum()
+            weights = class_areas / total_area
+
+            # estimated proportion of area for each cell of the matrix
+            row_fractions = error_matrix / row_totals[:, None]
+            proportions = weights[:, None] * row_fractions
+            estimated_proportions = proportions.sum(axis=0)
+
+            standard_errors = np.sqrt(
+                (weights[:, None] ** 2 * row_fractions * (1 - row_fractions) / (row_totals[:, None] - 1)).sum(axis=0)
+            )
+
+            metrics['area_adjusted'] = {
+                'overall_accuracy': np.diag(proportions).sum(),
+                'users_accuracy': np.diag(row_fractions),
+                'producers_accuracy': np.diag(proportions) / estimated_proportions,
+                'area': estimated_proportions * total_area,
+                'area_standard_error': standard_errors * total_area,
+            }
+
+    return metrics
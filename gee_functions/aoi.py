@@ -0,0 +1,198 @@
+"""
+Area of interest (AOI) handling. The different forms of the AOI used throughout the pipeline are computed once and
+stored locally, so the geometry of the AOI does not have to be requested from the EE again for every task.
+"""
+
+import ee
+import json
+
+from pathlib import Path
+from typing import Dict, Union, List
+
+try:
+    from constants import PROJECT_PATH, DATA_DIR, AOI_CLIP_METHOD
+    from export import export_to_asset
+except ImportError:
+    from .constants import PROJECT_PATH, DATA_DIR, AOI_CLIP_METHOD
+    from .export import export_to_asset
+
+
+class AreaOfInterest:
+    """
+    Holds the different forms of an area of interest:
+
+    - geometry: the exact geometry of the AOI
+    - bounds_coordinates: the client-side coordinates of the bounding box, used as export region
+    - simplified: a simplified outline that fully covers the AOI, used for filtering and export regions
+    - mask: a raster mask of the AOI stored as an asset, used for masking instead of clipping
+
+    The geometries are computed the first time they are used and are stored in a JSON file in the cache directory, which
+    is reused by all following runs with the same AOI name.
+    """
+
+    def __init__(
+            self,
+            feature_collection: Union[str, ee.FeatureCollection],
+            name: str = None,
+            cache_dir: Union[str, Path] = None,
+            max_error: int = 30,
+            crs: str = 'EPSG:32630',
+            scale: int = 30,
+            clip_method: str = AOI_CLIP_METHOD):
+        """
+        :param feature_collection: EE FeatureCollection, or its asset ID, containing the polygon(s) of the AOI
+        :param name: name of the AOI, used for the cache file and the mask asset. If None nothing is stored locally
+        :param cache_dir: directory in which the geometries are stored, defaults to DATA_DIR/aoi
+        :param max_error: maximum error in meters allowed for the simplified outline
+        :param crs: projection of the grid of the raster mask
+        :param scale: pixel size in meters of the raster mask
+        :param clip_method: 'polygon' to clip images with the AOI polygon or 'mask' to mask images using the raster mask
+        asset, defaults to AOI_CLIP_METHOD. AOIs without a name have no mask asset, these are always clipped with the
+        polygon
+        """
+        if clip_method not in ['polygon', 'mask']:
+            raise ValueError(f'Unknown clip method: {clip_method}, please use polygon or mask')
+
+        if isinstance(feature_collection, str):
+            feature_collection = ee.FeatureCollection(feature_collection)
+
+        self.feature_collection = feature_collection
+        self.name = name
+        self.max_error = max_error
+        self.crs = crs
+        self.scale = scale
+        # the mask asset is named after the AOI, without a name there is no mask to use
+        self.clip_method = 'polygon' if name is None else clip_method
+
+        if name is None:
+            self.cache_file = None
+        else:
+            cache_dir = DATA_DIR.joinpath('aoi') if cache_dir is None else Path(cache_dir)
+            self.cache_file = cache_dir.joinpath(f'aoi_{name}.json')
+
+        if self.cache_file is not None and self.cache_file.exists():
+            with open(self.cache_file) as f:
+                self._cache = json.load(f)
+        else:
+            self._cache = {}
+
+    def _get_cached(self, key: str, compute):
+        """
+        Returns the cached value for the key, computing it if it is not available yet. The values are kept in memory for
+        the lifetime of the instance and, if the AOI has a name, stored in the cache file.
+        """
+        if key not in self._cache:
+            self._cache[key] = compute()
+
+            if self.cache_file is not None:
+                self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.cache_file, 'w') as f:
+                    json.dump(self._cache, f)
+
+        return self._cache[key]
+
+    @property
+    def geojson(self) -> dict:
+        """Client-side GeoJSON of the exact geometry of the AOI"""
+        return self._get_cached('geometry', lambda: self.feature_collection.geometry().getInfo())
+
+    @property
+    def geometry(self) -> ee.Geometry:
+        """Exact geometry of the AOI"""
+        return ee.Geometry(self.geojson)
+
+    @property
+    def bounds_coordinates(self) -> List[List[List[float]]]:
+        """Client-side coordinates of the bounding box of the AOI"""
+        return self._get_cached(
+            'bounds_coordinates',
+            lambda: self.feature_collection.geometry().bounds().getInfo()['coordinates']
+        )
+
+    @property
+    def bounds(self) -> ee.Geometry:
+        """Bounding box of the AOI"""
+        return ee.Geometry.Polygon(self.bounds_coordinates, None, False)
+
+    @property
+    def simplified(self) -> ee.Geometry:
+        """Simplified outline of the AOI, buffered so it fully covers the exact geometry"""
+        return ee.Geometry(self._get_cached(
+            'simplified',
+            lambda: self.feature_collection.geometry().buffer(2 * self.max_error, self.max_error).simplify(
+                self.max_error).getInfo()
+        ))
+
+    @property
+    def mask_asset_id(self) -> str:
+        """ID of the asset containing the raster mask of the AOI"""
+        if self.name is None:
+            raise ValueError('the AOI needs a name to use a mask asset')
+        return f'{PROJECT_PATH}/raster/aoi/mask_{self.name}'
+
+    @property
+    def mask(self) -> ee.Image:
+        """Raster mask of the AOI, pixels within the AOI have the value 1 and pixels outside of the AOI are masked"""
+        return ee.Image(self.mask_asset_id).selfMask()
+
+    def clip(self, image: ee.Image) -> ee.Image:
+        """
+        Removes the pixels outside of the AOI from an image, either by clipping with the AOI polygon or by masking with
+        the raster mask asset, depending on the clip method.
+
+        :param image: EE Image to clip
+        :return: EE Image without the pixels outside of the AOI
+        """
+        if self.clip_method == 'mask':
+            return image.updateMask(self.mask)
+        return image.clip(self.feature_collection)
+
+    def create_mask(self, overwrite: bool = False) -> Union[ee.batch.Task, bool]:
+        """
+        Paints the AOI on an image and exports it as an asset, to be used as mask.
+
+        :param overwrite: Boolean, if True it overwrites the existing mask asset
+        :return: EE export task, or True if the mask asset already exists
+        """
+        if self.name is None:
+            raise ValueError('the AOI needs a name to create a mask asset')
+
+        mask = ee.Image(0).byte().paint(self.feature_collection, 1).rename('aoi')
+
+        try:
+            task = export_to_asset(
+                asset=mask,
+                asset_type='image',
+                asset_id=f'aoi/mask_{self.name}',
+                region=self.bounds_coordinates,
+                crs=self.crs,
+                scale=self.scale,
+                overwrite=overwrite
+            )
+        except FileExistsError as e:  # if the asset already exists the user is notified and no error is generated
+            print(e)
+            return True
+        else:
+            return task
+
+
+_AREAS_OF_INTEREST: Dict[ee.FeatureCollection, AreaOfInterest] = {}
+
+
+def to_area_of_interest(aoi: Union[AreaOfInterest, ee.FeatureCollection]) -> AreaOfInterest:
+    """
+    Wraps an EE FeatureCollection in an AreaOfInterest, so the pipeline functions accept both. The wrapper has no name,
+    so it clips with the polygon and its geometries are not stored locally. It is kept in memory instead, so the
+    geometries of the same FeatureCollection are only requested once per session.
+
+    :param aoi: AreaOfInterest or EE FeatureCollection of the area of interest
+    :return: AreaOfInterest
+    """
+    if isinstance(aoi, AreaOfInterest):
+        return aoi
+
+    # EE objects describing the same computation are equal and have the same hash
+    if aoi not in _AREAS_OF_INTEREST:
+        _AREAS_OF_INTEREST[aoi] = AreaOfInterest(aoi)
+
+    return _AREAS_OF_INTEREST[aoi]
@@ -8,14 +8,18 @@ try:
     import landsat
     import sentinel
     import indices
+    from aoi import AreaOfInterest, to_area_of_interest
     from export import export_to_asset
     from hydrology import add_mti
+    from constants import LANDSAT_7_GAP_FILL
 except ImportError:
     from . import landsat
     from . import sentinel
     from . import indices
+    from .aoi import AreaOfInterest, to_area_of_interest
     from .export import export_to_asset
     from .hydrology import add_mti
+    from .constants import LANDSAT_7_GAP_FILL
 
 from typing import Union
 
@@ -33,7 +37,7 @@ def get_count(obj):
 
 def create_feature_data(
         date_range: tuple,
-        aoi: ee.FeatureCollection,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
         creation_method: str='all_scenes_reduced',
         aoi_name: str = 'undefined',
         sensor: str = 'landsat',
@@ -44,14 +48,14 @@ def create_feature_data(
     winter).
 
     :param date_range: tuple containing the begin and end date for the selection of imagery. Date format: YYYY-MM-DD.
-    :param aoi: EE FeatureCollection of the vector representing the area of interest
+    :param aoi: AreaOfInterest or EE FeatureCollection of the vector representing the area of interest
     :param aoi_name: name of the aoi, this is used for the naming of the results
     :param sensor: string indicating which satellite to use, landsat or sentinel
     :param custom_name: Optional, provide a name for the asset. If no custom name is given the year of the start date
     will be used
     :param overwrite: Optional, provide a name for the asset. If no custom name is given the year of the start date
     will be used
-    :return: dictionary containing two GEE export tasks
+    :return: dictionary containing two GEE export tasks, or None if the AOI is None or has no coordinates
     """
 
     # Extract the date range for the period from the tuple
@@ -60,26 +64,22 @@ def create_feature_data(
 
     year_string = end[0:4]  # string with the year for the naming of the assets
 
-    aoi_info = aoi.geometry().getInfo()
-
-    if 'coordinates' in aoi_info.keys():
-        aoi_coordinates = aoi_info['coordinates']  # aoi coordinates
+    if aoi is None:
+        return None
 
-        if len(aoi_coordinates) > 1:
-            aoi_coordinates = ee.Geometry.MultiPolygon(aoi_coordinates)
-        else:
-            aoi_coordinates = ee.Geometry.Polygon(aoi_coordinates)
+    aoi = to_area_of_interest(aoi)
 
-    else:
+    # without coordinates, e.g. for an empty geometry, there is no area to create the feature data for
+    if 'coordinates' not in aoi.geojson:
         return None
 
     if sensor == 'landsat':
         scale = 30
         # Retrieve landsat 5 and 7 imagery for the period and merge them together
-        ls_5 = landsat.get_ls_image_collection('5', begin, end, aoi)
-        ls_7 = landsat.get_ls_image_collection('7', begin, end, aoi)
-        ls_8 = landsat.get_ls_image_collection('8', begin, end, aoi)
-        ls_9 = landsat.get_ls_image_collection('9', begin, end, aoi)
+        ls_5 = landsat.get_ls_image_collection('5', begin, end, aoi.simplified)
+        ls_7 = landsat.get_ls_image_collection('7', begin, end, aoi.simplified, LANDSAT_7_GAP_FILL)
+        ls_8 = landsat.get_ls_image_collection('8', begin, end, aoi.simplified)
+        ls_9 = landsat.get_ls_image_collection('9', begin, end, aoi.simplified)
 
         col = ls_5.merge(ls_7).merge(ls_8).merge(ls_9).map(
             landsat.remove_edges)  # merge all the landsat scenes into single col.
@@ -96,7 +96,7 @@ def create_feature_data(
 
     elif sensor == 'sentinel':
         scale = 10
-        col = sentinel.get_s2_image_collection(begin, end, aoi)
+        col = sentinel.get_s2_image_collection(begin, end, aoi.simplified)
 
         # col = sentinel.create_monthly_index_images(
         #     image_collection=col,
@@ -177,7 +177,7 @@ def create_feature_data(
             asset=feature_data,
             asset_type='image',
             asset_id=asset_id,
-            region=aoi_coordinates,
+            region=aoi.simplified,
             scale=scale,
             overwrite=overwrite
         )
@@ -192,23 +192,25 @@ def create_training_areas(aoi, data_loc, aoi_name, year_string, clf_folder=None,
     """
     Creates a map containing the training areas for classification using thresholding.
 
-    :param aoi: GEE FeatureCollection containing a polygon of the area of interest
+    :param aoi: AreaOfInterest or GEE FeatureCollection containing a polygon of the area of interest
     :param aoi_name: name of the area of interest
     :param year_string: year for which the traninig areas are selected
     :param clf_folder: Optional folder for storing the training areas
     :return: GEE export task
     """
 
+    aoi = to_area_of_interest(aoi)
+
     #  Get the coordinates of the area of interest. Will be used for the exporting of results later
-    aoi_coordinates = aoi.geometry().bounds().getInfo()['coordinates']
+    aoi_coordinates = aoi.bounds_coordinates
 
     if hb:  # Creates a mask from WDPA - Habitats Directive for the masking of irrigated land area patches
         habitats = ee.FeatureCollection('WCMC/WDPA/current/polygons') \
-            .filterBounds(aoi) \
+            .filterBounds(aoi.simplified) \
             .filter(ee.Filter.eq('DESIG_ENG', 'Site of Community Importance (Habitats Directive)'))
         habitats_mask = ee.Image(1).paint(habitats, 0)
 
-    mask_aoi = ee.Image(0).paint(aoi, 1)  # mask of the area of interest
+    mask_aoi = ee.Image(0).paint(aoi.feature_collection, 1)  # mask of the area of interest
 
     tasks = {}
 
@@ -303,7 +305,7 @@ def create_training_areas(aoi, data_loc, aoi_name, year_string, clf_folder=None,
                 # Removes training patches of irrigated land areas from areas within Habitats Sites
                 # of Community Importance. This is done to remove wetlands from the training patches.
                 habitats = ee.FeatureCollection('WCMC/WDPA/current/polygons') \
-                    .filterBounds(aoi) \
+                    .filterBounds(aoi.simplified) \
                     .filter(ee.Filter.eq('DESIG_ENG', 'Site of Community Importance (Habitats Directive)'))
                 habitats_mask = ee.Image(1).paint(habitats, 0)
 
@@ -455,7 +457,8 @@ def create_training_areas(aoi, data_loc, aoi_name, year_string, clf_folder=None,
             mask_irrigated_crops.eq(1), 5).where(
             mask_irrigated_trees.eq(1), 6).where(
             mask_water.eq(1), 7).where(
-            mask_urban.eq(1), 8).clip(aoi).rename('training')
+            mask_urban.eq(1), 8)
+        training_regions_image = aoi.clip(training_regions_image).rename('training')
 
         if ft:
             # filters the training patches based on the number of connected pixels. Only patches with 25 connected
@@ -487,7 +490,7 @@ def create_training_areas(aoi, data_loc, aoi_name, year_string, clf_folder=None,
 def classify_irrigated_areas(
         input_features: ee.Image,
         training_areas: ee.Image,
-        aoi: ee.FeatureCollection,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
         aoi_name: str,
         season: str,
         year: Union[int, str],
@@ -507,7 +510,7 @@ def classify_irrigated_areas(
 
     :param input_features: EE Image, feature data used for training and classfication
     :param training_areas: EE Image, map with land cover patches to serve as training sites for the classifier
-    :param aoi: EE FeatureCollection, area of interest
+    :param aoi: AreaOfInterest or EE FeatureCollection, area of interest
     :param aoi_name: string, name of the area of interest, used when saving the results
     :param year: string, year of classification, is used when naming the results
     :param it_cl: int, integer representing pixels belonging to irrigated trees
@@ -533,8 +536,10 @@ def classify_irrigated_areas(
     else:  # only a folder is given
         loc = f"results/random_forest/{aoi_name}/{clf_folder}/ia_random_forest_{no_trees}tr_{vps}vps_{int(bag_fraction * 100)}bf_{aoi_name}_{season}_{year}"
 
+    aoi = to_area_of_interest(aoi)
+
     class_property = 'training'  # bandname of the band containing the patches from which the training pixels are sampled
-    aoi_coordinates = aoi.geometry().bounds().getInfo()['coordinates']  # coordinates of the aoi, needed for export
+    aoi_coordinates = aoi.bounds_coordinates  # coordinates of the aoi, needed for export
     scale = input_features.get('scale').getInfo()
 
     # select the land cover patches for all the land cover classes
@@ -542,7 +547,8 @@ def classify_irrigated_areas(
 
     # check the class values present in the training image, in case thresholding did not separate patches for a lc class
     # the RF classifier does not consider  it for training
-    freq_histogram = training_areas_masked.reduceRegion(ee.Reducer.frequencyHistogram(), aoi, 30, maxPixels=1e15)
+    freq_histogram = training_areas_masked.reduceRegion(
+        ee.Reducer.frequencyHistogram(), aoi.geometry, 30, maxPixels=1e15)
     class_values = ee.Dictionary(freq_histogram.get('training')).keys().getInfo()  # gets the unique class labels
     class_values = [int(x) for x in class_values]  # converts the strings to int
 
@@ -554,7 +560,7 @@ def classify_irrigated_areas(
             groupField=0,
             groupName='class',
         ),
-        geometry=aoi,
+        geometry=aoi.geometry,
         scale=30,
         maxPixels=1e14
     ).get('groups'))  # counts the number of pixels in the patches for each land cover class
@@ -578,7 +584,7 @@ def classify_irrigated_areas(
         scale=scale,
         classValues=ee.List(class_values),
         classPoints=class_points.toList(),
-        region=aoi.geometry(),
+        region=aoi.geometry,
         tileScale=tile_scale
     )
 
@@ -595,7 +601,7 @@ def classify_irrigated_areas(
     )
 
     # get the map indicating forest loss from the Hansen Global Forest Change Map.
-    forest_change = ee.Image("UMD/hansen/global_forest_change_2018_v1_6").select('lossyear').clip(aoi)
+    forest_change = aoi.clip(ee.Image("UMD/hansen/global_forest_change_2018_v1_6").select('lossyear'))
 
     if int(year[-2:]) in range(1, 19):  # checks if a forest loss map is available for the year of classification
         forest_change_mask = forest_change.eq(ee.Number(int(year[-2:])))
@@ -677,7 +683,7 @@ def join_seasonal_irrigated_areas(
         irrigated_area_winter: ee.Image,
         aoi_name: str,
         year: Union[int, str],
-        aoi: ee.FeatureCollection,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
         export_method: str = 'drive',
         clf_folder: str = None,
         filename: str = None,
@@ -690,7 +696,7 @@ def join_seasonal_irrigated_areas(
     :param irrigated_area_winter: GEE image, classification result for the winter season
     :param aoi_name: string, name of the area of interest, will be used for the naming of the result
     :param year: string, string of the year being classified
-    :param aoi: EE FeatureCollection, vector of the aoi
+    :param aoi: AreaOfInterest or EE FeatureCollection, vector of the aoi
     :param export_method: string, 'asset' to export results as asset or 'drive' to export the results to drive
     :param clf_folder: string, name of the folder to store the results, defaults to None
     :param filename: string, overwrites the default filename
@@ -707,7 +713,7 @@ def join_seasonal_irrigated_areas(
     else:
         loc = f"results/irrigated_area/{aoi_name}/{clf_folder}/irrigated_areas_{aoi_name}_{year}"
 
-    aoi_coordinates = aoi.geometry().bounds().getInfo()['coordinates']  # coordinates of the aoi, needed for export
+    aoi_coordinates = to_area_of_interest(aoi).bounds_coordinates  # coordinates of the aoi, needed for export
 
     # Get the irrigated areas from the classification results
     summer = ee.Image().constant(1).where(irrigated_area_summer.eq(1), 3).where(irrigated_area_summer.eq(2),
@@ -769,7 +775,7 @@ def join_seasonal_irrigated_areas(
 def min_distance_classification(
         training: ee.Image,
         data: ee.Image,
-        aoi: ee.FeatureCollection,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
         training_points: int = 20000,
         scale: int = 30,
         tilescale: int = 4,
@@ -780,8 +786,8 @@ def min_distance_classification(
 
     :param training: EE Image containing the areas with the target class
     :param data:EE Image contaning the feature data for classification
-    :param aoi: GEE FeatureCollection containing the vector of the area of interest for classification, this will be
-     used to mask any pixels outside of the area of interest
+    :param aoi: AreaOfInterest or GEE FeatureCollection containing the vector of the area of interest for
+     classification, this will be used to mask any pixels outside of the area of interest
     :param training_points: Number of training points to sample
     :param scale: A nominal scale in meters of the projection to sample in. Defaults to the scale of the first band
      of the input image. Defaults to 30
@@ -798,7 +804,7 @@ def min_distance_classification(
         numPoints=training_points,
         classBand=classband,
         scale=scale,
-        region=aoi.geometry(),
+        region=to_area_of_interest(aoi).geometry,
         tileScale=tilescale
     ).filter(ee.Filter.neq(classband, 0))
 
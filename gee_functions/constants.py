@@ -11,6 +11,11 @@ from typing import Dict
 
 import ee
 
+try:
+    from local.lda import migrate_thresholds
+except ImportError:
+    from .local.lda import migrate_thresholds
+
 try:
     ee.Initialize(http_transport=httplib2.Http())
 except AttributeError:
@@ -184,26 +189,47 @@ MAX_TP: int = 10000
 
 DATA_CREATION_METHOD: str = 'all_scenes_reduced'  # 'all_scenes_reduced', 'monthly_composites_reduced'
 
-SUMMER_DEFAULT_THRESHOLDS: Dict[str, float] = {
-    'summer_irrigated_trees_threshold': 1,
-    'summer_irrigated_crops_threshold': 1.3,
-    'summer_forest_threshold': 1.5,
-    'summer_shrub_threshold': .75,
+# 'polygon' clips images with the AOI polygon, 'mask' masks images with the raster mask asset of the AOI, which is
+# considerably cheaper for detailed outlines. The mask asset is created with AreaOfInterest.create_mask
+AOI_CLIP_METHOD: str = 'polygon'  # 'polygon', 'mask'
+
+# fills the SLC-off gaps of the Landsat 7 scenes used for the feature data with the closest scene in time of the same
+# path and row, which increases the number of valid observations for the seasons between 2003 and 2012
+LANDSAT_7_GAP_FILL: bool = False
+
+# thresholds chosen on the histograms of the sklearn based calibrations (data/lda_calibration_<season>.pbz2), together
+# with the orientation of these calibrations. The sklearn scores are centred on the mean of the calibration samples, so
+# the positive thresholds only select the target class on calibrations in which it had the higher scores
+LEGACY_SUMMER_THRESHOLDS: Dict[str, float] = {
+    'summer_irrigated_trees': 1,
+    'summer_irrigated_crops': 1.3,
+    'summer_forest': 1.5,
+    'summer_shrub': .75,
     'summer_rainfed_agriculture': 1,
     'summer_greenhouses': 1,
     'summer_urban_fallow': 1,
     'summer_water_bodies': 2,
 }
 
-WINTER_DEFAULT_THRESHOLDS: Dict[str, float] = {
-    'winter_irrigated_trees_threshold': 0.9,
-    'winter_irrigated_crops_threshold': 1.3,
-    'winter_forest_threshold': 1.7,
-    'winter_shrub_threshold': 0.95,
+LEGACY_SUMMER_GREATER_THAN: Dict[str, bool] = {key: True for key in LEGACY_SUMMER_THRESHOLDS}
+
+LEGACY_WINTER_THRESHOLDS: Dict[str, float] = {
+    'winter_irrigated_trees': 0.9,
+    'winter_irrigated_crops': 1.3,
+    'winter_forest': 1.7,
+    'winter_shrub': 0.95,
     'winter_rainfed_agriculture': 0.9,
     'winter_greenhouses': 1.4,
     'winter_urban_fallow': 1,
-    'winter_water_bodies': 2}
+    'winter_water_bodies': 2,
+}
+
+LEGACY_WINTER_GREATER_THAN: Dict[str, bool] = {key: True for key in LEGACY_WINTER_THRESHOLDS}
+
+# the training areas are the pixels with an LDA score above the threshold, the scores of the closed form calibration
+# are only equal to the sklearn scores up to their sign
+SUMMER_DEFAULT_THRESHOLDS: Dict[str, float] = migrate_thresholds(LEGACY_SUMMER_THRESHOLDS, LEGACY_SUMMER_GREATER_THAN)
+WINTER_DEFAULT_THRESHOLDS: Dict[str, float] = migrate_thresholds(LEGACY_WINTER_THRESHOLDS, LEGACY_WINTER_GREATER_THAN)
 
 CLASSIFICATION_BANDS: Dict[str, bool] = {
     'R_max': False,
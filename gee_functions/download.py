@@ -0,0 +1,210 @@
+"""
+Functions to download EE FeatureCollections directly into local columnar files, without exporting them to the Google
+Drive first
+"""
+
+import ee
+import threading
+import time
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List
+
+
+def create_sample_schema(
+        bandnames: List[str] = None,
+        key_column: str = 'year',
+        properties: Iterable[str] = None) -> pa.Schema:
+    """
+    Creates the schema of the sample tables, with a float32 column for each band of the feature data. If the
+    properties of the samples are given, only the bands among them are declared, so bands that were not sampled do not
+    become columns without values.
+
+    :param bandnames: names of the bands in the samples, defaults to BANDNAMES
+    :param key_column: name of the column identifying the collection a sample was taken from, None to leave it out
+    :param properties: optional, names of the properties of the samples, e.g. of the first downloaded feature
+    :return: pyarrow schema
+    """
+    if bandnames is None:
+        # imported here, loading the constants initializes the EE, which is not needed to download pages
+        try:
+            from constants import BANDNAMES
+        except ImportError:
+            from .constants import BANDNAMES
+
+        bandnames = BANDNAMES
+
+    if properties is not None:
+        properties = set(properties)
+        missing_bands = [band for band in bandnames if band not in properties]
+        bandnames = [band for band in bandnames if band in properties]
+
+        if not bandnames:
+            raise ValueError(f'None of the bands are properties of the samples: {missing_bands}')
+        if missing_bands:
+            print(f'Bands not in the samples, left out of the schema: {missing_bands}')
+
+    fields = [pa.field(band, pa.float32()) for band in bandnames]
+    fields += [pa.field('lc', pa.int32()), pa.field('class', pa.string())]
+
+    if key_column is not None:
+        fields += [pa.field(key_column, pa.int32())]
+
+    return pa.schema(fields)
+
+
+def fetch_page(
+        params: dict,
+        max_retries: int = 3,
+        retry_delay: float = 1.,
+        compute_features: Callable[[dict], dict] = None) -> dict:
+    """
+    Requests a single page of features, retrying failed requests with an exponentially increasing delay
+
+    :param params: parameters of the request, see ee.data.computeFeatures
+    :param max_retries: number of times a failed request is repeated before the error is raised
+    :param retry_delay: delay in seconds before the first retry, doubled for every following retry
+    :param compute_features: function requesting the page, defaults to ee.data.computeFeatures
+    :return: response with the features and, if more pages follow, the token of the next page
+    """
+    if compute_features is None:
+        compute_features = ee.data.computeFeatures
+
+    for attempt in range(max_retries + 1):
+        try:
+            return compute_features(params)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            print(f'Request of page {params.get("pageToken", 0)} failed, retrying: {e}')
+            time.sleep(retry_delay * 2 ** attempt)
+
+
+def iter_feature_pages(
+        collection: ee.FeatureCollection,
+        page_size: int = 1000,
+        max_retries: int = 3,
+        retry_delay: float = 1.,
+        compute_features: Callable[[dict], dict] = None) -> Iterator[List[dict]]:
+    """
+    Computes a FeatureCollection page by page using ee.data.computeFeatures. Failed pages are requested again, see
+    fetch_page, so a download does not restart from the first page after an intermittent error.
+
+    :param collection: EE FeatureCollection to compute
+    :param page_size: maximum number of features per request
+    :param max_retries: number of times a failed request is repeated before the error is raised
+    :param retry_delay: delay in seconds before the first retry, doubled for every following retry
+    :param compute_features: function requesting a page, defaults to ee.data.computeFeatures
+    :return: generator with a list of GeoJSON features for every page
+    """
+    params = {'expression': collection, 'pageSize': page_size}
+
+    while True:
+        response = fetch_page(params, max_retries, retry_delay, compute_features)
+        yield response.get('features', [])
+
+        if 'nextPageToken' not in response:
+            break
+        params['pageToken'] = response['nextPageToken']
+
+
+def features_to_table(features: List[dict], schema: pa.Schema, constants: Dict[str, object] = None) -> pa.Table:
+    """
+    Converts the properties of a list of GeoJSON features into a table. Properties not in the schema are dropped and
+    properties missing from some of the features become null values. A column of the schema that is a property of
+    none of the features raises an error, as it would only contain null values.
+
+    :param features: list of GeoJSON features
+    :param schema: pyarrow schema of the table
+    :param constants: optional, dict with column names and a value used for all rows of the column
+    :return: pyarrow table
+    """
+    constants = {} if constants is None else constants
+    columns = {}
+
+    missing_columns = [field.name for field in schema if field.name not in constants and features and
+                       not any(field.name in feature['properties'] for feature in features)]
+    if missing_columns:
+        raise ValueError(f'Columns of the schema are not properties of the features: {missing_columns}')
+
+    for field in schema:
+        if field.name in constants:
+            columns[field.name] = [constants[field.name]] * len(features)
+        else:
+            columns[field.name] = [feature['properties'].get(field.name) for feature in features]
+
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+def download_features(
+        collections: Dict[str, ee.FeatureCollection],
+        output_file: str,
+        schema: pa.Schema = None,
+        bandnames: List[str] = None,
+        key_column: str = 'year',
+        page_size: int = 1000,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        compute_features: Callable[[dict], dict] = None) -> int:
+    """
+    Downloads one or more EE FeatureCollections into a single Parquet file. The collections are fetched concurrently,
+    each page is written to the file as soon as it arrives, so the full table never has to be held in memory.
+
+    :param collections: dict with the collections to download, the keys are stored in the key column
+    :param output_file: path of the Parquet file to create
+    :param schema: pyarrow schema of the table, defaults to the sample schema of the bands among the properties of the
+     first downloaded feature, see create_sample_schema
+    :param bandnames: names of the bands used for the default schema, defaults to BANDNAMES
+    :param key_column: name of the column in which the keys of the collections are stored, None to leave it out
+    :param page_size: maximum number of features per request
+    :param max_workers: maximum number of collections downloaded at the same time
+    :param max_retries: number of times a failed page request is repeated before the download is aborted
+    :param compute_features: function requesting a page, defaults to ee.data.computeFeatures
+    :return: number of rows written
+    """
+    lock = threading.Lock()
+    writer = None
+
+    def open_writer(features):
+        # the writer is opened for the first page with features, the default schema is created from its properties
+        nonlocal schema, writer
+
+        with lock:
+            if writer is None:
+                if schema is None:
+                    schema = create_sample_schema(bandnames, key_column, features[0]['properties'])
+                writer = pq.ParquetWriter(output_file, schema)
+
+        return writer
+
+    def fetch(key, collection):
+        constants = {} if key_column is None else {key_column: int(key)}
+        rows = 0
+        for features in iter_feature_pages(collection, page_size, max_retries, compute_features=compute_features):
+            if not features:
+                continue
+            page_writer = open_writer(features)
+            table = features_to_table(features, page_writer.schema, constants)
+            with lock:  # the writer is shared by all threads
+                page_writer.write_table(table)
+            rows += table.num_rows
+        return rows
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(fetch, key, collection) for key, collection in collections.items()]
+            no_of_rows = sum(future.result() for future in futures)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        # none of the collections contains features, an empty file is written
+        if schema is None:
+            schema = create_sample_schema(bandnames, key_column)
+        pq.write_table(schema.empty_table(), output_file)
+
+    return no_of_rows
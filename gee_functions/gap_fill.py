@@ -11,6 +11,8 @@ MIN_SCALE = 1/3
 MAX_SCALE = 3
 MIN_NEIGHBORS = 144
 
+SLC_FAILURE_DATE = '2003-05-31'  # date of the failure of the scan line corrector of Landsat 7
+
 
 def gap_fill(src, fill, kernel_size, upscale=False):
     """
@@ -90,4 +92,59 @@ def gap_fill(src, fill, kernel_size, upscale=False):
     scaled = fill.multiply(scale).add(offset)\
         .updateMask(count.gte(MIN_NEIGHBORS))
 
-    return src.unmask(scaled, True)
\ No newline at end of file
+    return src.unmask(scaled, True)
+
+
+def gap_fill_collection(
+        collection: ee.ImageCollection,
+        fill_collection: ee.ImageCollection = None,
+        kernel_size: int = 10,
+        max_days: int = 64,
+        upscale: bool = False) -> ee.ImageCollection:
+    """
+    Fills the SLC-off gaps of all Landsat 7 scenes in a collection. Every scene acquired after the failure of the scan
+    line corrector is paired server-side with the closest fill scene in time of the same path and row, using
+    ee.Join.saveBest, after which all pairs are gap filled in a single map. Scenes without a fill scene and scenes
+    acquired before the failure are returned unchanged.
+
+    The other SLC-off scenes are not used for the filling, their gaps are at nearly the same positions. The scenes are
+    filled with the scenes of the collection acquired before the failure and the scenes of the fill collection.
+
+    :param collection: EE ImageCollection of Landsat 7 scenes, with the WRS_PATH and WRS_ROW properties
+    :param fill_collection: optional, EE ImageCollection with additional scenes to use for the filling, e.g. Landsat 5
+    and 8 scenes, with the same band names and the WRS_PATH and WRS_ROW properties. It should not contain SLC-off
+    Landsat 7 scenes
+    :param kernel_size: size of the kernel used by gap_fill
+    :param max_days: maximum number of days between a scene and its fill scene
+    :param upscale: indicates whether to upscale the computation to coarser resolution for faster computation time
+    :return: EE ImageCollection with the gap filled scenes
+    """
+    slc_off = ee.Filter.gte('system:time_start', ee.Date(SLC_FAILURE_DATE).millis())
+
+    slc_on_collection = collection.filter(slc_off.Not())
+    fill_collection = slc_on_collection if fill_collection is None else fill_collection.merge(slc_on_collection)
+
+    pairing = ee.Filter.And(
+        ee.Filter.equals(leftField='WRS_PATH', rightField='WRS_PATH'),
+        ee.Filter.equals(leftField='WRS_ROW', rightField='WRS_ROW'),
+        ee.Filter.maxDifference(
+            difference=max_days * 24 * 60 * 60 * 1000,
+            leftField='system:time_start',
+            rightField='system:time_start'
+        ),
+    )
+
+    # the best match is the fill scene with the smallest difference in acquisition time
+    paired = ee.Join.saveBest(matchKey='fill_image', measureKey='time_difference').apply(
+        collection.filter(slc_off), fill_collection, pairing)
+    unpaired = ee.Join.inverted().apply(collection.filter(slc_off), fill_collection, pairing)
+
+    def fill_scene(image):
+        image = ee.Image(image)
+        filled = gap_fill(image, ee.Image(image.get('fill_image')), kernel_size, upscale)
+        return ee.Image(filled.copyProperties(image, exclude=['fill_image'])).set(
+            'system:time_start', image.get('system:time_start'))
+
+    return ee.ImageCollection(paired).map(fill_scene) \
+        .merge(ee.ImageCollection(unpaired)) \
+        .merge(slc_on_collection)
@@ -9,6 +9,11 @@ from dateutil.relativedelta import relativedelta
 
 from typing import Union
 
+try:
+    from gap_fill import gap_fill_collection
+except ImportError:
+    from .gap_fill import gap_fill_collection
+
 
 def preprocess_landsat(image: ee.Image) -> ee.Image:
     """
@@ -42,7 +47,8 @@ def get_ls_image_collection(
         col: Union[int, str],
         begin_date: str,
         end_date: str,
-        aoi: ee.FeatureCollection = None) -> ee.ImageCollection:
+        aoi: ee.FeatureCollection = None,
+        fill_slc_gaps: bool = False) -> ee.ImageCollection:
     """
     Calls the GEE API to collect scenes from the Landsat 4 Tier 1 Surface Reflectance Libraries
 
@@ -50,6 +56,8 @@ def get_ls_image_collection(
     :param begin_date: Begin date for time period for scene selection
     :param end_date: End date for time period for scene selection
     :param aoi: Optional, only select scenes that cover this aoi
+    :param fill_slc_gaps: Optional, if True the SLC-off gaps of Landsat 7 scenes are filled with the closest Landsat 5,
+    Landsat 8 or pre-failure Landsat 7 scene in time of the same path and row, see gap_fill.gap_fill_collection
     :return: cloud masked GEE image collection
     """
 
@@ -79,30 +87,39 @@ def get_ls_image_collection(
     col_string = collection_parameters[col]['name']
     col_bands = collection_parameters[col]['bands']
 
+    def prepare(image):
+        prepared = preprocess_landsat(image).select(col_bands, ['B', 'G', 'R', 'NIR', 'SWIR', 'SWIR2', 'THERMAL'])
+        # the path and row are copied explicitly, the gap filling pairs the scenes on them
+        return ee.Image(prepared.copyProperties(image, ['WRS_PATH', 'WRS_ROW'])).set(
+            'system:time_start', image.get('system:time_start'))
+
     if aoi is None:
-        return ee.ImageCollection(col_string).filterDate(
+        collection = ee.ImageCollection(col_string).filterDate(
             begin_date,
             end_date
         ).map(
-            preprocess_landsat
-        ).select(
-            col_bands,
-            ['B', 'G', 'R', 'NIR', 'SWIR', 'SWIR2', 'THERMAL'],
+            prepare
         )
 
     else:
-        return ee.ImageCollection(col_string).filterBounds(
+        collection = ee.ImageCollection(col_string).filterBounds(
             aoi
         ).filterDate(
             begin_date,
             end_date
         ).map(
-            preprocess_landsat
-        ).select(
-            col_bands,
-            ['B', 'G', 'R', 'NIR', 'SWIR', 'SWIR2', 'THERMAL'],
+            prepare
         )
 
+    if fill_slc_gaps and str(col) == '7':
+        # the SLC-off scenes of Landsat 7 have gaps at nearly the same positions, so they are filled with the scenes of
+        # Landsat 5 and 8 and the Landsat 7 scenes acquired before the failure of the scan line corrector
+        fill_collection = get_ls_image_collection('5', begin_date, end_date, aoi).merge(
+            get_ls_image_collection('8', begin_date, end_date, aoi))
+        collection = gap_fill_collection(collection, fill_collection)
+
+    return collection
+
 
 def get_ls89_image_collection(
         col: Union[int, str],
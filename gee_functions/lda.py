@@ -1,78 +1,134 @@
+import bz2
 import ee
+import json
+import os
+import pickle
 
 import numpy as np
 import pandas as pd
 
 from sklearn.model_selection import train_test_split
-from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
 
 import plotly.graph_objects as go
 
-from typing import List
+from typing import Dict, List, Tuple, Union
 
 try:
-    from constants import PALETTE_RF
+    from constants import PALETTE_RF, PROJECT_PATH
+    from aoi import AreaOfInterest, to_area_of_interest
+    from export import export_to_asset
+    from local.lda import calc_class_statistics, merge_class_statistics, solve_one_vs_rest, calibrate_lda, \
+        optimize_thresholds
+    from local.outliers import calc_outlier_mask
+    from local.samples import SampleStore, convert_sample_file, find_sample_file, load_sample_store
 except ImportError:
-    from .constants import PALETTE_RF
+    from .constants import PALETTE_RF, PROJECT_PATH
+    from .aoi import AreaOfInterest, to_area_of_interest
+    from .export import export_to_asset
+    from .local.lda import calc_class_statistics, merge_class_statistics, solve_one_vs_rest, calibrate_lda, \
+        optimize_thresholds
+    from .local.outliers import calc_outlier_mask
+    from .local.samples import SampleStore, convert_sample_file, find_sample_file, load_sample_store
 
 
-def take_strat_sample(
+def create_class_image(lc_map: ee.Image, lc_classes: Dict[str, List[int]]) -> (ee.Image, Dict[int, str]):
+    """
+    Converts a calibration map into an image with one pixel value per land cover class to sample, using a single remap
+    instead of a where statement per class value. Pixels not belonging to any of the classes get the value 0.
+
+    :param lc_map: EE Image containing the calibration map
+    :param lc_classes: dict containing the calibration classes to sample and their pixel values in the calibration map
+    :return: EE Image with the new class values, dict with the new class values as keys and the class names as values
+    """
+    from_values = []
+    to_values = []
+    new_class_values = {}
+
+    for pix_val, (lc_class, class_values) in enumerate(lc_classes.items(), start=1):
+        from_values += class_values
+        to_values += [pix_val] * len(class_values)
+        new_class_values[pix_val] = lc_class
+
+    class_image = lc_map.remap(from_values, to_values, 0).unmask(0)
+
+    return class_image, new_class_values
+
+
+def create_class_patches(
+        lc_map: ee.Image,
+        lc_classes: Dict[str, List[int]],
+        aoi: AreaOfInterest,
+        projection: ee.Projection,
+        classband: str = 'lc',
+        min_connected_pixels: int = 60) -> (ee.Image, ee.Image, Dict[int, str]):
+    """
+    Creates the patches of the target classes in a calibration map, removing patches smaller than the minimum number of
+    connected pixels
+
+    :param lc_map: EE Image containing the calibration map
+    :param lc_classes: dict containing the calibration classes and their pixel values in the calibration map
+    :param aoi: AreaOfInterest used to remove the pixels outside of the area of interest
+    :param projection: projection of the feature data
+    :param classband: The name to be used the band containing the patches of the target classes
+    :param min_connected_pixels: Number of minimum connected pixels a patch needs to contain
+    :return: EE Image containing the patches, EE Image containing the mask of the patches, dict with the new class
+     values as keys and the class names as values
+    """
+    land_areas_for_sampling, new_class_values = create_class_image(lc_map, lc_classes)
+    land_areas_for_sampling = aoi.clip(land_areas_for_sampling).reproject(projection)
+
+    training_regions_mask = land_areas_for_sampling.connectedPixelCount(min_connected_pixels).gte(
+        min_connected_pixels).reproject(projection)
+    # Removes smaller land cover patches based on the number of connected pixels
+    lc_patches = land_areas_for_sampling.where(training_regions_mask.eq(0), 0).rename(classband)
+
+    return lc_patches, training_regions_mask, new_class_values
+
+
+def create_strat_samples(
         calibration_maps,
         feature_data,
         lc_classes,
-        aoi: ee.FeatureCollection,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
         samplesize: int = 5000,
         scale: int = 30,
         tilescale: int = 16,
         classband: str = 'lc',
-        file_name: str = 'sample_collection',
-        dir_name: str = 'sample_directory',
-        min_connected_pixels: int = 60) -> (ee.batch.Task, ee.Image, ee.Image):
+        min_connected_pixels: int = 60) -> (Dict[str, ee.FeatureCollection], ee.Image, ee.Image):
     """
         Selects pixels from target classes extracted from calibration maps, filters out small patches of pixels and
-        performs a stratified sample from the remaining
+        creates a stratified sample from the remaining for every calibration year. The samples are not computed, they
+        can be exported with take_strat_sample or downloaded directly with download.download_features.
 
         :param calibration_maps: Dictionary containing calibration maps loaded as Earth Engine Image objects
         :param feature_data: Collection of images containing the feature data for classification
         :param lc_classes: dict containing the calibration classes to sample
-        :param aoi: GEE FeatureCollection containing the vector of the area of interest for classification, this will be
-         used to mask any pixels outside of the area of interest
+        :param aoi: AreaOfInterest or GEE FeatureCollection containing the vector of the area of interest for
+         classification, this will be used to mask any pixels outside of the area of interest
         :param samplesize: Number of samples to take per class
         :param scale: A nominal scale in meters of the projection to sample in. Defaults to the scale of the first band
          of the input image.
         :param tilescale: Scaling factor used to reduce aggregation tile size; using a larger tileScale (e.g. 2 or 4) may
         enable computations that run out of memory with the default.
         :param classband: The name to be used the band containing the patches of the target classes. Defaults to 'lc'
-        :param file_name: Name for the CSV file in which the samples are stored on the Google Drive, Defaults to 'sample_collection'
-        :param dir_name: Name for the directory in which the samples are stored on the Google Drive, Defaults to 'sample_directory'
         :param min_connected_pixels: Number of minimum connected pixels a patch needs to contain, otherwise it is not
          considered for sampling
-        :return: export task, EE Image containing the masked patches, EE image containing the patches
+        :return: dict with the sample FeatureCollection per calibration year, EE Image containing the masked patches,
+         EE image containing the patches
         """
 
-    sample_collection = None
-    new_class_values = {}
+    aoi = to_area_of_interest(aoi)
+    samples = {}
 
     for key in calibration_maps:
-        lc_map = calibration_maps[key]
-        land_areas_for_sampling = ee.Image(0)  # Empty image
-
-        pix_val = 1
-
-        for lc_class, class_values in lc_classes.items():
-            # Paints the areas for each of the specified land cover classes to sample on the empty image
-            for cal_lc_val in class_values:
-                land_areas_for_sampling = land_areas_for_sampling.where(lc_map.eq(cal_lc_val), pix_val)
-
-            new_class_values[pix_val] = lc_class
-            pix_val += 1
-
-        land_areas_for_sampling = land_areas_for_sampling.clip(aoi).reproject(feature_data[key].projection())
-
-        training_regions_mask = land_areas_for_sampling.connectedPixelCount(min_connected_pixels).gte(
-            min_connected_pixels).reproject(feature_data[key].projection())
-        # Removes smaller land cover patches based on the number of connected pixels
-        lc_patches = land_areas_for_sampling.where(training_regions_mask.eq(0), 0).rename(classband)
+        lc_patches, training_regions_mask, new_class_values = create_class_patches(
+            calibration_maps[key],
+            lc_classes,
+            aoi,
+            feature_data[key].projection(),
+            classband=classband,
+            min_connected_pixels=min_connected_pixels,
+        )
 
         # combine the feature data and land cover patches into one image
         data_for_sampling = feature_data[key].addBands(lc_patches)
@@ -82,30 +138,99 @@ def take_strat_sample(
             classBand=classband,
             scale=scale,
             tileScale=tilescale,
-            region=aoi.geometry()
+            region=aoi.geometry
         ).filter(ee.Filter.neq(classband, 0))
 
-        if sample_collection is None:  # combine the samples for all the years being used for calibration
-            sample_collection = sample
-        else:
-            sample_collection = sample_collection.merge(sample)
+        name_dict = ee.Dictionary(new_class_values)
 
-    def add_class_name(x):
+        def add_class_name(x):
+            return ee.Feature(x).set('class', name_dict.get(ee.Number(ee.Feature(x).get(classband)).format()))
 
-        name_dict = ee.Dictionary(new_class_values)
-        return ee.Feature(x).set('class', name_dict.get(ee.Number(ee.Feature(x).get('lc')).format())).copyProperties(x)
+        samples[str(key)] = sample.map(add_class_name)
+
+    return samples, training_regions_mask, lc_patches
 
-    sample_collection = sample_collection.map(add_class_name)
 
-    task = ee.batch.Export.table.toDrive(
-        collection=sample_collection,
-        description=file_name,
-        fileFormat='CSV',
-        folder=dir_name,
+def take_strat_sample(
+        calibration_maps,
+        feature_data,
+        lc_classes,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
+        samplesize: int = 5000,
+        scale: int = 30,
+        tilescale: int = 16,
+        classband: str = 'lc',
+        file_name: str = 'sample_collection',
+        dir_name: str = 'sample_directory',
+        min_connected_pixels: int = 60) -> (Dict[str, ee.batch.Task], ee.Image, ee.Image):
+    """
+        Performs a stratified sample of the calibration maps (see create_strat_samples) and exports the samples of each
+        calibration year as a separate task, so the years are sampled concurrently and a failed year can be rerun on
+        its own. The exported tables can be combined locally with merge_samples.
+
+        :param calibration_maps: Dictionary containing calibration maps loaded as Earth Engine Image objects
+        :param feature_data: Collection of images containing the feature data for classification
+        :param lc_classes: dict containing the calibration classes to sample
+        :param aoi: AreaOfInterest or GEE FeatureCollection containing the vector of the area of interest for
+         classification, this will be used to mask any pixels outside of the area of interest
+        :param samplesize: Number of samples to take per class
+        :param scale: A nominal scale in meters of the projection to sample in. Defaults to the scale of the first band
+         of the input image.
+        :param tilescale: Scaling factor used to reduce aggregation tile size; using a larger tileScale (e.g. 2 or 4) may
+        enable computations that run out of memory with the default.
+        :param classband: The name to be used the band containing the patches of the target classes. Defaults to 'lc'
+        :param file_name: Name for the CSV files in which the samples are stored on the Google Drive, the calibration
+         year is appended to the name. Defaults to 'sample_collection'
+        :param dir_name: Name for the directory in which the samples are stored on the Google Drive, Defaults to 'sample_directory'
+        :param min_connected_pixels: Number of minimum connected pixels a patch needs to contain, otherwise it is not
+         considered for sampling
+        :return: dict with the export task per calibration year, EE Image containing the masked patches, EE image
+         containing the patches
+        """
+    samples, training_regions_mask, lc_patches = create_strat_samples(
+        calibration_maps,
+        feature_data,
+        lc_classes,
+        aoi,
+        samplesize=samplesize,
+        scale=scale,
+        tilescale=tilescale,
+        classband=classband,
+        min_connected_pixels=min_connected_pixels,
+    )
+
+    tasks = {}
+
+    for key, sample in samples.items():
+        task = ee.batch.Export.table.toDrive(
+            collection=sample,
+            description=f'{file_name}_{key}',
+            fileFormat='CSV',
+            folder=dir_name,
+        )
+        task.start()  # export to the Google drive, the tasks of all years run at the same time
+        tasks[key] = task
+
+    return tasks, training_regions_mask, lc_patches
+
+
+def merge_samples(sample_files: Dict[str, str], output_file: str) -> pd.DataFrame:
+    """
+    Combines the sample tables of the separate calibration years, downloaded from the Google Drive, into a single
+    Parquet file. The calibration year of every sample is stored in the 'year' column.
+
+    :param sample_files: dict with the calibration years as keys and the paths to the CSV files as values
+    :param output_file: path of the Parquet file to create
+    :return: Pandas dataframe containing the samples of all years
+    """
+    samples = pd.concat(
+        [pd.read_csv(path).assign(year=int(year)) for year, path in sample_files.items()],
+        ignore_index=True,
     )
-    task.start()  # export to the Google drive
+    samples = samples.drop(columns=['system:index', '.geo'], errors='ignore')
+    samples.to_parquet(output_file, index=False)
 
-    return task, training_regions_mask, lc_patches
+    return samples
 
 
 def remove_outliers(
@@ -122,43 +247,338 @@ def remove_outliers(
     :return: Pandas dataframe with outliers removed
     """
 
-    q1 = df[bands_to_include].quantile(lower_quantile)
-    q3 = df[bands_to_include].quantile(upper_quantile)
-    iqr = q3 - q1
-    df = df[~((df[bands_to_include] < (q1 - 1.5 * iqr)) | (df[bands_to_include] > (q3 + 1.5 * iqr))).any(axis=1)]
+    keep = calc_outlier_mask(df[bands_to_include].to_numpy(dtype=np.float32), lower_quantile, upper_quantile)
 
-    return df
+    return df[keep]
 
 
 def get_lda_params(X, y):
-    sklearn_lda = LDA(n_components=1, store_covariance=True)
+    """
+    Calibrates the LDA separating the target class from the other classes. The discriminant is solved in closed form
+    from the class statistics, see local.lda.solve_one_vs_rest.
+
+    :param X: Pandas dataframe with the band values of the samples
+    :param y: binary labels of the samples, with 1 for the target class
+    :return: intercept, Pandas dataframe with the coefficient of every band, LDA scores of the samples, the greater_than
+     flag, which is always True as the target class has the higher scores, and the pooled within-class covariance matrix
+    """
+    _, counts, means, covariances = calc_class_statistics(X.to_numpy(), np.asarray(y))
+    discriminant = solve_one_vs_rest(counts, means, covariances)
+
+    # the discriminant of the target class, which is the last of the sorted binary labels
+    coefficients = discriminant['coefficients'][-1]
+    intercept = discriminant['intercepts'][-1:]
+
+    LDA_fit = (X.to_numpy() @ coefficients + intercept[0])[:, None]
+
+    df_coefficients = pd.DataFrame({'Bandname': X.columns, 'Coefficient': coefficients})
+
+    return intercept, df_coefficients, LDA_fit, True, discriminant['covariances'][-1]
+
+
+def get_lda_params_all_classes(X: pd.DataFrame, classes) -> Dict[str, dict]:
+    """
+    Calibrates the one-vs-rest LDA for all classes at once, the discriminants of all classes are solved in a single
+    batched linear algebra call.
+
+    :param X: Pandas dataframe with the band values of the samples
+    :param classes: class of every sample
+    :return: dictionary with the classes as keys and a dictionary with the intercept, coefficients, greater_than flag
+     and covariance matrix as values
+    """
+    class_names, discriminants = calibrate_lda(X.to_numpy(), np.asarray(classes))
+
+    return to_lda_params(class_names, discriminants, list(X.columns))
+
+
+def to_lda_params(class_names, discriminants: Dict[str, np.ndarray], bandnames: List[str]) -> Dict[str, dict]:
+    """
+    Converts the discriminants returned by local.lda.solve_one_vs_rest into the LDA parameters per class. The target
+    class of these discriminants always has the higher scores, the greater_than flags are only included for calibrations
+    converted from sklearn pickles with convert_lda_calibration.
+
+    :param class_names: names of the classes, in the order of the discriminants
+    :param discriminants: dictionary with the coefficients, intercepts, covariances and optionally greater_than flags
+    :param bandnames: names of the bands, in the order of the coefficients
+    :return: dictionary with the classes as keys and a dictionary with the intercept, coefficients, greater_than flag
+     and covariance matrix as values
+    """
+    lda_params = {}
+
+    for ind, class_name in enumerate(class_names):
+        lda_params[class_name] = {
+            'intercept': discriminants['intercepts'][ind:ind + 1],
+            'coefficients': pd.DataFrame({'Bandname': bandnames, 'Coefficient': discriminants['coefficients'][ind]}),
+            'greater_than': bool(discriminants['greater_than'][ind]) if 'greater_than' in discriminants else True,
+            'covariance': discriminants['covariances'][ind],
+        }
+
+    return lda_params
+
+
+def suggest_thresholds(
+        calibration_data: Dict[str, tuple],
+        objective: str = 'youden',
+        target_precision: float = 0.95) -> Dict[str, Dict[str, float]]:
+    """
+    Suggests the thresholds for the training areas of all classes and seasons in one call, by optimizing an objective
+    over the LDA scores of the calibration samples (see local.lda.optimize_threshold). The suggestions can be shown in
+    get_histogram as suggested_threshold.
+
+    :param calibration_data: dictionary with the seasons as keys and a tuple with the Pandas dataframe with the band
+     values of the samples, the class of every sample and the LDA parameters of the season as returned by
+     get_lda_params_all_classes
+    :param objective: 'youden' to maximize Youden's J, 'f1' to maximize the F1 score or 'precision' to maximize the
+     recall while keeping the precision at or above the target precision
+    :param target_precision: minimum precision for the 'precision' objective
+    :return: dictionary with '<season>_<class>' as keys and a dictionary with the threshold, the value of the objective
+     and the precision and recall as values. The threshold is None for the classes for which the target precision
+     cannot be reached.
+    """
+    lda_scores = {}
+
+    for season, (X, classes, lda_params) in calibration_data.items():
+        classes = np.asarray(classes)
+        class_names = list(lda_params.keys())
+
+        coefficients = np.stack([
+            lda_params[class_name]['coefficients'].set_index('Bandname').loc[X.columns, 'Coefficient'].to_numpy()
+            for class_name in class_names
+        ])
+        intercepts = np.array([np.ravel(lda_params[class_name]['intercept'])[0] for class_name in class_names])
+
+        scores = X.to_numpy(dtype=np.float64) @ coefficients.T + intercepts  # scores of all classes at once
+
+        for ind, class_name in enumerate(class_names):
+            lda_scores[f'{season}_{class_name}'] = (
+                scores[:, ind], classes == class_name, lda_params[class_name]['greater_than'])
+
+    return optimize_thresholds(lda_scores, objective=objective, target_precision=target_precision)
+
+
+def calc_class_statistics_ee(
+        calibration_maps,
+        feature_data,
+        lc_classes,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
+        bandnames: List[str],
+        scale: int = 30,
+        tilescale: int = 16,
+        classband: str = 'lc',
+        min_connected_pixels: int = 60,
+        max_pixels: int = 1e13) -> (List[str], np.ndarray, np.ndarray, np.ndarray):
+    """
+    Calculates the number of pixels, the mean and the covariance matrix of every calibration class on the EE, using a
+    grouped reducer over the class patches. All eligible pixels are used instead of a sample and only the statistics
+    are downloaded, in a single request for all calibration years.
+
+    :param calibration_maps: Dictionary containing calibration maps loaded as Earth Engine Image objects
+    :param feature_data: Collection of images containing the feature data for classification
+    :param lc_classes: dict containing the calibration classes
+    :param aoi: AreaOfInterest or GEE FeatureCollection containing the vector of the area of interest
+    :param bandnames: names of the bands to calculate the statistics for
+    :param scale: A nominal scale in meters of the projection to work in
+    :param tilescale: Scaling factor used to reduce aggregation tile size; using a larger tileScale (e.g. 2 or 4) may
+    enable computations that run out of memory with the default.
+    :param classband: The name to be used the band containing the patches of the target classes. Defaults to 'lc'
+    :param min_connected_pixels: Number of minimum connected pixels a patch needs to contain, otherwise it is not
+     considered
+    :param max_pixels: the maximum number of pixels to reduce
+    :return: class names, counts (K), means (K x p) and covariance matrices (K x p x p)
+    """
+    aoi = to_area_of_interest(aoi)
+    no_of_bands = len(bandnames)
+
+    # the inputs of the reducers are the bands, the last input is the class used to group the pixels
+    reducer = ee.Reducer.mean().repeat(no_of_bands).combine(
+        ee.Reducer.covariance(), sharedInputs=True).combine(
+        ee.Reducer.count().repeat(no_of_bands), sharedInputs=True).group(groupField=no_of_bands, groupName=classband)
+
+    statistics = {}
+
+    for key in calibration_maps:
+        lc_patches, _, new_class_values = create_class_patches(
+            calibration_maps[key],
+            lc_classes,
+            aoi,
+            feature_data[key].projection(),
+            classband=classband,
+            min_connected_pixels=min_connected_pixels,
+        )
 
-    LDA_clf = sklearn_lda.fit(X, y)
-    LDA_fit = sklearn_lda.fit_transform(X, y)
+        data = feature_data[key].select(bandnames)
+        data = data.updateMask(data.mask().reduce(ee.Reducer.min()))  # only pixels with values for all the bands
 
-    if np.mean(LDA_fit[:, 0][y == 0]) > np.mean(LDA_fit[:, 0][y == 1]):
-        greater_than = False
+        statistics[str(key)] = data.addBands(lc_patches.selfMask()).reduceRegion(
+            reducer=reducer,
+            geometry=aoi.geometry,
+            scale=scale,
+            tileScale=tilescale,
+            maxPixels=max_pixels,
+        ).get('groups')
+
+    statistics = ee.Dictionary(statistics).getInfo()  # a single request for the statistics of all years
+
+    year_statistics = []
+
+    for groups in statistics.values():
+        year_statistics.append((
+            np.array([int(group[classband]) for group in groups]),
+            np.array([group['count'][0] for group in groups], dtype=np.float64),
+            np.array([group['mean'] for group in groups], dtype=np.float64),
+            np.array([group['covariance'] for group in groups], dtype=np.float64),
+        ))
+
+    class_values, counts, means, covariances = merge_class_statistics(year_statistics)
+
+    return [new_class_values[value] for value in class_values], counts, means, covariances
+
+
+def get_lda_params_from_ee(
+        calibration_maps,
+        feature_data,
+        lc_classes,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
+        bandnames: List[str],
+        **kwargs) -> Dict[str, dict]:
+    """
+    Calibrates the one-vs-rest LDA for all classes using the class statistics calculated on the EE, without sampling
+    and downloading the feature data. See calc_class_statistics_ee for the parameters.
+
+    :return: dictionary with the classes as keys and a dictionary with the intercept, coefficients, greater_than flag
+     and covariance matrix as values
+    """
+    class_names, counts, means, covariances = calc_class_statistics_ee(
+        calibration_maps, feature_data, lc_classes, aoi, bandnames, **kwargs)
+
+    return to_lda_params(class_names, solve_one_vs_rest(counts, means, covariances), bandnames)
+
+
+def calc_lda_scores(data: ee.Image, lda_params: Dict[str, dict]) -> ee.Image:
+    """
+    Calculates the LDA scores of all classes in a single pass. The bands are converted into an array per pixel, which is
+    multiplied with a constant matrix containing the coefficients of all classes, instead of building a chain of
+    multiply and add operations per band and class.
+
+    :param data: EE Image containing the feature data
+    :param lda_params: dictionary with the classes as keys and a dictionary with the 'intercept' and 'coefficients' as
+     values, see get_lda_params_all_classes
+    :return: EE Image with a band containing the LDA score of every class, named after the classes
+    """
+    class_names = list(lda_params.keys())
+
+    bandnames = []
+    for params in lda_params.values():
+        bandnames += [band for band in params['coefficients']['Bandname'] if band not in bandnames]
+
+    coefficients = np.zeros((len(class_names), len(bandnames)))
+    intercepts = np.zeros((len(class_names), 1))
+
+    for ind, params in enumerate(lda_params.values()):
+        band_positions = [bandnames.index(band) for band in params['coefficients']['Bandname']]
+        coefficients[ind, band_positions] = params['coefficients']['Coefficient'].to_numpy(dtype=np.float64)
+        intercepts[ind, 0] = float(np.ravel(params['intercept'])[0])
+
+    pixel_values = data.select(bandnames).toDouble().toArray().toArray(1)  # column vector with the band values
+
+    scores = ee.Image(ee.Array(coefficients.tolist())).matrixMultiply(pixel_values).add(
+        ee.Image(ee.Array(intercepts.tolist())))
+
+    return scores.arrayProject([0]).arrayFlatten([class_names])
+
+
+def export_lda_scores(
+        data: ee.Image,
+        lda_params: Dict[str, dict],
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
+        aoi_name: str,
+        season: str,
+        year: Union[int, str],
+        scale: int = 30,
+        crs: str = 'EPSG:32630',
+        overwrite: bool = False) -> Union[ee.batch.Task, bool]:
+    """
+    Exports the LDA scores of all classes for a season and year as an asset. Once exported, the thresholds can be
+    previewed using only visualization parameters (see visualization.vis_params_threshold), without recomputing the
+    LDA for every change of a threshold.
+
+    :param data: EE Image containing the feature data
+    :param lda_params: dictionary with the classes as keys and a dictionary with the 'intercept' and 'coefficients' as
+     values, see get_lda_params_all_classes
+    :param aoi: AreaOfInterest or GEE FeatureCollection containing the vector of the area of interest
+    :param aoi_name: name of the area of interest, used in the asset ID
+    :param season: season of the feature data, e.g. 'summer' or 'winter'
+    :param year: year of the feature data
+    :param scale: pixel size in meters of the exported scores
+    :param crs: projection of the exported scores
+    :param overwrite: Boolean, if True it overwrites the existing scores
+    :return: EE export task, or True if the asset already exists
+    """
+    aoi = to_area_of_interest(aoi)
+    scores = aoi.clip(calc_lda_scores(data, lda_params)).toFloat()
+
+    try:
+        task = export_to_asset(
+            asset=scores,
+            asset_type='image',
+            asset_id=f'lda_scores/{aoi_name}/lda_scores_{aoi_name}_{season}_{year}',
+            region=aoi.bounds_coordinates,
+            crs=crs,
+            scale=scale,
+            overwrite=overwrite
+        )
+    except FileExistsError as e:  # if the asset already exists the user is notified and no error is generated
+        print(e)
+        return True
     else:
-        greater_than = True
+        return task
 
-    coefficients = list(LDA_clf.scalings_.flatten())
-    covariance = LDA_clf.covariance_
 
-    pred = X.copy()
+def load_lda_scores(aoi_name: str, season: str, year: Union[int, str]) -> ee.Image:
+    """
+    Loads the LDA scores exported with export_lda_scores
 
-    for ind, band in enumerate(X.columns):
-        pred[band] = X[band] * coefficients[ind]
+    :param aoi_name: name of the area of interest
+    :param season: season of the feature data, e.g. 'summer' or 'winter'
+    :param year: year of the feature data
+    :return: EE Image with a band containing the LDA score of every class
+    """
+    return ee.Image(f'{PROJECT_PATH}/raster/lda_scores/{aoi_name}/lda_scores_{aoi_name}_{season}_{year}')
 
-    sklearn_df = pd.DataFrame(data=LDA_fit, columns=['Sklearn Prediction'])
-    man_df = pd.DataFrame(data=pred.sum(1).values, columns=['Manual Prediction'])
-    sklearn_df['Manual Prediction'] = man_df['Manual Prediction']
-    sklearn_df['intercept'] = sklearn_df['Sklearn Prediction'] - sklearn_df['Manual Prediction']
-    intercept = sklearn_df['intercept'].mode().values
 
-    df_coefficients = pd.DataFrame({'Bandname': X.columns, 'Coefficient': coefficients})
-    # df_covariance = pd.DataFrame({'Bandname': X.columns, 'Coefficient': coefficients})
+def calc_training_areas(
+        scores: ee.Image,
+        thresholds: Dict[str, float],
+        greater_than: Dict[str, bool],
+        projection: ee.Projection,
+        min_connected_pixels: int = 10) -> ee.Image:
+    """
+    Selects the training areas of all classes at once by applying the thresholds to the LDA scores. Pixels are selected
+    if their score is above the threshold, or below it if greater_than is False for the class. Patches smaller than the
+    minimum number of connected pixels are removed.
+
+    :param scores: EE Image with the LDA score of every class, as returned by calc_lda_scores
+    :param thresholds: dictionary with the threshold of every class
+    :param greater_than: dictionary indicating for every class if the scores above the threshold are selected
+    :param projection: projection of the feature data
+    :param min_connected_pixels: Number of minimum connected pixels a patch needs to contain
+    :return: EE Image with a binary band containing the training areas of every class
+    """
+    class_names = list(thresholds.keys())
+    signs = [1 if greater_than[class_name] else -1 for class_name in class_names]
+
+    # multiplying by -1 turns a lower than comparison into a greater than comparison
+    training_areas = scores.select(class_names).multiply(ee.Image.constant(signs)).gte(
+        ee.Image.constant([sign * thresholds[class_name] for sign, class_name in zip(signs, class_names)])
+    ).rename(class_names)
+
+    # connectedPixelCount connects the pixels with the same values in all bands, so the patches are counted per class
+    training_areas_mask = ee.Image.cat([
+        training_areas.select(class_name).connectedPixelCount(min_connected_pixels).gte(min_connected_pixels)
+        for class_name in class_names
+    ]).reproject(projection)
 
-    return intercept, df_coefficients, LDA_fit, greater_than, covariance
+    return training_areas.where(training_areas_mask.eq(0), 0)
 
 
 def perform_lda_scaling(
@@ -168,93 +588,159 @@ def perform_lda_scaling(
         threshold,
         gt: bool = True,
         min_connected_pixels: int = 10):
-    transformed_features = {}
-    for ind, row in coefficients.iterrows():
-        transformed_features[row['Bandname']] = data.select(row['Bandname']).multiply(float(row['Coefficient']))
-
-    total_lda_1 = None
-
-    for feat_key in transformed_features:
-        if total_lda_1 is None:
-            total_lda_1 = transformed_features[feat_key]
-        else:
-            total_lda_1 = total_lda_1.add(transformed_features[feat_key])
-
-    total = total_lda_1.add(ee.Number(intercept[0])).rename('total')
-
-    if gt:
-        training_areas = total.gte(threshold).rename('training')
-    else:
-        training_areas = total.lte(threshold).rename('training')
-
-    training_areas_mask = training_areas.connectedPixelCount(min_connected_pixels).gte(min_connected_pixels).reproject(
-        data.projection())
+    """
+    Calculates the LDA score of a single class and selects the training areas using a threshold. To process all the
+    classes of a season at once use calc_lda_scores and calc_training_areas.
+
+    :param data: EE Image containing the feature data
+    :param intercept: intercept of the LDA
+    :param coefficients: Pandas dataframe with the coefficient of every band
+    :param threshold: threshold used to select the training areas
+    :param gt: if True the pixels with a score above the threshold are selected, otherwise the pixels below it
+    :param min_connected_pixels: Number of minimum connected pixels a patch needs to contain
+    :return: EE Image with the LDA score in the 'total' band and the training areas in the 'training' band
+    """
+    total = calc_lda_scores(data, {'total': {'intercept': intercept, 'coefficients': coefficients}})
 
-    final_img = total.addBands(training_areas.where(training_areas_mask.eq(0), 0))
+    training_areas = calc_training_areas(
+        total, {'total': threshold}, {'total': gt}, data.projection(), min_connected_pixels).rename('training')
 
-    return final_img
+    return total.addBands(training_areas)
 
 
 def get_data(data_loc, bandnames, target_class, subsample_other=True):
-    def assign_bin_y(val):
-        if val == target_class:
-            return 1
-        else:
-            return 0
+    """
+    Loads the data to calibrate the LDA for a target class from a sample file. The sample file is read once and kept in
+    memory, see SampleStore.
+
+    :param data_loc: path to the sample file, with or without extension
+    :param bandnames: names of the bands to include, bands that are not in the samples are ignored
+    :param target_class: name of the class to separate from the other classes
+    :param subsample_other: if True 2000 samples are randomly selected from every land cover value, see
+     SampleStore.get_data
+    :return: Pandas dataframe with the band values, Pandas dataframe with the 'lc', 'lc_bin' and 'class' columns
+    """
+    return load_sample_store(data_loc).get_data(bandnames, target_class, subsample_other=subsample_other)
 
-    df = pd.read_csv(data_loc)
-    bandnames = [band for band in bandnames if band in list(df.columns)]
 
-    df['lc_bin'] = df['class'].apply(assign_bin_y)
-    df = df[bandnames + ['lc', 'lc_bin', 'class']].dropna()
-    df = remove_outliers(df, bandnames)
+def create_histogram_trace(data_x: np.ndarray, bin_edges: np.ndarray = None, **kwargs) -> go.Trace:
+    """
+    Creates a histogram trace. If bin edges are provided the counts are computed with np.histogram and only the counts
+    are added to the figure as a bar trace, instead of all the samples.
 
-    if subsample_other:
-        df_target = df[(df['class'] == target_class)]
-        df_other = df[~(df['lc'] == target_class)].groupby('lc').sample(n=2000, random_state=1)
-        df = pd.concat([df_target, df_other])
+    :param data_x: values to create the histogram for
+    :param bin_edges: optional, edges of the bins
+    :param kwargs: arguments passed on to the plotly trace, e.g. name and opacity
+    :return: go.Histogram or go.Bar trace
+    """
+    if bin_edges is None:
+        return go.Histogram(x=data_x, **kwargs)
 
-    X = df[bandnames]
-    y = df[['lc', 'lc_bin', 'class']]
+    counts, _ = np.histogram(data_x, bins=bin_edges)
 
-    return X, y
+    return create_bar_trace(bin_edges, counts, **kwargs)
 
 
-def get_data(data_loc, bandnames, target_class, subsample_other=True):
-    def assign_bin_y(val):
-        if val == target_class:
-            return 1
-        else:
-            return 0
+def create_bar_trace(bin_edges: np.ndarray, counts: np.ndarray, **kwargs) -> go.Bar:
+    """
+    Creates a bar trace showing precomputed histogram counts
 
-    df = pd.read_csv(f'{data_loc}.csv')
-    bandnames = [band for band in bandnames if band in list(df.columns)]
+    :param bin_edges: edges of the bins
+    :param counts: number of samples in every bin
+    :param kwargs: arguments passed on to the plotly trace, e.g. name and opacity
+    :return: go.Bar trace
+    """
+    bin_edges = np.asarray(bin_edges)
 
-    df['lc_bin'] = df['class'].apply(assign_bin_y)
-    df = df[bandnames + ['lc', 'lc_bin', 'class']].dropna()
-    df = remove_outliers(df, bandnames)
+    return go.Bar(x=(bin_edges[:-1] + bin_edges[1:]) / 2, y=np.asarray(counts), width=np.diff(bin_edges), **kwargs)
 
-    if subsample_other:
-        df_target = df[(df['class'] == target_class)]
-        df_other = df[~(df['lc'] == target_class)].groupby('lc').sample(n=2000, random_state=1)
-        df = pd.concat([df_target, df_other])
 
-    X = df[bandnames]
-    y = df[['lc', 'lc_bin', 'class']]
+def add_threshold_lines(fig, user_threshold=None, suggested_threshold=None, row=None, col=None):
+    """
+    Adds the threshold lines to a histogram figure
+
+    :param fig: plotly figure
+    :param user_threshold: optional, threshold selected by the user, plotted as a red line
+    :param suggested_threshold: optional, suggested threshold, plotted as a blue line
+    :param row: row of the subplot to add the lines to
+    :param col: column of the subplot to add the lines to
+    :return: plotly figure
+    """
+    # the lines span the full height of the plot, so they do not depend on the counts
+    if user_threshold is not None:
+        fig.add_shape(
+            type="line",
+            x0=user_threshold,
+            y0=0,
+            x1=user_threshold,
+            y1=1,
+            yref='y domain',
+            line=dict(
+                color="Red",
+                width=3
+            ),
+            name='Threshold selected by user',
+            row=row,
+            col=col
+        )
 
-    return X, y
+    if suggested_threshold is not None:
+        fig.add_shape(
+            type="line",
+            x0=suggested_threshold,
+            y0=0,
+            x1=suggested_threshold,
+            y1=1,
+            yref='y domain',
+            line=dict(
+                color="RoyalBlue",
+                width=3
+            ),
+            name='Suggested Threshold',
+            row=row,
+            col=col
+        )
+
+    return fig
 
 
-def get_histogram(X, y, classes, user_threshold=None, suggested_threshold=None, fig=None, row=None, col=None):
+def get_histogram(
+        X,
+        y,
+        classes,
+        user_threshold=None,
+        suggested_threshold=None,
+        fig=None,
+        row=None,
+        col=None,
+        bins: int = None):
+    """
+    Plots the distribution of the LDA scores of the calibration samples per class
+
+    :param X: 2-D array with the LDA scores in the first column
+    :param y: Pandas series with the class of every sample
+    :param classes: dictionary with the classes to plot
+    :param user_threshold: optional, threshold selected by the user, plotted as a red line
+    :param suggested_threshold: optional, suggested threshold, plotted as a blue line
+    :param fig: optional, figure to add the histogram to
+    :param row: row of the subplot to add the histogram to
+    :param col: column of the subplot to add the histogram to
+    :param bins: optional, number of bins. If provided the histograms are binned with NumPy using the same bin edges
+     for all classes, so only the counts are added to the figure instead of all the samples
+    :return: plotly figure
+    """
     if fig is None:
         fig = go.Figure()
 
+    bin_edges = None if bins is None else np.histogram_bin_edges(X[:, 0], bins=bins)
+
     for cl_key, cl_name in classes.items():
 
         if len(y.unique()) == 2:
             fig.add_trace(
-                go.Histogram(
-                    x=X[:, 0][y == cl_key],
+                create_histogram_trace(
+                    X[:, 0][y == cl_key],
+                    bin_edges,
                     name=classes[cl_key],
                     legendgroup=cl_key,
                     opacity=.85,
@@ -276,8 +762,9 @@ def get_histogram(X, y, classes, user_threshold=None, suggested_threshold=None,
                 data_x = X[:, 0][y == cl_key]
 
             fig.add_trace(
-                go.Histogram(
-                    x=data_x,
+                create_histogram_trace(
+                    data_x,
+                    bin_edges,
                     name=cl_name,
                     legendgroup=cl_name,
                     marker_color=PALETTE_RF[cl_name],
@@ -288,40 +775,300 @@ def get_histogram(X, y, classes, user_threshold=None, suggested_threshold=None,
                 col=col
             )
 
-    if user_threshold is not None:
-        fig.add_shape(
-            type="line",
-            x0=user_threshold,
-            y0=0,
-            x1=user_threshold,
-            y1=500,
-            line=dict(
-                color="Red",
-                width=3
-            ),
-            name='Threshold selected by user',
-            row=row,
-            col=col
-        )
+    add_threshold_lines(fig, user_threshold, suggested_threshold, row=row, col=col)
 
-    if suggested_threshold is not None:
-        fig.add_shape(
-            type="line",
-            x0=suggested_threshold,
-            y0=0,
-            x1=suggested_threshold,
-            y1=500,
-            line=dict(
-                color="RoyalBlue",
-                width=3
+    # Overlay both histograms
+    fig.update_layout(barmode='overlay', bargap=0)
+    # Reduce opacity to see both histograms
+    # fig.update_traces(opacity=0.75)
+    return fig
+
+
+def update_threshold_line(fig, threshold, name='Threshold selected by user', row=None, col=None):
+    """
+    Moves a threshold line of a figure created with get_histogram, without adding the histograms again. Used with a
+    go.FigureWidget only the new position of the line is sent to the browser.
+
+    :param fig: plotly figure created with get_histogram
+    :param threshold: new threshold value
+    :param name: name of the line, 'Threshold selected by user' or 'Suggested Threshold'
+    :param row: row of the subplot containing the line
+    :param col: column of the subplot containing the line
+    :return: plotly figure
+    """
+    # the lines are matched on the x-axis of the subplot, as the y-axis reference of the lines is the plot domain
+    xref = None if row is None else fig.get_subplot(row, col).xaxis.plotly_name.replace('axis', '')
+
+    return fig.update_shapes(
+        dict(x0=threshold, x1=threshold),
+        selector=lambda shape: shape.name == name and (xref is None or shape.xref == xref),
+    )
+
+
+def save_lda_calibration(
+        output_dir: str,
+        lda_params: Dict[str, dict],
+        histograms: Dict[str, tuple] = None,
+        lc_names: Dict[int, str] = None,
+        target_names: Dict[str, str] = None):
+    """
+    Stores the LDA calibration of a season as a directory containing a JSON file with the class names, band names and
+    orientation flags, and a .npy file for every array. The arrays are stored as float32 and can be memory mapped by
+    load_lda_calibration.
+
+    :param output_dir: directory to store the calibration in
+    :param lda_params: dictionary with the classes as keys and a dictionary with the intercept, coefficients,
+     greater_than flag and covariance matrix as values, see get_lda_params_all_classes
+    :param histograms: optional, dictionary with the classes as keys and a tuple with the bin edges and a dictionary
+     with the histogram counts per land cover value of the calibration samples
+    :param lc_names: optional, dictionary with the land cover values as keys and the class names as values
+    :param target_names: optional, dictionary with the classes as keys and the class name of the target land cover in
+     the histograms as values, if it differs from the class, e.g. 'summer_forest' and 'forest'
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    class_names = list(lda_params.keys())
+
+    bandnames = []
+    for params in lda_params.values():
+        bandnames += [band for band in params['coefficients']['Bandname'] if band not in bandnames]
+
+    coefficients = np.zeros((len(class_names), len(bandnames)), dtype=np.float32)
+    covariances = np.full((len(class_names), len(bandnames), len(bandnames)), np.nan, dtype=np.float32)
+
+    for ind, params in enumerate(lda_params.values()):
+        band_positions = [bandnames.index(band) for band in params['coefficients']['Bandname']]
+        coefficients[ind, band_positions] = params['coefficients']['Coefficient'].to_numpy()
+        if params.get('covariance') is not None:
+            covariances[ind][np.ix_(band_positions, band_positions)] = params['covariance']
+
+    arrays = {
+        'coefficients': coefficients,
+        'intercepts': np.array([np.ravel(params['intercept'])[0] for params in lda_params.values()], dtype=np.float32),
+        'covariances': covariances,
+    }
+
+    metadata = {
+        'class_names': class_names,
+        'bandnames': bandnames,
+        'greater_than': [bool(params['greater_than']) for params in lda_params.values()],
+        'target_names': {} if target_names is None else target_names,
+    }
+
+    if histograms is not None:
+        lc_values = sorted({int(lc) for _, counts in histograms.values() for lc in counts})
+        no_of_bins = len(next(iter(histograms.values()))[0]) - 1
+
+        # the counts of land cover values that were not sampled for a class are 0
+        arrays['bin_edges'] = np.stack([histograms[class_name][0] for class_name in class_names]).astype(np.float32)
+        arrays['counts'] = np.zeros((len(class_names), len(lc_values), no_of_bins), dtype=np.float32)
+
+        for ind, class_name in enumerate(class_names):
+            for lc, counts in histograms[class_name][1].items():
+                arrays['counts'][ind, lc_values.index(int(lc))] = counts
+
+        metadata['lc_values'] = lc_values
+        metadata['lc_names'] = {str(lc): lc_names[lc] for lc in lc_values} if lc_names is not None else {}
+
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f'{name}.npy'), array)
+
+    with open(os.path.join(output_dir, 'calibration.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+
+def load_lda_calibration(calibration_dir: str) -> Dict[str, Union[list, np.ndarray]]:
+    """
+    Loads an LDA calibration stored with save_lda_calibration, the arrays are memory mapped
+
+    :param calibration_dir: directory containing the calibration
+    :return: dictionary with the metadata and the arrays of the calibration
+    """
+    with open(os.path.join(calibration_dir, 'calibration.json')) as f:
+        calibration = json.load(f)
+
+    for file_name in os.listdir(calibration_dir):
+        if file_name.endswith('.npy'):
+            calibration[file_name[:-4]] = np.load(os.path.join(calibration_dir, file_name), mmap_mode='r')
+
+    return calibration
+
+
+def calibration_to_lda_params(calibration: Dict[str, Union[list, np.ndarray]]) -> Dict[str, dict]:
+    """
+    Converts a calibration loaded with load_lda_calibration into the LDA parameters per class, as used by
+    calc_lda_scores and perform_lda_scaling
+
+    :param calibration: calibration loaded with load_lda_calibration
+    :return: dictionary with the classes as keys and a dictionary with the intercept, coefficients, greater_than flag
+     and covariance matrix as values
+    """
+    discriminants = {
+        'coefficients': calibration['coefficients'],
+        'intercepts': calibration['intercepts'],
+        'greater_than': calibration['greater_than'],
+        'covariances': calibration['covariances'],
+    }
+
+    return to_lda_params(calibration['class_names'], discriminants, calibration['bandnames'])
+
+
+def get_calibration_histogram(
+        calibration: Dict[str, Union[list, np.ndarray]],
+        class_name: str,
+        user_threshold=None,
+        suggested_threshold=None,
+        fig=None,
+        row=None,
+        col=None):
+    """
+    Plots the precomputed histograms of the LDA scores of a class stored in a calibration, see get_histogram
+
+    :param calibration: calibration loaded with load_lda_calibration
+    :param class_name: name of the class to plot the histograms for
+    :param user_threshold: optional, threshold selected by the user, plotted as a red line
+    :param suggested_threshold: optional, suggested threshold, plotted as a blue line
+    :param fig: optional, figure to add the histogram to
+    :param row: row of the subplot to add the histogram to
+    :param col: column of the subplot to add the histogram to
+    :return: plotly figure
+    """
+    if fig is None:
+        fig = go.Figure()
+
+    ind = calibration['class_names'].index(class_name)
+    target_name = calibration['target_names'].get(class_name, class_name)
+
+    for lc_ind, lc in enumerate(calibration['lc_values']):
+        counts = calibration['counts'][ind, lc_ind]
+        if not counts.any():
+            continue
+
+        lc_name = calibration['lc_names'].get(str(lc), str(lc))
+        is_target = lc_name == target_name
+
+        fig.add_trace(
+            create_bar_trace(
+                calibration['bin_edges'][ind],
+                counts,
+                name=lc_name,
+                legendgroup=lc_name,
+                marker_color=PALETTE_RF.get(lc_name),
+                opacity=0.90 if is_target else 0.65,
+                showlegend=is_target,
             ),
-            name='Suggested Threshold',
             row=row,
             col=col
         )
 
-    # Overlay both histograms
-    fig.update_layout(barmode='overlay')
-    # Reduce opacity to see both histograms
-    # fig.update_traces(opacity=0.75)
+    add_threshold_lines(fig, user_threshold, suggested_threshold, row=row, col=col)
+
+    fig.update_layout(barmode='overlay', bargap=0)
     return fig
+
+
+def calc_score_histograms(scores: np.ndarray, lc_values: np.ndarray, bins: int = 100) -> tuple:
+    """
+    Calculates the histograms of the LDA scores of the calibration samples per land cover value, in the format of the
+    histograms of save_lda_calibration
+
+    :param scores: 1-D array with the LDA scores of the samples
+    :param lc_values: 1-D array with the land cover value of every sample
+    :param bins: number of bins of the histograms
+    :return: tuple with the bin edges and a dictionary with the histogram counts per land cover value
+    """
+    bin_edges = np.histogram_bin_edges(scores, bins=bins)
+
+    return bin_edges, {int(lc): np.histogram(scores[lc_values == lc], bins=bin_edges)[0] for lc in np.unique(lc_values)}
+
+
+def create_lda_calibration(
+        data_loc: str,
+        bandnames: List[str],
+        season: str,
+        output_dir: str = None,
+        bins: int = 100) -> Dict[str, dict]:
+    """
+    Calibrates the LDA of every class with the samples returned by get_data, i.e. the target class and 2000 samples of
+    every land cover value, like the calibrations shown in the notebook. The calibration, including the histograms of
+    the scores, is stored with save_lda_calibration, so the thresholds chosen on the histograms select the same pixels
+    on the score layers exported with these parameters.
+
+    :param data_loc: path to the sample file, with or without extension
+    :param bandnames: names of the bands to include, bands that are not in the samples are ignored
+    :param season: season of the samples, used as prefix of the class names, e.g. 'summer_irrigated_trees'
+    :param output_dir: optional, directory to store the calibration in, see save_lda_calibration
+    :param bins: number of bins of the histograms
+    :return: dictionary with '<season>_<class>' as keys and a dictionary with the intercept, coefficients, greater_than
+     flag and covariance matrix as values
+    """
+    sample_store = load_sample_store(data_loc)
+
+    lda_params = {}
+    histograms = {}
+    target_names = {}
+
+    for class_name in pd.unique(sample_store.classes):
+        X, y = sample_store.get_data(bandnames, class_name)
+        intercept, coefficients, LDA_fit, greater_than, covariance = get_lda_params(X, y['lc_bin'])
+
+        key = f'{season}_{class_name}'
+        lda_params[key] = {
+            'intercept': intercept,
+            'coefficients': coefficients,
+            'greater_than': greater_than,
+            'covariance': covariance,
+        }
+        histograms[key] = calc_score_histograms(LDA_fit[:, 0], y['lc'].to_numpy(), bins)
+        target_names[key] = class_name
+
+    if output_dir is not None:
+        lc_names = pd.Series(sample_store.classes, index=sample_store.lc).groupby(level=0).first().to_dict()
+        save_lda_calibration(output_dir, lda_params, histograms, {int(lc): name for lc, name in lc_names.items()},
+                             target_names)
+
+    return lda_params
+
+
+def convert_lda_calibration(pickle_file: str, output_dir: str, bins: int = 100):
+    """
+    Converts an LDA calibration stored as a bz2 compressed pickle (.pbz2) into the format of save_lda_calibration. The
+    pickle contains a dictionary with a tuple of the samples, labels, intercept, coefficients, LDA scores and
+    greater_than flag for every class. The covariance matrices and the histograms are computed from the samples.
+
+    Only convert pickles from a trusted source, loading a pickle can execute arbitrary code.
+
+    :param pickle_file: path to the .pbz2 file
+    :param output_dir: directory to store the converted calibration in
+    :param bins: number of bins of the histograms
+    """
+    with bz2.BZ2File(pickle_file, 'rb') as f:
+        lda_parameters = pickle.load(f)
+
+    lda_params = {}
+    histograms = {}
+    lc_names = {}
+    target_names = {}
+
+    for class_name, (X, y, intercept, coefficients, X_lda, gt) in lda_parameters.items():
+        _, counts, _, covariances = calc_class_statistics(X.to_numpy(), y['lc_bin'].to_numpy())
+
+        lda_params[class_name] = {
+            'intercept': np.ravel(intercept)[:1],
+            'coefficients': coefficients,
+            'greater_than': gt,
+            'covariance': np.einsum('k,kij->ij', counts - 1, covariances) / counts.sum(),
+        }
+
+        histograms[class_name] = calc_score_histograms(X_lda[:, 0], y['lc'].to_numpy(), bins)
+
+        lc_names.update(y.groupby('lc')['class'].first().to_dict())
+        target_names[class_name] = y.loc[y['lc_bin'] == 1, 'class'].iloc[0]
+
+    save_lda_calibration(
+        output_dir,
+        lda_params,
+        histograms,
+        lc_names={int(lc): name for lc, name in lc_names.items()},
+        target_names=target_names,
+    )
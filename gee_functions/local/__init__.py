@@ -0,0 +1,3 @@
+"""
+Local counterparts of the EE functions, used to process data downloaded from the EE with NumPy
+"""
@@ -0,0 +1,324 @@
+"""
+Local counterparts of the temporal reductions in create_feature_data, for scene stacks downloaded from the EE. The
+stacks are float32 arrays with the dimensions (time, band, y, x) in which masked pixels are NaN, e.g. the chunks created
+by local.preprocessing with the indices of local.indices added as bands.
+
+The statistics are named like the bands of the feature data, i.e. '{band}_{statistic}' as in CLASSIFICATION_BANDS. The
+module does not import the constants, as these require the EE, so to create exactly the feature bands of the
+classification pass the band names, e.g. output_bands=BANDNAMES, bands without a matching input band are ignored.
+"""
+
+import numpy as np
+
+from typing import Dict, List, Tuple
+
+# statistics of create_feature_data, with the percentile used for the order statistics
+ORDER_STATISTICS: Dict[str, float] = {
+    'min': 0,
+    'p15': 15,
+    'median': 50,
+    'p85': 85,
+    'max': 100,
+}
+MOMENT_STATISTICS: List[str] = ['mean', 'stdDev']
+STATISTICS: List[str] = ['mean', 'median', 'min', 'max', 'p15', 'p85', 'stdDev']
+
+
+def parse_output_bands(
+        bandnames: List[str],
+        output_bands: List[str] = None) -> List[Tuple[str, int, str]]:
+    """
+    Determines which statistic of which input band is needed for every output band
+
+    :param bandnames: names of the bands of the scene stack
+    :param output_bands: names of the output bands, '{band}_{statistic}'. If None all statistics of all bands are used
+    :return: list with the output band name, the index of the input band and the statistic
+    """
+    if output_bands is None:
+        output_bands = [f'{band}_{stat}' for band in bandnames for stat in STATISTICS]
+
+    parsed = []
+    for name in output_bands:
+        band, _, stat = name.rpartition('_')
+        if band in bandnames and stat in STATISTICS:
+            parsed.append((name, bandnames.index(band), stat))
+
+    return parsed
+
+
+def _interpolate_percentiles(values: np.ndarray, count: int, fractions: np.ndarray) -> np.ndarray:
+    """
+    Percentiles of the first count values of every column of a 2-D array, the other values of the column are larger
+    (+inf). Only the positions needed for the linear interpolation are put in place with np.partition.
+    """
+    positions = fractions * (count - 1)
+    lower = np.floor(positions).astype(np.intp)
+    upper = np.ceil(positions).astype(np.intp)
+    ordered = np.partition(values, np.unique(np.concatenate([lower, upper])), axis=0)
+
+    lower_values = ordered[lower]
+    weights = (positions - lower)[:, None]
+
+    return lower_values + (ordered[upper] - lower_values) * weights
+
+
+def calc_order_statistics(
+        data: np.ndarray,
+        percentiles: List[float]) -> np.ndarray:
+    """
+    Calculates percentiles over the first (time) dimension with linear interpolation between the scenes. All
+    percentiles are taken from a single partial sort, np.partition at the positions required for the interpolation.
+    Missing values are replaced by +inf, so they are partitioned behind the valid values, and the pixels are grouped by
+    their number of valid values, as the positions depend on this number.
+
+    :param data: float32 array (time, ...) in which masked values are NaN
+    :param percentiles: percentiles to calculate, between 0 and 100
+    :return: float32 array (percentile, ...), NaN for pixels without valid values
+    """
+    fractions = np.asarray(percentiles, dtype=np.float64) / 100
+    values = data.reshape(data.shape[0], int(np.prod(data.shape[1:])))
+    missing = np.isnan(values)
+
+    result = np.full((len(fractions), values.shape[1]), np.nan, dtype=np.float32)
+
+    if data.shape[0] > 0 and not missing.any():
+        result[:] = _interpolate_percentiles(values, data.shape[0], fractions)
+    else:
+        counts = data.shape[0] - missing.sum(axis=0)
+        filled = np.where(missing, np.inf, values)
+
+        for count in np.unique(counts[counts > 0]):
+            pixels = np.flatnonzero(counts == count)
+            result[:, pixels] = _interpolate_percentiles(filled[:, pixels], count, fractions)
+
+    return result.reshape((len(fractions),) + data.shape[1:])
+
+
+def calc_moment_statistics(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the mean and the (population) standard deviation over the first (time) dimension with running sums over
+    the scenes, accumulated in float64
+
+    :param data: float32 array (time, ...) in which masked values are NaN
+    :return: float32 arrays with the mean and the standard deviation, NaN for pixels without valid values
+    """
+    counts = np.zeros(data.shape[1:], dtype=np.float64)
+    sums = np.zeros(data.shape[1:], dtype=np.float64)
+    squares = np.zeros(data.shape[1:], dtype=np.float64)
+    work = np.empty(data.shape[1:], dtype=np.float64)
+    missing = np.empty(data.shape[1:], dtype=bool)
+
+    for scene in data:
+        # the masked values are set to zero in the float64 copy, a masked ufunc would square uninitialized buffer values
+        np.isnan(scene, out=missing)
+        counts += 1
+        counts -= missing
+        np.copyto(work, scene)
+        np.copyto(work, 0., where=missing)
+        sums += work
+        np.multiply(work, work, out=work)
+        squares += work
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts
+        variance = np.maximum(squares / counts - mean * mean, 0)
+
+    return mean.astype(np.float32), np.sqrt(variance).astype(np.float32)
+
+
+def calc_temporal_statistics(
+        data: np.ndarray,
+        bandnames: List[str],
+        output_bands: List[str] = None,
+        out: np.ndarray = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Calculates the temporal statistics of create_feature_data for a scene stack held in memory
+
+    :param data: float32 array (time, band, y, x) in which masked values are NaN
+    :param bandnames: names of the bands of the scene stack
+    :param output_bands: names of the output bands, '{band}_{statistic}' like in CLASSIFICATION_BANDS. If None all
+     statistics of all bands are calculated
+    :param out: optional, float32 array (output band, y, x) in which the statistics are stored
+    :return: float32 array (output band, y, x) and the names of the output bands
+    """
+    parsed = parse_output_bands(bandnames, output_bands)
+
+    if out is None:
+        out = np.empty((len(parsed),) + data.shape[2:], dtype=np.float32)
+
+    bands = sorted({band for _, band, _ in parsed})
+    order_stats = sorted({stat for _, _, stat in parsed if stat in ORDER_STATISTICS}, key=list(ORDER_STATISTICS).index)
+    moment_stats = any(stat in MOMENT_STATISTICS for _, _, stat in parsed)
+
+    results = {}
+    for band in bands:
+        values = data[:, band]
+
+        if order_stats:
+            ordered = calc_order_statistics(values, [ORDER_STATISTICS[stat] for stat in order_stats])
+            results.update({(band, stat): ordered[ind] for ind, stat in enumerate(order_stats)})
+
+        if moment_stats:
+            results[(band, 'mean')], results[(band, 'stdDev')] = calc_moment_statistics(values)
+
+    for ind, (_, band, stat) in enumerate(parsed):
+        out[ind] = results[(band, stat)]
+
+    return out, [name for name, _, _ in parsed]
+
+
+def calc_temporal_statistics_chunked(
+        data: np.ndarray,
+        bandnames: List[str],
+        output_bands: List[str] = None,
+        chunk_rows: int = 256,
+        out: np.ndarray = None) -> Tuple[np.ndarray, List[str]]:
+    """
+    Calculates the temporal statistics of a large scene stack in chunks of rows, e.g. of a memory mapped .npy file
+    loaded with np.load(..., mmap_mode='r'), see calc_temporal_statistics. Only one chunk of rows is read at a time.
+
+    :param data: float32 array (time, band, y, x) in which masked values are NaN
+    :param bandnames: names of the bands of the scene stack
+    :param output_bands: names of the output bands, '{band}_{statistic}'
+    :param chunk_rows: number of rows processed at once
+    :param out: optional, float32 array (output band, y, x) in which the statistics are stored, e.g. a memory mapped
+     array created with np.lib.format.open_memmap
+    :return: float32 array (output band, y, x) and the names of the output bands
+    """
+    names = [name for name, _, _ in parse_output_bands(bandnames, output_bands)]
+
+    if out is None:
+        out = np.empty((len(names),) + data.shape[2:], dtype=np.float32)
+
+    for start in range(0, data.shape[2], chunk_rows):
+        chunk = np.asarray(data[:, :, start:start + chunk_rows])
+        calc_temporal_statistics(chunk, bandnames, names, out[:, start:start + chunk_rows])
+
+    return out, names
+
+
+# statistics of create_monthly_index_images, with the percentile used for the order statistics
+MONTHLY_STATISTICS: Dict[str, float] = {
+    'median': 50,
+    'min': 10,
+    'max': 90,
+}
+
+
+def _month_edges(start_date: np.datetime64, no_of_months: int, first: int = 0) -> np.ndarray:
+    """Returns the dates at which the months first, ..., no_of_months (inclusive) begin, relative to the start date"""
+    start_date = np.datetime64(start_date, 'D')
+    offset = start_date - np.datetime64(start_date, 'M').astype('datetime64[D]')
+    months = np.datetime64(start_date, 'M') + np.arange(first, no_of_months + 1)
+
+    return months.astype('datetime64[D]') + offset
+
+
+def calc_no_of_months(start_date: np.datetime64, end_date: np.datetime64) -> int:
+    """Returns the number of whole months between two dates, like relativedelta in create_monthly_index_images"""
+    start_date = np.datetime64(start_date, 'D')
+    end_date = np.datetime64(end_date, 'D')
+    months = int((np.datetime64(end_date, 'M') - np.datetime64(start_date, 'M')).astype(int))
+
+    # a month only counts when the day of the month of the end date has been reached
+    start_day = start_date - np.datetime64(start_date, 'M').astype('datetime64[D]')
+    end_day = end_date - np.datetime64(end_date, 'M').astype('datetime64[D]')
+
+    return months - int(end_day < start_day)
+
+
+def create_monthly_composites(
+        data: np.ndarray,
+        dates: np.ndarray,
+        start_date: str,
+        end_date: str,
+        stats: List[str] = ('median',),
+        fill_from_neighbors: bool = False) -> Tuple[np.ndarray, List[dict]]:
+    """
+    Local counterpart of create_monthly_index_images. The scenes are sorted by date once, after which the boundaries of
+    the months are found with np.searchsorted, so every month is a contiguous slice of the sorted stack. All statistics
+    of a month are taken from a single partial sort of its slice (see calc_order_statistics). Months without scenes are
+    skipped.
+
+    A month runs from the day of the month of the start date up to, but not including, the same day of the next month,
+    e.g. from January 1 up to February 1. The date filter of the EE version ends one day earlier, so it leaves out the
+    scenes of the last day of every month.
+
+    :param data: float32 array (time, band, y, x) in which masked values are NaN
+    :param dates: acquisition date of every scene, e.g. an array of datetime64 values
+    :param start_date: date at which the first month begins, YYYY-MM-DD
+    :param end_date: end date of the period, YYYY-MM-DD
+    :param stats: statistics to compute, 'mean', 'min' (p10), 'max' (p90) and/or 'median'
+    :param fill_from_neighbors: if True the masked pixels of a composite are filled with the same statistic of the
+     scenes of the previous and following month, as intended by the (disabled) filler_data of the EE version
+    :return: float32 array (composite, band, y, x) and the properties of every composite: stat, month, year, date_info
+     and system:time_start
+    """
+    unknown = [stat for stat in stats if stat not in MONTHLY_STATISTICS and stat != 'mean']
+    if unknown:
+        raise ValueError("Unknown statistic entered, please pick from: ['mean', 'max', 'min', 'median'].")
+
+    dates = np.asarray(dates, dtype='datetime64[ms]')
+    order = np.argsort(dates, kind='stable')
+    if np.any(order[1:] < order[:-1]):
+        data, dates = data[order], dates[order]
+
+    no_of_months = calc_no_of_months(np.datetime64(start_date), np.datetime64(end_date))
+
+    # the edges of the month before the first and after the last month are needed for the neighbours
+    edges = _month_edges(np.datetime64(start_date), no_of_months + 1, first=-1)
+    bounds = np.searchsorted(dates, edges.astype('datetime64[ms]'), side='left')
+
+    percentiles = [MONTHLY_STATISTICS[stat] for stat in stats if stat != 'mean']
+
+    def reduce(scenes):
+        ordered = calc_order_statistics(scenes, percentiles) if percentiles else None
+        mean = calc_moment_statistics(scenes)[0] if 'mean' in stats else None
+        results, ind = [], 0
+        for stat in stats:
+            if stat == 'mean':
+                results.append(mean)
+            else:
+                results.append(ordered[ind])
+                ind += 1
+        return results
+
+    composites = []
+    properties = []
+
+    for month in range(no_of_months):
+        # edges[month + 1] is the start of the month, as the edges start one month earlier
+        begin, end = bounds[month + 1], bounds[month + 2]
+        month_start = edges[month + 1].astype(object)
+
+        neighbours = np.concatenate([data[bounds[month]:begin], data[end:bounds[month + 3]]]) \
+            if fill_from_neighbors else data[:0]
+
+        if begin == end and len(neighbours) == 0:
+            print(f'No data available for: {month_start.strftime("%b")} {month_start.year}')
+            continue
+
+        if begin < end:
+            results = reduce(data[begin:end])
+        else:
+            results = [np.full(data.shape[1:], np.nan, dtype=np.float32) for _ in stats]
+
+        if len(neighbours) > 0:
+            for result, filler in zip(results, reduce(neighbours)):
+                np.copyto(result, filler, where=np.isnan(result))
+
+        for stat, result in zip(stats, results):
+            composites.append(result)
+            properties.append({
+                'stat': stat,
+                # like the EE version the median stores the abbreviated month name, the other statistics its number
+                'month': month_start.strftime('%b') if stat == 'median' else month_start.month,
+                'year': month_start.year,
+                'date_info': f'{month_start.strftime("%b")}_{month_start.year}',
+                'system:time_start': int(edges[month + 1].astype('datetime64[ms]').astype(np.int64)),
+            })
+
+    if not composites:
+        return np.empty((0,) + data.shape[1:], dtype=np.float32), properties
+
+    return np.stack(composites), properties
@@ -0,0 +1,184 @@
+"""
+Local counterpart of gap_fill.gap_fill, which applies the USGS L7 Phase-2 gap filling protocol to scenes downloaded
+from the EE. All neighbourhood statistics (the linear fit between the scenes and the means and standard deviations of
+both scenes) are derived from window sums computed with summed-area tables, so the work per pixel does not depend on the
+kernel size and no upscaling is needed. The tables are built for strips of rows, so the memory use does not depend on
+the size of the scene, and the window sums are only looked up for the pixels to fill.
+
+The scenes are float32 arrays with the dimensions (band, y, x) or (y, x) in which masked pixels are NaN.
+
+The minimum number of neighbours differs from the EE version. There the neighbours are counted with a count reducer over
+the 0/1 image of the common pixels, which is itself unmasked, so all pixels of the window are counted, including the
+pixels that are masked in either scene. In the EE version min_neighbors therefore only excludes pixels near the edge of
+the scenes. Here only the pixels valid in both scenes are counted, as intended by the protocol, so pixels with too few
+common pixels in the window for a reliable fit are not filled.
+"""
+
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+
+# same limits as gap_fill.py
+MIN_SCALE = 1/3
+MAX_SCALE = 3
+MIN_NEIGHBORS = 144
+
+
+def calc_summed_area_table(values: np.ndarray) -> np.ndarray:
+    """
+    Calculates the summed-area table of a 2-D array, padded with a row and column of zeros, so the sum of the values in
+    rows [i0, i1) and columns [j0, j1) equals table[i1, j1] - table[i0, j1] - table[i1, j0] + table[i0, j0]
+
+    :param values: 2-D array, missing values should be set to 0 beforehand
+    :return: float64 array with one row and one column more than the values
+    """
+    table = np.zeros((values.shape[0] + 1, values.shape[1] + 1))
+    np.cumsum(values, axis=1, dtype=np.float64, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=0, out=table[1:, 1:])
+
+    return table
+
+
+def calc_window_sums(
+        table: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        radius: int) -> np.ndarray:
+    """
+    Looks up the sums within a square window around pixels in a summed-area table. At the edges only the pixels within
+    the array are summed, like reduceNeighborhood.
+
+    :param table: summed-area table created with calc_summed_area_table
+    :param rows: row of every pixel
+    :param cols: column of every pixel
+    :param radius: radius of the square window in pixels, the window is 2 * radius + 1 pixels wide
+    :return: float64 array with the window sum of every pixel
+    """
+    row0 = np.maximum(rows - radius, 0)
+    row1 = np.minimum(rows + radius + 1, table.shape[0] - 1)
+    col0 = np.maximum(cols - radius, 0)
+    col1 = np.minimum(cols + radius + 1, table.shape[1] - 1)
+
+    return table[row1, col1] - table[row0, col1] - table[row1, col0] + table[row0, col0]
+
+
+def _fill_block(
+        src: np.ndarray,
+        fill: np.ndarray,
+        rows: np.ndarray,
+        cols: np.ndarray,
+        radius: int,
+        min_scale: float,
+        max_scale: float,
+        min_neighbors: int) -> np.ndarray:
+    """Calculates the filled values of the pixels (rows, cols) of a 2-D block, see gap_fill"""
+    src_valid = ~np.isnan(src)
+    fill_valid = ~np.isnan(fill)
+    common = src_valid & fill_valid
+
+    # the values are centered on the mean of the common pixels, so the window sums do not lose precision
+    x_center = fill[common].mean(dtype=np.float64) if common.any() else 0.
+    y_center = src[common].mean(dtype=np.float64) if common.any() else 0.
+    x = np.where(fill_valid, fill - x_center, 0)
+    y = np.where(src_valid, src - y_center, 0)
+
+    def window_sums(values):
+        return calc_window_sums(calc_summed_area_table(values), rows, cols, radius)
+
+    # linear fit of src on fill over the pixels common to both scenes
+    count = window_sums(common)
+    sum_x = window_sums(np.where(common, x, 0))
+    sum_y = window_sums(np.where(common, y, 0))
+    sum_xy = window_sums(x * y)  # the product is 0 outside of the common pixels
+    sum_xx = window_sums(np.where(common, x * x, 0))
+
+    scale = (sum_xy - sum_x * sum_y / count) / (sum_xx - sum_x * sum_x / count)
+    offset = (sum_y - scale * sum_x) / count + y_center - scale * x_center
+
+    # secondary scaling factors from the means and standard deviations of both scenes
+    src_count = window_sums(src_valid)
+    src_mean = window_sums(y) / src_count
+    src_std = np.sqrt(np.maximum(window_sums(y * y) / src_count - src_mean * src_mean, 0))
+    src_mean += y_center
+
+    fill_count = window_sums(fill_valid)
+    fill_mean = window_sums(x) / fill_count
+    fill_std = np.sqrt(np.maximum(window_sums(x * x) / fill_count - fill_mean * fill_mean, 0))
+    fill_mean += x_center
+
+    scale2 = src_std / fill_std
+    offset2 = src_mean - fill_mean * scale2
+
+    # NaN scales, e.g. for windows without variance, are treated as invalid as well
+    invalid = ~((scale >= min_scale) & (scale <= max_scale))
+    scale[invalid] = scale2[invalid]
+    offset[invalid] = offset2[invalid]
+
+    # when all else fails, just use the difference of means as an offset
+    invalid = ~((scale >= min_scale) & (scale <= max_scale))
+    scale[invalid] = 1
+    offset[invalid] = (src_mean - fill_mean)[invalid]
+
+    filled = fill[rows, cols] * scale + offset
+    filled[count < min_neighbors] = np.nan
+
+    return filled
+
+
+def gap_fill(
+        src: np.ndarray,
+        fill: np.ndarray,
+        kernel_size: int,
+        min_scale: float = MIN_SCALE,
+        max_scale: float = MAX_SCALE,
+        min_neighbors: int = MIN_NEIGHBORS,
+        chunk_rows: int = 512,
+        max_workers: int = 4) -> np.ndarray:
+    """
+    Fills the masked pixels of a scene with the values of another scene, scaled with a linear fit between both scenes
+    within a square window around every pixel. Where the scale of the fit is outside of [min_scale, max_scale] the
+    ratio of the standard deviations is used instead and if that is also outside of the range only the difference of
+    the means is applied. Pixels with fewer than min_neighbors common pixels in the window are not filled, unlike the
+    EE version, which counts all pixels of the window (see the module docstring).
+
+    :param src: scene to be filled, array (band, y, x) or (y, x) in which masked pixels are NaN
+    :param fill: scene to use for the filling, with the same dimensions and bands as src
+    :param kernel_size: radius of the square kernel in pixels, like the kernel size of gap_fill.gap_fill
+    :param min_scale: minimum scale accepted for the linear fit
+    :param max_scale: maximum scale accepted for the linear fit
+    :param min_neighbors: minimum number of pixels in the window that are valid in both scenes
+    :param chunk_rows: number of rows filled at once, the summed-area tables cover these rows plus kernel_size rows on
+     either side
+    :param max_workers: maximum number of strips filled at the same time
+    :return: float32 array with the filled scene
+    """
+    src = np.asarray(src, dtype=np.float32)
+    src_bands = src.reshape((-1,) + src.shape[-2:])
+    fill_bands = np.asarray(fill, dtype=np.float32).reshape(src_bands.shape)
+    height = src_bands.shape[1]
+
+    filled = src.copy()
+    filled_bands = filled.reshape(src_bands.shape)
+
+    def fill_strip(band, start):
+        stop = min(start + chunk_rows, height)
+        rows, cols = np.nonzero(np.isnan(src_bands[band, start:stop]) & ~np.isnan(fill_bands[band, start:stop]))
+
+        if len(rows) > 0:
+            # the block includes the rows within the kernel, so the windows are clipped at the scene edges only
+            first, last = max(start - kernel_size, 0), min(stop + kernel_size, height)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = _fill_block(src_bands[band, first:last], fill_bands[band, first:last], rows + start - first,
+                                     cols, kernel_size, min_scale, max_scale, min_neighbors)
+
+            # the filled values are written to a copy, so they are not used by the fits of the neighbouring strips
+            filled_bands[band, rows + start, cols] = values
+
+    # NumPy releases the GIL in the cumulative sums, so the strips are filled in parallel threads
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fill_strip, band, start)
+                   for band in range(src_bands.shape[0]) for start in range(0, height, chunk_rows)]
+        for future in futures:
+            future.result()
+
+    return filled
@@ -0,0 +1,163 @@
+"""
+Local counterparts of the vegetation indices in indices.py, for scene stacks downloaded from the EE. The scene stacks
+are float32 arrays with the dimensions (time, band, y, x) and the indices are written into preallocated (time, y, x)
+buffers with in-place ufuncs, so apart from one float32 and one boolean work buffer no temporary arrays are created.
+
+The definitions follow the EE operations used in indices.py:
+
+- normalizedDifference masks the pixels with a negative value in either band, these become NaN
+- division by zero in image.expression returns 0
+- masked pixels are represented by NaN, which propagates through all indices
+"""
+
+import numpy as np
+
+from typing import Callable, Dict, List, Tuple
+
+
+def _divide(numerator: np.ndarray, denominator: np.ndarray, out: np.ndarray, flag: np.ndarray) -> np.ndarray:
+    """Divides in place, returning 0 for division by zero like the EE"""
+    np.not_equal(denominator, 0, out=flag)
+    np.divide(numerator, denominator, out=out, where=flag)
+    np.logical_not(flag, out=flag)
+    # multiplying by 0 instead of assigning 0 keeps the masked (NaN) numerators masked
+    np.multiply(numerator, 0, out=out, where=flag)
+    return out
+
+
+def _mask_negative(out: np.ndarray, bands: Tuple[np.ndarray, ...], flag: np.ndarray) -> np.ndarray:
+    """Sets the pixels with a negative value in any of the bands to NaN, like normalizedDifference"""
+    for band in bands:
+        np.less(band, 0, out=flag)
+        np.copyto(out, np.nan, where=flag)
+    return out
+
+
+def _normalized_difference(a, b, out, work, flag):
+    np.subtract(a, b, out=out)
+    np.add(a, b, out=work)
+    _divide(out, work, out, flag)
+    return _mask_negative(out, (a, b), flag)
+
+
+def _evi(nir, red, blue, out, work, flag):
+    np.multiply(blue, -7.5, out=out)
+    np.multiply(red, 6, out=work)
+    out += work
+    out += nir
+    out += 1
+    np.subtract(nir, red, out=work)
+    work *= 2.5
+    return _divide(work, out, out, flag)
+
+
+def _savi(nir, red, out, work, flag):
+    np.add(nir, red, out=out)
+    out += 0.5
+    np.subtract(nir, red, out=work)
+    work *= 1.5
+    return _divide(work, out, out, flag)
+
+
+def _gi(nir, green, out, work, flag):
+    return _divide(nir, green, out, flag)
+
+
+def _gcvi(nir, green, out, work, flag):
+    _divide(nir, green, out, flag)
+    out -= 1
+    return out
+
+
+def _wgi(nir, swir, green, out, work, flag):
+    # WGI = NDWI * GCVI, the NDWI is multiplied into the GCVI without a second work buffer
+    _gcvi(nir, green, out, work, flag)
+    np.subtract(nir, swir, out=work)
+    out *= work
+    np.add(nir, swir, out=work)
+    _divide(out, work, out, flag)
+    return _mask_negative(out, (nir, swir), flag)
+
+
+# bands required for every index and the function computing it from these bands
+INDICES: Dict[str, Tuple[Tuple[str, ...], Callable]] = {
+    'NDVI': (('NIR', 'R'), _normalized_difference),
+    'NDWI': (('NIR', 'SWIR'), _normalized_difference),
+    'NDWBI': (('G', 'SWIR'), _normalized_difference),
+    'NDBI': (('SWIR', 'NIR'), _normalized_difference),
+    'EVI': (('NIR', 'R', 'B'), _evi),
+    'SAVI': (('NIR', 'R'), _savi),
+    'GI': (('NIR', 'G'), _gi),
+    'GCVI': (('NIR', 'G'), _gcvi),
+    'WGI': (('NIR', 'SWIR', 'G'), _wgi),
+}
+
+
+def calc_index(
+        data: np.ndarray,
+        bandnames: List[str],
+        index: str,
+        out: np.ndarray = None,
+        work: np.ndarray = None,
+        flag: np.ndarray = None) -> np.ndarray:
+    """
+    Calculates a single index for a scene stack
+
+    :param data: float32 array with the dimensions (time, band, y, x)
+    :param bandnames: names of the bands in the second dimension of the data
+    :param index: name of the index, one of INDICES
+    :param out: optional, float32 array (time, y, x) in which the index is stored
+    :param work: optional, float32 work buffer (time, y, x), reused between calls to avoid allocations
+    :param flag: optional, boolean work buffer (time, y, x)
+    :return: array (time, y, x) with the index
+    """
+    if index not in INDICES:
+        raise ValueError(f'Unknown index: {index}, please use one of {", ".join(INDICES)}')
+
+    required, function = INDICES[index]
+    missing = [band for band in required if band not in bandnames]
+    if missing:
+        raise ValueError(f'the bands {missing} are required to calculate the {index}')
+
+    shape = (data.shape[0],) + data.shape[2:]
+    out = np.empty(shape, dtype=np.float32) if out is None else out
+    work = np.empty(shape, dtype=np.float32) if work is None else work
+    flag = np.empty(shape, dtype=bool) if flag is None else flag
+
+    bands = [data[:, bandnames.index(band)] for band in required]
+
+    return function(*bands, out, work, flag)
+
+
+def calc_indices(
+        data: np.ndarray,
+        bandnames: List[str],
+        indices: List[str],
+        out: np.ndarray = None,
+        mask: np.ndarray = None) -> np.ndarray:
+    """
+    Calculates several indices for a scene stack, sharing the work buffers between the indices
+
+    :param data: float32 array with the dimensions (time, band, y, x)
+    :param bandnames: names of the bands in the second dimension of the data
+    :param indices: names of the indices to calculate, see INDICES
+    :param out: optional, preallocated float32 array (time, index, y, x) in which the indices are stored
+    :param mask: optional, boolean array (time, y, x) which is True for valid pixels, other pixels are set to NaN
+    :return: array (time, index, y, x) with the indices in the order of the index names
+    """
+    shape = (data.shape[0],) + data.shape[2:]
+
+    if out is None:
+        out = np.empty((data.shape[0], len(indices)) + data.shape[2:], dtype=np.float32)
+
+    work = np.empty(shape, dtype=np.float32)
+    flag = np.empty(shape, dtype=bool)
+    invalid = None if mask is None else ~mask
+
+    for ind, index in enumerate(indices):
+        calc_index(data, bandnames, index, out[:, ind], work, flag)
+
+        if invalid is not None:
+            np.copyto(out[:, ind], np.nan, where=invalid)
+
+    return out
@@ -0,0 +1,241 @@
+"""
+Functions for the calibration of the one-vs-rest Linear Discriminant Analysis (LDA) used to select training areas. The
+discriminants are solved in closed form from the class statistics (counts, means and covariance matrices), so all
+classes are calibrated at once and the statistics can also be computed on the EE.
+
+The discriminants are scaled in the same way as the 'svd' solver of sklearn.discriminant_analysis
+.LinearDiscriminantAnalysis, i.e. the pooled within-class variance of the scores equals 1, so the thresholds remain
+comparable.
+"""
+
+import numpy as np
+
+from typing import Dict, List, Optional, Tuple
+
+
+def calc_class_statistics(X: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculates the number of samples, the mean and the covariance matrix of every class
+
+    :param X: 2-D array with a row for every sample and a column for every band
+    :param labels: 1-D array with the class of every sample
+    :return: class labels, counts (K), means (K x p) and covariance matrices with n - 1 as denominator (K x p x p)
+    """
+    X = np.asarray(X, dtype=np.float64)
+    classes, inverse, counts = np.unique(labels, return_inverse=True, return_counts=True)
+
+    means = np.zeros((len(classes), X.shape[1]))
+    np.add.at(means, inverse, X)
+    means /= counts[:, None]
+
+    centered = X - means[inverse]
+    covariances = np.stack([
+        centered[inverse == ind].T @ centered[inverse == ind] for ind in range(len(classes))
+    ]) / np.maximum(counts - 1, 1)[:, None, None]
+
+    return classes, counts, means, covariances
+
+
+def merge_class_statistics(
+        statistics: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merges the class statistics of several sets of samples, e.g. of different calibration years, into the statistics
+    of the combined samples
+
+    :param statistics: list with the class labels, counts, means and covariance matrices of every set of samples
+    :return: class labels, counts (K), means (K x p) and covariance matrices with n - 1 as denominator (K x p x p)
+    """
+    classes = np.unique(np.concatenate([labels for labels, _, _, _ in statistics]))
+    p = statistics[0][2].shape[1]
+
+    counts = np.zeros(len(classes))
+    sums = np.zeros((len(classes), p))
+    second_moments = np.zeros((len(classes), p, p))
+
+    for labels, set_counts, set_means, set_covariances in statistics:
+        ind = np.searchsorted(classes, labels)
+        set_counts = np.asarray(set_counts, dtype=np.float64)
+        set_means = np.asarray(set_means, dtype=np.float64)
+
+        # the sums of the values and of the outer products around the origin can simply be added
+        counts[ind] += set_counts
+        sums[ind] += set_counts[:, None] * set_means
+        second_moments[ind] += (set_counts - 1)[:, None, None] * np.asarray(set_covariances) + set_counts[
+            :, None, None] * np.einsum('ki,kj->kij', set_means, set_means)
+
+    means = sums / counts[:, None]
+    covariances = (second_moments - counts[:, None, None] * np.einsum('ki,kj->kij', means, means)) / np.maximum(
+        counts - 1, 1)[:, None, None]
+
+    return classes, counts, means, covariances
+
+
+def solve_one_vs_rest(
+        counts: np.ndarray,
+        means: np.ndarray,
+        covariances: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Solves the one-vs-rest discriminant of every class from the class statistics. For every target class the pooled
+    within-class scatter of the two-class problem is derived from the total scatter, after which all discriminants are
+    solved with a single batched call to np.linalg.solve.
+
+    The discriminants are oriented so the target class always has the higher scores, i.e. the training areas are the
+    pixels above the threshold. The sign of the sklearn discriminants was arbitrary instead, thresholds chosen for a
+    sklearn calibration in which the target class had the lower scores are converted with migrate_thresholds.
+
+    :param counts: number of samples of every class (K)
+    :param means: mean of every class (K x p)
+    :param covariances: covariance matrix of every class with n - 1 as denominator (K x p x p)
+    :return: dictionary with the coefficients (K x p), intercepts (K) and the pooled within-class covariance matrices
+     (K x p x p)
+    """
+    counts = np.asarray(counts, dtype=np.float64)
+    means = np.asarray(means, dtype=np.float64)
+    covariances = np.asarray(covariances, dtype=np.float64)
+
+    n = counts.sum()
+    total_mean = counts @ means / n
+
+    # total scatter = within-class scatter + between-class scatter of all classes
+    deviations = means - total_mean
+    total_scatter = np.einsum('k,kij->ij', counts - 1, covariances) + np.einsum(
+        'k,ki,kj->ij', counts, deviations, deviations)
+
+    # difference between the target class mean and the mean of the remaining classes
+    rest_counts = n - counts
+    differences = deviations * (n / rest_counts)[:, None]
+
+    between = (counts * rest_counts / n)[:, None, None] * np.einsum('ki,kj->kij', differences, differences)
+    pooled_covariance = (total_scatter[None] - between) / n
+
+    directions = np.linalg.solve(pooled_covariance, differences[..., None])[..., 0]
+    # the pooled covariance is positive definite, so differences @ directions > 0 and the target class scores higher
+    scale = np.sqrt(np.einsum('ki,ki->k', differences, directions))
+    coefficients = directions / scale[:, None]
+
+    # the scores are centered on the mean of all samples, like the transform of sklearn
+    intercepts = -coefficients @ total_mean
+
+    return {
+        'coefficients': coefficients,
+        'intercepts': intercepts,
+        'covariances': pooled_covariance,
+    }
+
+
+def calibrate_lda(X: np.ndarray, labels: np.ndarray) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """
+    Calibrates the one-vs-rest discriminants for all classes in the samples
+
+    :param X: 2-D array with a row for every sample and a column for every band
+    :param labels: 1-D array with the class of every sample
+    :return: class labels and the discriminants as returned by solve_one_vs_rest, in the order of the class labels
+    """
+    classes, counts, means, covariances = calc_class_statistics(X, labels)
+
+    return classes, solve_one_vs_rest(counts, means, covariances)
+
+
+def migrate_thresholds(thresholds: Dict[str, float], greater_than: Dict[str, bool]) -> Dict[str, float]:
+    """
+    Converts thresholds chosen for a sklearn based calibration to the closed form discriminants of solve_one_vs_rest.
+    Both discriminants have the same scaling and centering, only the sign of the sklearn discriminant was arbitrary. For
+    the classes in which the target class had the lower scores (greater_than False) the scores, and so the thresholds,
+    are negated.
+
+    :param thresholds: dictionary with the threshold of every class
+    :param greater_than: dictionary with the greater_than flag of every class in the sklearn calibration
+    :return: dictionary with the threshold of every class, to be used on the scores above the threshold
+    """
+    return {key: threshold if greater_than[key] else -threshold for key, threshold in thresholds.items()}
+
+
+def optimize_threshold(
+        scores: np.ndarray,
+        is_target: np.ndarray,
+        greater_than: bool = True,
+        objective: str = 'youden',
+        target_precision: float = 0.95) -> Dict[str, Optional[float]]:
+    """
+    Finds the threshold on the LDA scores that best separates the target class from the other classes. The scores are
+    sorted once, after which the confusion counts of every possible threshold follow from cumulative sums. The
+    threshold is placed halfway between the scores on either side of the best cut.
+
+    :param scores: 1-D array with the LDA scores of the samples
+    :param is_target: 1-D boolean array indicating the samples of the target class
+    :param greater_than: if True the samples with a score above the threshold are selected, otherwise below it
+    :param objective: 'youden' to maximize Youden's J (recall - false positive rate), 'f1' to maximize the F1 score or
+     'precision' to maximize the recall while keeping the precision at or above the target precision
+    :param target_precision: minimum precision for the 'precision' objective
+    :return: dictionary with the threshold, the value of the objective and the precision and recall at the threshold.
+     If no threshold reaches the target precision, the threshold, objective and recall are None and the precision is
+     the highest precision of any threshold.
+    """
+    if objective not in ['youden', 'f1', 'precision']:
+        raise ValueError(f'Unknown objective: {objective}, please use youden, f1 or precision')
+
+    sign = 1 if greater_than else -1
+    scores = sign * np.asarray(scores, dtype=np.float64)
+    is_target = np.asarray(is_target, dtype=bool)
+
+    order = np.argsort(-scores, kind='stable')  # descending, selecting the first i samples equals a threshold
+    sorted_scores = scores[order]
+
+    true_positives = np.cumsum(is_target[order])
+    false_positives = np.arange(1, len(scores) + 1) - true_positives
+    positives = true_positives[-1]
+    negatives = len(scores) - positives
+
+    # only cuts between different scores can be made with a threshold
+    cuts = np.flatnonzero(np.append(sorted_scores[1:] != sorted_scores[:-1], True))
+    true_positives = true_positives[cuts]
+    false_positives = false_positives[cuts]
+
+    recall = true_positives / max(positives, 1)
+    precision = true_positives / (true_positives + false_positives)
+
+    if objective == 'youden':
+        values = recall - false_positives / max(negatives, 1)
+    elif objective == 'f1':
+        values = 2 * true_positives / (2 * true_positives + false_positives + (positives - true_positives))
+    else:
+        attainable = precision >= target_precision
+        if not attainable.any():
+            return {'threshold': None, 'objective': None, 'precision': float(precision.max()), 'recall': None}
+
+        values = np.where(attainable, recall, -np.inf)
+
+    best = int(np.argmax(values))
+    cut = cuts[best]
+
+    if cut + 1 < len(sorted_scores):
+        threshold = (sorted_scores[cut] + sorted_scores[cut + 1]) / 2
+    else:
+        threshold = sorted_scores[cut]
+
+    return {
+        'threshold': float(sign * threshold),
+        'objective': float(values[best]),
+        'precision': float(precision[best]),
+        'recall': float(recall[best]),
+    }
+
+
+def optimize_thresholds(
+        lda_scores: Dict[str, Tuple[np.ndarray, np.ndarray, bool]],
+        objective: str = 'youden',
+        target_precision: float = 0.95) -> Dict[str, Dict[str, Optional[float]]]:
+    """
+    Finds the optimal threshold for several classes, e.g. all classes of both seasons, see optimize_threshold
+
+    :param lda_scores: dictionary with a tuple of the scores, the boolean target array and the greater_than flag for
+     every class
+    :param objective: 'youden', 'f1' or 'precision'
+    :param target_precision: minimum precision for the 'precision' objective
+    :return: dictionary with the result of optimize_threshold for every class
+    """
+    return {
+        key: optimize_threshold(scores, is_target, greater_than, objective, target_precision)
+        for key, (scores, is_target, greater_than) in lda_scores.items()
+    }
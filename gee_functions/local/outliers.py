@@ -0,0 +1,128 @@
+"""
+Functions for the removal of outliers from sample tables held in NumPy arrays. Outliers are samples with a value in any
+band outside of the range [q_lower - 1.5 * iqr, q_upper + 1.5 * iqr], where the inter quantile range (iqr) is the
+difference between the upper and lower quantile of the band.
+"""
+
+import numpy as np
+
+from typing import Tuple
+
+
+def calc_quantiles(values: np.ndarray, quantiles: Tuple[float, ...]) -> np.ndarray:
+    """
+    Calculates quantiles of a 1-D array with np.partition, using the same linear interpolation as pandas and
+    np.quantile. Missing values are ignored.
+
+    :param values: 1-D array
+    :param quantiles: quantiles to calculate, between 0 and 1
+    :return: array with the values of the quantiles
+    """
+    values = values[~np.isnan(values)]
+
+    if len(values) == 0:
+        return np.full(len(quantiles), np.nan)
+
+    positions = np.asarray(quantiles, dtype=np.float64) * (len(values) - 1)
+    lower = np.floor(positions).astype(int)
+    upper = np.ceil(positions).astype(int)
+
+    partitioned = np.partition(values, np.unique(np.concatenate([lower, upper])))
+    lower_values = partitioned[lower].astype(np.float64)
+    upper_values = partitioned[upper].astype(np.float64)
+
+    return lower_values + (upper_values - lower_values) * (positions - lower)
+
+
+def calc_outlier_mask(
+        values: np.ndarray,
+        lower_quantile: float = 0.05,
+        upper_quantile: float = 0.95,
+        bounds: np.ndarray = None) -> np.ndarray:
+    """
+    Determines which samples are not outliers. The values are copied once into column-major order, after which every
+    band is processed as a contiguous block.
+
+    :param values: 2-D array with a row for every sample and a column for every band, e.g. float32
+    :param lower_quantile: lower quantile, between 0 and 1
+    :param upper_quantile: upper quantile, between 0 and 1
+    :param bounds: optional, array (2 x bands) with the lower and upper limit of every band, as returned by
+     calc_outlier_bounds. If None the limits are calculated from the values
+    :return: 1-D boolean array, True for the samples to keep
+    """
+    values = np.asfortranarray(values)
+    keep = np.ones(values.shape[0], dtype=bool)
+
+    for band in range(values.shape[1]):
+        column = values[:, band]
+
+        if bounds is None:
+            q1, q3 = calc_quantiles(column, (lower_quantile, upper_quantile))
+            lower_bound, upper_bound = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        else:
+            lower_bound, upper_bound = bounds[:, band]
+
+        # comparisons with missing values are False, so like in pandas samples are not removed for missing values
+        keep &= ~((column < lower_bound) | (column > upper_bound))
+
+    return keep
+
+
+def calc_outlier_bounds(
+        values: np.ndarray,
+        lower_quantile: float = 0.05,
+        upper_quantile: float = 0.95) -> np.ndarray:
+    """
+    Calculates the limits outside of which samples are considered outliers
+
+    :param values: 2-D array with a row for every sample and a column for every band
+    :param lower_quantile: lower quantile, between 0 and 1
+    :param upper_quantile: upper quantile, between 0 and 1
+    :return: array (2 x bands) with the lower and upper limit of every band
+    """
+    quantiles = np.stack([calc_quantiles(values[:, band], (lower_quantile, upper_quantile))
+                          for band in range(values.shape[1])], axis=1)
+    iqr = quantiles[1] - quantiles[0]
+
+    return np.stack([quantiles[0] - 1.5 * iqr, quantiles[1] + 1.5 * iqr])
+
+
+def calc_outlier_mask_chunked(
+        values: np.ndarray,
+        lower_quantile: float = 0.05,
+        upper_quantile: float = 0.95,
+        chunk_rows: int = 100000,
+        sample_size: int = 200000,
+        seed: int = 0) -> np.ndarray:
+    """
+    Determines which samples are not outliers for tables that do not fit in memory, e.g. a memory mapped .npy file
+    loaded with np.load(..., mmap_mode='r'). The table is read in chunks of rows twice: the first pass draws a random
+    sample of rows from which approximate quantiles are calculated, the second pass applies the limits to all rows.
+
+    :param values: 2-D (memory mapped) array with a row for every sample and a column for every band
+    :param lower_quantile: lower quantile, between 0 and 1
+    :param upper_quantile: upper quantile, between 0 and 1
+    :param chunk_rows: number of rows to read at once
+    :param sample_size: approximate number of rows used to estimate the quantiles
+    :param seed: seed for the random sample
+    :return: 1-D boolean array, True for the samples to keep, empty for a table without rows
+    """
+    no_of_rows = values.shape[0]
+    if no_of_rows == 0:
+        return np.ones(0, dtype=bool)
+
+    fraction = min(1., sample_size / max(no_of_rows, 1))
+    rng = np.random.default_rng(seed)
+
+    sample = []
+    for start in range(0, no_of_rows, chunk_rows):
+        chunk = np.asarray(values[start:start + chunk_rows])
+        sample.append(chunk[rng.random(len(chunk)) < fraction])
+
+    bounds = calc_outlier_bounds(np.concatenate(sample), lower_quantile, upper_quantile)
+
+    keep = np.empty(no_of_rows, dtype=bool)
+    for start in range(0, no_of_rows, chunk_rows):
+        keep[start:start + chunk_rows] = calc_outlier_mask(np.asarray(values[start:start + chunk_rows]), bounds=bounds)
+
+    return keep
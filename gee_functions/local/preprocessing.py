@@ -0,0 +1,279 @@
+"""
+Local counterparts of the Landsat and Sentinel-2 preprocessing in landsat.py and sentinel.py, for scene arrays downloaded
+from the EE. The QA bit tests are combined into one validity mask per scene and the digital numbers are scaled into
+float32 buffers in place. Scenes are processed in chunks, so the peak memory use is bounded by the size of one chunk,
+and every chunk has the (time, band, y, x) layout used by local.indices.
+
+A synthetic QA generator is included to check the masking without downloading scenes.
+"""
+
+import numpy as np
+
+from typing import Callable, Iterable, Iterator, List, Sequence, Tuple
+
+# QA_PIXEL bits of the Landsat collection 2 products: fill (0), dilated cloud (1), cirrus (2), cloud (3) and cloud
+# shadow (4), see preprocess_landsat
+LANDSAT_QA_PIXEL_MASK = 0b11111
+
+# pixel_qa bits of the Landsat collection 1 products used by cloud_mask_ls457 and cloud_mask_ls8
+LANDSAT_CLOUD_SHADOW_BIT = 1 << 3
+LANDSAT_CLOUD_BIT = 1 << 5
+LANDSAT_CLOUD_CONFIDENCE_BIT = 1 << 7
+
+# QA60 bits of Sentinel-2: opaque clouds (10) and cirrus (11), see s2_cloudmask
+S2_QA60_MASK = (1 << 10) | (1 << 11)
+
+# scale factor and offset of the surface reflectance (SR_B*) and surface temperature (ST_B*) bands of collection 2
+LANDSAT_SCALE_FACTORS = {
+    'SR': (2.75e-05, -0.2),
+    'ST': (0.00341802, 149.0),
+}
+S2_SCALE_FACTOR = 0.0001
+
+
+def calc_bit_mask(qa: np.ndarray, bit_mask: int, out: np.ndarray = None) -> np.ndarray:
+    """
+    Tests the QA bits of a scene, valid pixels have none of the bits in the bit mask set
+
+    :param qa: integer array with the QA values
+    :param bit_mask: integer with the bits to test
+    :param out: optional, boolean array in which the mask is stored
+    :return: boolean array which is True for valid pixels
+    """
+    return np.equal(np.bitwise_and(qa, bit_mask), 0, out=out)
+
+
+def calc_landsat_mask(qa_pixel: np.ndarray, qa_radsat: np.ndarray = None, out: np.ndarray = None) -> np.ndarray:
+    """
+    Calculates the validity mask of a Landsat collection 2 scene like preprocess_landsat: fill, clouds, cirrus and cloud
+    shadows are masked using QA_PIXEL and saturated pixels using QA_RADSAT
+
+    :param qa_pixel: integer array with the QA_PIXEL band
+    :param qa_radsat: optional, integer array with the QA_RADSAT band
+    :param out: optional, boolean array in which the mask is stored
+    :return: boolean array which is True for valid pixels
+    """
+    out = calc_bit_mask(qa_pixel, LANDSAT_QA_PIXEL_MASK, out)
+
+    if qa_radsat is not None:
+        out &= qa_radsat == 0
+
+    return out
+
+
+def cloud_mask_ls457(pixel_qa: np.ndarray) -> np.ndarray:
+    """
+    Calculates the validity mask of a Landsat 4, 5 or 7 collection 1 scene like cloud_mask_ls457: pixels with a cloud of
+    high confidence, a cloud shadow or the pixel_qa value 96 are masked
+
+    :param pixel_qa: integer array with the pixel_qa band
+    :return: boolean array which is True for valid pixels
+    """
+    cloud = np.bitwise_and(pixel_qa, LANDSAT_CLOUD_BIT | LANDSAT_CLOUD_CONFIDENCE_BIT) == (
+            LANDSAT_CLOUD_BIT | LANDSAT_CLOUD_CONFIDENCE_BIT)
+    cloud |= np.bitwise_and(pixel_qa, LANDSAT_CLOUD_SHADOW_BIT) != 0
+
+    return ~cloud & (pixel_qa != 96)
+
+
+def cloud_mask_ls8(pixel_qa: np.ndarray) -> np.ndarray:
+    """
+    Calculates the validity mask of a Landsat 8 collection 1 scene like cloud_mask_ls8: pixels with a cloud or cloud
+    shadow are masked
+
+    :param pixel_qa: integer array with the pixel_qa band
+    :return: boolean array which is True for valid pixels
+    """
+    return calc_bit_mask(pixel_qa, LANDSAT_CLOUD_SHADOW_BIT | LANDSAT_CLOUD_BIT)
+
+
+def cloud_mask_s2(qa60: np.ndarray) -> np.ndarray:
+    """
+    Calculates the validity mask of a Sentinel-2 scene like s2_cloudmask: opaque clouds and cirrus are masked
+
+    :param qa60: integer array with the QA60 band
+    :return: boolean array which is True for valid pixels
+    """
+    return calc_bit_mask(qa60, S2_QA60_MASK)
+
+
+def get_landsat_scale_factors(bandnames: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the scale factors and offsets of Landsat collection 2 bands, based on the prefix of the band names
+
+    :param bandnames: names of the bands, e.g. ['SR_B2', 'SR_B3', 'ST_B10']
+    :return: float32 arrays with the scale factor and offset of every band
+    """
+    factors = []
+    for band in bandnames:
+        prefix = band.split('_')[0]
+        if prefix not in LANDSAT_SCALE_FACTORS:
+            raise ValueError(f'No scale factors for band {band}, only SR_B* and ST_B* bands can be scaled')
+        factors.append(LANDSAT_SCALE_FACTORS[prefix])
+
+    scale, offset = np.array(factors, dtype=np.float32).T
+
+    return scale, offset
+
+
+def scale_scene(
+        data: np.ndarray,
+        scale: np.ndarray,
+        offset: np.ndarray = None,
+        mask: np.ndarray = None,
+        out: np.ndarray = None) -> np.ndarray:
+    """
+    Converts the digital numbers of a scene to float32 values in place, invalid pixels become NaN
+
+    :param data: integer array with the dimensions (band, y, x)
+    :param scale: scale factor of every band, or a single scale factor for all bands
+    :param offset: optional, offset of every band
+    :param mask: optional, boolean array (y, x) which is True for valid pixels
+    :param out: optional, float32 array (band, y, x) in which the scaled values are stored
+    :return: float32 array (band, y, x)
+    """
+    if out is None:
+        out = np.empty(data.shape, dtype=np.float32)
+
+    np.multiply(data, np.asarray(scale, dtype=np.float32).reshape(-1, 1, 1), out=out)
+
+    if offset is not None:
+        out += np.asarray(offset, dtype=np.float32).reshape(-1, 1, 1)
+
+    if mask is not None:
+        np.copyto(out, np.nan, where=~mask[None])
+
+    return out
+
+
+def iter_scene_chunks(
+        scenes: Iterable[Tuple[np.ndarray, ...]],
+        calc_mask: Callable[..., np.ndarray],
+        scale: np.ndarray,
+        offset: np.ndarray = None,
+        chunk_size: int = 8) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Masks and scales a stream of scenes, collecting them in chunks. Only one chunk of scaled scenes is held in memory
+    at a time, provided that the scenes themselves are read lazily, e.g. from a generator reading files.
+
+    :param scenes: iterable with for every scene a tuple of the integer data (band, y, x) and the QA arrays (y, x)
+    :param calc_mask: function calculating the validity mask from the QA arrays of a scene
+    :param scale: scale factor of every band
+    :param offset: optional, offset of every band
+    :param chunk_size: maximum number of scenes in a chunk
+    :return: generator with for every chunk a float32 array (time, band, y, x) and the validity mask (time, y, x)
+    """
+    chunk = None
+    mask = None
+    no_of_scenes = 0
+
+    for data, *qa in scenes:
+        if chunk is None:
+            chunk = np.empty((chunk_size,) + data.shape, dtype=np.float32)
+            mask = np.empty((chunk_size,) + data.shape[1:], dtype=bool)
+
+        mask[no_of_scenes] = calc_mask(*qa)
+        scale_scene(data, scale, offset, mask[no_of_scenes], chunk[no_of_scenes])
+        no_of_scenes += 1
+
+        if no_of_scenes == chunk_size:
+            yield chunk, mask
+            # new buffers, so chunks kept by the caller are not overwritten
+            chunk, mask, no_of_scenes = None, None, 0
+
+    if no_of_scenes > 0:
+        yield chunk[:no_of_scenes], mask[:no_of_scenes]
+
+
+def iter_landsat_chunks(
+        scenes: Iterable[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        bandnames: List[str],
+        chunk_size: int = 8) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Preprocesses a stream of Landsat collection 2 scenes like preprocess_landsat, see iter_scene_chunks
+
+    :param scenes: iterable with a tuple of the integer data (band, y, x), QA_PIXEL (y, x) and QA_RADSAT (y, x)
+    :param bandnames: names of the bands in the data, e.g. ['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7']
+    :param chunk_size: maximum number of scenes in a chunk
+    :return: generator with for every chunk a float32 array (time, band, y, x) and the validity mask (time, y, x)
+    """
+    scale, offset = get_landsat_scale_factors(bandnames)
+
+    return iter_scene_chunks(scenes, calc_landsat_mask, scale, offset, chunk_size)
+
+
+def iter_s2_chunks(
+        scenes: Iterable[Tuple[np.ndarray, np.ndarray]],
+        chunk_size: int = 8) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Preprocesses a stream of Sentinel-2 scenes like s2_cloudmask and scale_data, see iter_scene_chunks
+
+    :param scenes: iterable with a tuple of the integer data (band, y, x) and QA60 (y, x)
+    :param chunk_size: maximum number of scenes in a chunk
+    :return: generator with for every chunk a float32 array (time, band, y, x) and the validity mask (time, y, x)
+    """
+    return iter_scene_chunks(scenes, cloud_mask_s2, S2_SCALE_FACTOR, None, chunk_size)
+
+
+def create_synthetic_landsat_qa(
+        shape: Tuple[int, ...],
+        cloud_fraction: float = 0.2,
+        shadow_fraction: float = 0.05,
+        fill_fraction: float = 0.02,
+        saturation_fraction: float = 0.01,
+        seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Creates synthetic QA_PIXEL and QA_RADSAT bands to test the masking. Besides the masked conditions, bits that should
+    not mask a pixel (clear, water, snow and the confidence bits) are set at random.
+
+    :param shape: shape of the QA bands, e.g. (y, x) or (time, y, x)
+    :param cloud_fraction: fraction of pixels with a cloud, dilated cloud or cirrus
+    :param shadow_fraction: fraction of pixels with a cloud shadow
+    :param fill_fraction: fraction of fill pixels
+    :param saturation_fraction: fraction of pixels saturated in at least one band
+    :param seed: seed of the random generator
+    :return: QA_PIXEL and QA_RADSAT (uint16) and the expected validity mask
+    """
+    rng = np.random.default_rng(seed)
+
+    # snow (5), clear (6), water (7) and the confidence bits (8-15) do not mask pixels
+    qa_pixel = (rng.integers(0, 1 << 16, shape, dtype=np.uint16) & ~np.uint16(LANDSAT_QA_PIXEL_MASK)).astype(np.uint16)
+
+    cloud = rng.random(shape) < cloud_fraction
+    qa_pixel[cloud] |= rng.choice(np.array([1 << 1, 1 << 2, 1 << 3], dtype=np.uint16), cloud.sum())
+    shadow = rng.random(shape) < shadow_fraction
+    qa_pixel[shadow] |= np.uint16(1 << 4)
+    fill = rng.random(shape) < fill_fraction
+    qa_pixel[fill] |= np.uint16(1)
+
+    saturated = rng.random(shape) < saturation_fraction
+    qa_radsat = np.zeros(shape, dtype=np.uint16)
+    qa_radsat[saturated] = rng.integers(1, 1 << 9, saturated.sum(), dtype=np.uint16)
+
+    return qa_pixel, qa_radsat, ~(cloud | shadow | fill | saturated)
+
+
+def create_synthetic_s2_qa(
+        shape: Tuple[int, ...],
+        cloud_fraction: float = 0.2,
+        cirrus_fraction: float = 0.05,
+        seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Creates a synthetic QA60 band to test the masking
+
+    :param shape: shape of the QA band, e.g. (y, x) or (time, y, x)
+    :param cloud_fraction: fraction of pixels with an opaque cloud
+    :param cirrus_fraction: fraction of pixels with cirrus
+    :param seed: seed of the random generator
+    :return: QA60 (uint16) and the expected validity mask
+    """
+    rng = np.random.default_rng(seed)
+
+    cloud = rng.random(shape) < cloud_fraction
+    cirrus = rng.random(shape) < cirrus_fraction
+
+    qa60 = np.zeros(shape, dtype=np.uint16)
+    qa60[cloud] |= np.uint16(1 << 10)
+    qa60[cirrus] |= np.uint16(1 << 11)
+
+    return qa60, ~(cloud | cirrus)
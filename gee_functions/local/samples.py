@@ -0,0 +1,171 @@
+"""
+Storage of the calibration samples in memory, so the data to calibrate the LDA of every target class is served without
+reading the sample file again
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from typing import Dict, List, Tuple
+
+from .outliers import calc_outlier_mask
+
+
+def find_sample_file(data_loc: str) -> str:
+    """
+    Finds the file containing the samples. If data_loc has no extension a Parquet file is preferred over a CSV file,
+    unless the CSV file is newer.
+
+    :param data_loc: path to the sample file, with or without extension
+    :return: path to the sample file
+    """
+    data_loc = str(data_loc)
+
+    if data_loc.endswith(('.csv', '.parquet')):
+        return data_loc
+
+    parquet_file, csv_file = f'{data_loc}.parquet', f'{data_loc}.csv'
+
+    if os.path.exists(parquet_file) and (
+            not os.path.exists(csv_file) or os.path.getmtime(parquet_file) >= os.path.getmtime(csv_file)):
+        return parquet_file
+    return csv_file
+
+
+class SampleStore:
+    """
+    Holds the calibration samples in memory as a float32 array, so the sample file is read only once for all target
+    classes. The rows without missing values and without outliers are determined once for every set of bands, after
+    which the data for each target class is served from this filtered table.
+
+    Sample files in CSV format can be converted into a Parquet file with convert_sample_file, which is read considerably
+    faster.
+    """
+
+    def __init__(self, data_loc: str):
+        """
+        :param data_loc: path to the sample file, with or without extension (see find_sample_file)
+        """
+        path = find_sample_file(data_loc)
+
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path)
+
+        self.bandnames = [
+            col for col in df.columns
+            if col not in ['lc', 'class', 'year', 'lc_bin'] and pd.api.types.is_numeric_dtype(df[col])
+        ]
+        df = df[self.bandnames + ['lc', 'class']].astype({band: np.float32 for band in self.bandnames})
+
+        self.values = df[self.bandnames].to_numpy()
+        self.lc = df['lc'].to_numpy()
+        self.classes = df['class'].to_numpy()
+        self._filtered = {}
+
+    def get_filtered(self, bandnames: List[str]) -> pd.DataFrame:
+        """
+        Returns the values of the bands for the rows without missing values and outliers. The result is computed once
+        for every set of bands.
+
+        :param bandnames: names of the bands to include
+        :return: Pandas dataframe with the band values, the index contains the row numbers in the sample file. The
+         values are shared with the stored result and are read-only, replacing columns does not affect the next call.
+        """
+        key = tuple(bandnames)
+
+        if key not in self._filtered:
+            values = self.values[:, [self.bandnames.index(band) for band in bandnames]]
+            rows = np.flatnonzero(~np.isnan(values).any(axis=1))
+            rows = rows[calc_outlier_mask(values[rows])]
+
+            values = values[rows]
+            values.setflags(write=False)
+            self._filtered[key] = pd.DataFrame(values, columns=bandnames, index=rows, copy=False)
+
+        return self._filtered[key].copy(deep=False)
+
+    def get_data(
+            self,
+            bandnames: List[str],
+            target_class: str,
+            subsample_other: bool = True,
+            n_other: int = 2000,
+            random_state: int = 1) -> (pd.DataFrame, pd.DataFrame):
+        """
+        Returns the data to calibrate the LDA for a target class
+
+        :param bandnames: names of the bands to include, bands that are not in the samples are ignored
+        :param target_class: name of the class to separate from the other classes
+        :param subsample_other: if True the samples of the target class are returned together with a random selection
+         of n_other samples of every land cover value, otherwise all samples are returned and the band values are not
+         copied
+        :param n_other: number of samples to select from every land cover value
+        :param random_state: seed for the random selection
+        :return: Pandas dataframe with the band values, Pandas dataframe with the 'lc', 'lc_bin' and 'class' columns
+        """
+        bandnames = [band for band in bandnames if band in self.bandnames]
+        X = self.get_filtered(bandnames)
+
+        rows = X.index.to_numpy()
+        target = self.classes[rows] == target_class
+
+        if subsample_other:
+            # The land cover values of the target class are sampled as well, as in the sample selection of the sklearn
+            # calibrations the default thresholds were chosen on (see constants.LEGACY_SUMMER_THRESHOLDS). These samples
+            # keep lc_bin 1, so n_other samples of the target class occur twice.
+            other = pd.DataFrame({'lc': self.lc[rows]})
+            selected = other.groupby('lc').sample(n=n_other, random_state=random_state).index.to_numpy()
+            positions = np.concatenate([np.flatnonzero(target), selected])
+
+            X = X.iloc[positions]
+            rows = rows[positions]
+            target = target[positions]
+
+        y = pd.DataFrame(
+            {'lc': self.lc[rows], 'lc_bin': target.astype(np.int64), 'class': self.classes[rows]},
+            index=X.index,
+        )
+
+        return X, y
+
+
+def convert_sample_file(csv_file: str, parquet_file: str = None) -> str:
+    """
+    Converts a sample file in CSV format into a Parquet file. If the samples are loaded without extension, the Parquet
+    file is used as long as it is not older than the CSV file, see find_sample_file.
+
+    :param csv_file: path to the CSV file
+    :param parquet_file: optional, path to the Parquet file, defaults to the path of the CSV file with the .parquet
+     extension
+    :return: path to the Parquet file
+    """
+    if parquet_file is None:
+        parquet_file = f'{os.path.splitext(csv_file)[0]}.parquet'
+
+    pd.read_csv(csv_file).to_parquet(parquet_file, index=False)
+
+    return parquet_file
+
+
+# sample stores per path, with the modification time of the file when it was read
+_SAMPLE_STORES: Dict[str, Tuple[float, SampleStore]] = {}
+
+
+def load_sample_store(data_loc: str) -> SampleStore:
+    """
+    Returns the SampleStore for a sample file, the file is only read again if it was modified since it was last read
+
+    :param data_loc: path to the sample file, with or without extension
+    :return: SampleStore
+    """
+    path = find_sample_file(data_loc)
+    modified = os.path.getmtime(path)
+
+    if path not in _SAMPLE_STORES or _SAMPLE_STORES[path][0] != modified:
+        _SAMPLE_STORES[path] = (modified, SampleStore(path))
+
+    return _SAMPLE_STORES[path][1]
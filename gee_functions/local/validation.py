@@ -0,0 +1,223 @@
+"""
+Functions used for the offline validation of irrigated area maps using validation polygons stored in local files
+(GeoPackage, GeoJSON, Shapefile). The irrigated area map is expected to be downloaded from the EE as a GeoTIFF.
+"""
+
+import numpy as np
+import geopandas as gpd
+import rasterio
+import shapely
+from rasterio import features, windows
+from shapely.geometry import box
+from shapely.strtree import STRtree
+
+from typing import List, Tuple, Union
+
+
+def load_validation_polygons(
+        path: str,
+        aoi: Union[str, gpd.GeoDataFrame] = None,
+        layer: str = None,
+        crs: str = None) -> gpd.GeoDataFrame:
+    """
+    Loads validation polygons from a local file, keeping only the polygons intersecting the area of interest. The
+    polygons are prefiltered using an STRtree spatial index, so polygons far away from the AOI are never tested against
+    its (detailed) outline.
+
+    :param path: path to the file containing the validation polygons
+    :param aoi: optional, path to a file or GeoDataFrame containing the area of interest
+    :param layer: optional, layer of the file to load, e.g. for GeoPackages containing multiple layers
+    :param crs: optional, projection to convert the polygons to, e.g. the projection of the irrigated area map
+    :return: GeoDataFrame with the validation polygons
+    """
+    polygons = gpd.read_file(path, layer=layer)
+
+    if crs is not None:
+        polygons = polygons.to_crs(crs)
+
+    if aoi is not None:
+        if isinstance(aoi, str):
+            aoi = gpd.read_file(aoi)
+        aoi_geometry = aoi.to_crs(polygons.crs).union_all()
+
+        tree = STRtree(polygons.geometry.values)
+        polygons = polygons.iloc[np.sort(tree.query(aoi_geometry, predicate='intersects'))]
+
+    return polygons.reset_index(drop=True)
+
+
+def sample_polygons(
+        polygons: gpd.GeoDataFrame,
+        fraction: float = .2,
+        max_area: int = 100000,
+        min_area: int = 10000,
+        seed: int = 0) -> gpd.GeoDataFrame:
+    """
+    Samples polygons based on their area, the local counterpart of validation.sample_feature_collection. The polygons
+    are expected to be in a projected coordinate system with meters as unit.
+
+    :param polygons: GeoDataFrame containing the polygons to be sampled
+    :param fraction: fraction of the total number of features to extract
+    :param max_area: maximum size limit for polygons in square meters
+    :param min_area: minimum size limit for polygons in square meters
+    :param seed: seed for the random selection
+    :return: GeoDataFrame containing a sample of the polygons
+    """
+    polygons = polygons.assign(area=polygons.geometry.area)
+    polygons = polygons[(polygons['area'] <= max_area) & (polygons['area'] >= min_area)]
+
+    random = np.random.default_rng(seed).random(len(polygons))
+
+    return polygons[random <= fraction].reset_index(drop=True)
+
+
+def assign_polygon_layers(polygons: gpd.GeoDataFrame) -> np.ndarray:
+    """
+    Assigns the polygons to layers in which none of the polygons overlap, so overlapping polygons are rasterized
+    separately instead of overwriting each other. Polygons that only share a border do not overlap.
+
+    :param polygons: GeoDataFrame with the polygons
+    :return: 1-D array with the layer of every polygon
+    """
+    geometries = polygons.geometry.values
+    layers = np.zeros(len(polygons), dtype=np.int64)
+
+    first, second = STRtree(geometries).query(geometries, predicate='intersects')
+    pairs = (first < second)
+    first, second = first[pairs], second[pairs]
+    overlapping = ~shapely.touches(geometries[first], geometries[second])
+    first, second = first[overlapping], second[overlapping]
+
+    # each polygon gets the lowest layer not used by the overlapping polygons before it
+    for ind in np.unique(second):
+        used = layers[first[second == ind]]
+        layers[ind] = np.setdiff1d(np.arange(len(used) + 1), used)[0]
+
+    return layers
+
+
+def rasterize_polygons(
+        polygons: gpd.GeoDataFrame,
+        transform: rasterio.Affine,
+        shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Burns the polygon IDs onto a raster grid. Pixels are assigned to a polygon if their center lies within it, which
+    matches the pixel selection of the unweighted EE reducers, e.g. the count of validation.calc_validation_score.
+    Overlapping polygons are burned onto separate layers (see assign_polygon_layers), so a pixel can belong to several
+    polygons, as with a reduceRegion per polygon. Pixels outside of the polygons have the value 0, the pixels within a
+    polygon have the position of the polygon in the GeoDataFrame plus one.
+
+    :param polygons: GeoDataFrame with the polygons, in the projection of the raster grid
+    :param transform: affine transformation of the raster grid
+    :param shape: number of rows and columns of the raster grid
+    :return: 3-D array containing the polygon IDs, with at least one layer
+    """
+    if len(polygons) == 0:
+        return np.zeros((1,) + tuple(shape), dtype=np.int32)
+
+    layers = assign_polygon_layers(polygons)
+    polygon_ids = np.zeros((layers.max() + 1,) + tuple(shape), dtype=np.int32)
+
+    for layer in range(len(polygon_ids)):
+        positions = np.flatnonzero(layers == layer)
+        features.rasterize(
+            zip(polygons.geometry.values[positions], positions + 1),
+            out=polygon_ids[layer],
+            transform=transform,
+            fill=0,
+        )
+
+    return polygon_ids
+
+
+def calc_validation_scores(
+        binary: np.ndarray,
+        polygon_ids: np.ndarray,
+        no_of_polygons: int,
+        valid: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calculates the number of pixels, the number of irrigated pixels and the score for all polygons at once using
+    np.bincount over the polygon IDs.
+
+    The EE sum reducer used by validation.calc_validation_score weights the pixels by the fraction of the pixel covered
+    by the polygon, while the count reducer counts the pixels with their center in the polygon. Here both are counted by
+    pixel center, so the irrigated pixels of polygons with partially irrigated border pixels can differ from the EE.
+
+    :param binary: 2-D array, with 1 representing irrigated areas and 0 non-irrigated areas
+    :param polygon_ids: 2-D or 3-D array with the polygon IDs, as returned by rasterize_polygons
+    :param no_of_polygons: number of polygons
+    :param valid: optional, 2-D boolean array indicating the pixels with valid data
+    :return: arrays with the total pixels, irrigated pixels and score for each polygon
+    """
+    binary = np.broadcast_to(binary, polygon_ids.shape)
+
+    if valid is None:
+        ids = polygon_ids.ravel()
+        values = binary.ravel()
+    else:
+        valid = np.broadcast_to(valid, polygon_ids.shape)
+        ids = polygon_ids[valid]
+        values = binary[valid]
+
+    total_pixels = np.bincount(ids, minlength=no_of_polygons + 1)[1:]
+    irrigated_pixels = np.bincount(ids, weights=values, minlength=no_of_polygons + 1)[1:]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = np.minimum(np.round(irrigated_pixels) / total_pixels, 1)
+
+    return total_pixels, irrigated_pixels, scores
+
+
+def validate_irrigated_area(
+        irrigated_area_path: str,
+        polygons: gpd.GeoDataFrame,
+        ia_classes: List[int],
+        band: int = 1) -> Tuple[float, gpd.GeoDataFrame]:
+    """
+    Calculates the validation score of an irrigated area map for a set of validation polygons, the local counterpart of
+    validation.calc_validation_score. Only the window of the map covering the polygons is read. Polygons outside of the
+    map are dropped, if no polygons remain the score is NaN.
+
+    :param irrigated_area_path: path to the raster containing the irrigated area map, e.g. the 'ia_year' band
+    :param polygons: GeoDataFrame containing the validation polygons
+    :param ia_classes: pixel values of the irrigated area classes that count as irrigated
+    :param band: band of the raster containing the irrigated area classes
+    :return: mean validation score and the polygons with the total pixels, irrigated pixels and score added
+    """
+    with rasterio.open(irrigated_area_path) as src:
+        polygons = polygons.to_crs(src.crs)
+
+        # polygons outside of the map, or only touching its border, can not be validated
+        map_bounds = box(*src.bounds)
+        polygons = polygons[polygons.intersects(map_bounds) & ~polygons.touches(map_bounds)].reset_index(drop=True)
+
+        if len(polygons) == 0:
+            return np.nan, polygons.assign(total_pixels=np.zeros(0, dtype=np.int64), irrigated_pixels=np.zeros(0),
+                                           score=np.zeros(0))
+
+        # window of whole pixels covering all the polygons
+        bounds = windows.from_bounds(*polygons.total_bounds, transform=src.transform)
+        col_off, row_off = int(np.floor(bounds.col_off)), int(np.floor(bounds.row_off))
+        window = windows.Window(
+            col_off,
+            row_off,
+            int(np.ceil(bounds.col_off + bounds.width)) - col_off,
+            int(np.ceil(bounds.row_off + bounds.height)) - row_off,
+        ).intersection(windows.Window(0, 0, src.width, src.height))
+
+        irrigated_area = src.read(band, window=window, masked=True)
+        transform = src.window_transform(window)
+
+    polygon_ids = rasterize_polygons(polygons, transform, irrigated_area.shape)
+    binary = np.isin(irrigated_area.data, ia_classes).astype(np.uint8)
+
+    total_pixels, irrigated_pixels, scores = calc_validation_scores(
+        binary,
+        polygon_ids,
+        len(polygons),
+        valid=~np.ma.getmaskarray(irrigated_area),
+    )
+
+    polygons = polygons.assign(total_pixels=total_pixels, irrigated_pixels=irrigated_pixels, score=scores)
+
+    return float(np.nanmean(scores)), polygons
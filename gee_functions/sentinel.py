@@ -3,6 +3,11 @@ from datetime import timedelta, datetime
 from dateutil.relativedelta import relativedelta
 from monthdelta import monthdelta
 
+try:
+    from aoi import to_area_of_interest
+except ImportError:
+    from .aoi import to_area_of_interest
+
 
 def scale_data(image):
     return image.multiply(0.0001)
@@ -57,10 +62,11 @@ def create_monthly_index_images(image_collection, start_date, end_date, aoi, sta
     :param image_collection: EE imagecollection with satellite scenes from which the composites are to be created
     :param start_date: Date at which the image collection begins
     :param end_date: Date at which the image Collection ends
-    :param aoi: Area of interest
+    :param aoi: Area of interest, AreaOfInterest or EE FeatureCollection
     :param stats: list of statistics to use for the monthly composite, possibilities are: 'mean', 'max', 'min', 'median'
     :return: Returns an EE imagecollection contaning monthly NDVI Images
     """
+    aoi = to_area_of_interest(aoi)
 
     if not str(type(start_date)) == 'datetime.datetime' or str(type(end_date) == 'datetime.datetime'):
         try:
@@ -95,7 +101,7 @@ def create_monthly_index_images(image_collection, start_date, end_date, aoi, sta
                                          ee.String(f'{datetime.strftime(start_month, "%b")}_{start_month.year}'))
                                     .set('system:time_start', ee.Date(start_month).millis())
                                     )
-                monthly_mean = monthly_mean.unmask(filler_data, True).clip(aoi)
+                monthly_mean = aoi.clip(monthly_mean.unmask(filler_data, True))
                 monthly_stats += [monthly_mean]
             elif stat == 'min':
                 monthly_min = (image_collection.filter(
@@ -108,7 +114,8 @@ def create_monthly_index_images(image_collection, start_date, end_date, aoi, sta
                                         ee.String(f'{datetime.strftime(start_month, "%b")}_{start_month.year}'))
                                    .set('system:time_start', ee.Date(start_month).millis())
                                    )
-                monthly_min = monthly_min.unmask(filler_data.reduce(ee.Reducer.percentile(ee.List([10]))), True).clip(aoi)
+                monthly_min = aoi.clip(
+                    monthly_min.unmask(filler_data.reduce(ee.Reducer.percentile(ee.List([10]))), True))
                 monthly_stats += [monthly_min]
             elif stat == 'max':
                 monthly_max = (image_collection.filter(
@@ -122,13 +129,13 @@ def create_monthly_index_images(image_collection, start_date, end_date, aoi, sta
                                    .set('system:time_start', ee.Date(start_month).millis())
                                    )
 
-                monthly_max = monthly_max.unmask(filler_data.reduce(ee.Reducer.percentile(ee.List([90]))), True).clip(aoi)
+                monthly_max = aoi.clip(
+                    monthly_max.unmask(filler_data.reduce(ee.Reducer.percentile(ee.List([90]))), True))
                 monthly_stats += [monthly_max]
             elif stat == 'median':
                 monthly_median = (image_collection.filter(
                     ee.Filter.date(start_month, end_month))
                                   .median()
-                                  .clip(aoi)
                                   .set('month', start_month.month)
                                   .set('year', start_month.year)
                                   .set('date_info',
@@ -140,7 +147,7 @@ def create_monthly_index_images(image_collection, start_date, end_date, aoi, sta
                     print(f'No data available for: {datetime.strftime(start_month, "%b")} {start_month.year}')
                     continue
 
-                monthly_median = monthly_median.unmask(filler_data.median(), True).clip(aoi)
+                monthly_median = aoi.clip(monthly_median.unmask(filler_data.median(), True))
 
                 monthly_stats += [monthly_median]
 
@@ -4,10 +4,14 @@ Functions used for validation using validation polygons
 
 import ee
 
+from typing import Dict, Union
+
 try:
     from constants import AOI
+    from vector import clip_to_aoi
 except ImportError:
     from .constants import AOI
+    from .vector import clip_to_aoi
 
 
 def calc_area(
@@ -44,6 +48,58 @@ def calc_area(
     return total_irrigated_area
 
 
+def calc_area_per_class(
+        image: ee.Image,
+        region: ee.FeatureCollection,
+        class_names: Dict[int, str] = None,
+        scale: int = 30,
+        tile_scale: int = 2,
+        max_pixels: int = 1e13,
+        crs: str = 'EPSG:32630') -> Dict[str, Dict[Union[int, str], float]]:
+    """
+    Calculates the area in hectares for every class of a categorical map in a single request. The pixel area is summed
+    with a grouped reducer, so all classes are reduced at once instead of one binary layer per call. Every band of the
+    image is reduced separately, which allows a multi-year table to be retrieved by stacking the yearly maps as bands.
+
+    :param image: EE Image with one or more categorical bands, e.g. 'ia_year' or 'rf_all_classes'
+    :param region: EE Geometry acting as extent for the calculation
+    :param class_names: optional, dictionary mapping the pixel values to class names used as keys in the result
+    :param scale: a nominal scale in meters of the projection to work in
+    :param tile_scale: a scaling factor used to reduce aggregation tile size; using a larger tileScale (e.g. 2 or 4)
+    may enable computations that run out of memory with the default
+    :param max_pixels: the maximum number of pixels to reduce.
+    :param crs: projection to work in
+    :return: dictionary with the band names as keys and a dictionary with the area per class in hectares as values
+    """
+    area = ee.Image.pixelArea().divide(10000)
+
+    def reduce_band(band_name):
+        classes = image.select([band_name]).toInt().rename('class')
+        return area.addBands(classes).reduceRegion(
+            reducer=ee.Reducer.sum().group(groupField=1, groupName='class'),
+            geometry=region,
+            scale=scale,
+            tileScale=tile_scale,
+            maxPixels=max_pixels,
+            crs=crs,
+        ).get('groups')
+
+    band_names = image.bandNames()
+    grouped_areas = ee.Dictionary.fromLists(band_names, band_names.map(reduce_band)).getInfo()
+
+    area_per_class = {}
+
+    for band_name, groups in grouped_areas.items():
+        area_per_class[band_name] = {}
+        for group in groups:
+            class_value = int(group['class'])
+            if class_names is not None:
+                class_value = class_names.get(class_value, class_value)
+            area_per_class[band_name][class_value] = group['sum']
+
+    return area_per_class
+
+
 def convert_to_polygons(feature: ee.Feature) -> ee.FeatureCollection:
     """
     Converts an EE Multipolygon Feature into a FeatureCollection of single polygons
@@ -186,8 +242,6 @@ def sample_feature_collection(
     feature_collection = feature_collection.filter(ee.Filter.lte('random', fraction))
 
     if intersect_aoi:
-        feature_collection = ee.FeatureCollection(
-            feature_collection.geometry().intersection(AOI.geometry(), ee.ErrorMargin(1))
-        )
+        feature_collection = clip_to_aoi(feature_collection, AOI)
 
     return feature_collection
@@ -2,8 +2,19 @@
 Functions related to EE vectors
 """
 import ee
+import math
 
-from typing import Union, Dict
+from shapely.geometry import box, shape
+from typing import Union, Dict, List
+
+try:
+    from constants import PROJECT_PATH
+    from aoi import AreaOfInterest, to_area_of_interest
+    from export import export_to_asset
+except ImportError:
+    from .constants import PROJECT_PATH
+    from .aoi import AreaOfInterest, to_area_of_interest
+    from .export import export_to_asset
 
 
 def add_area(vector: ee.FeatureCollection) -> ee.FeatureCollection:
@@ -17,6 +28,41 @@ def add_area(vector: ee.FeatureCollection) -> ee.FeatureCollection:
     return vector.set('area', area)
 
 
+def clip_to_aoi(
+        feature_collection: ee.FeatureCollection,
+        aoi: Union[AreaOfInterest, ee.FeatureCollection],
+        max_error: int = 1) -> ee.FeatureCollection:
+    """
+    Clips the features of a EE FeatureCollection to the area of interest, keeping the properties of each feature.
+    Features outside of the AOI are removed and features completely within the AOI are kept as is, so only the features
+    crossing the boundary of the AOI are intersected, one feature at a time.
+
+    :param feature_collection: EE FeatureCollection to clip
+    :param aoi: AreaOfInterest or EE FeatureCollection/Feature/Geometry of the area of interest
+    :param max_error: the maximum amount of error tolerated when performing any necessary reprojection
+    :return: EE FeatureCollection with the features clipped to the AOI
+    """
+    if isinstance(aoi, AreaOfInterest):
+        aoi_geometry = aoi.geometry
+    elif isinstance(aoi, ee.Geometry):
+        aoi_geometry = aoi
+    else:
+        aoi_geometry = aoi.geometry()
+
+    candidates = feature_collection.filterBounds(aoi_geometry)  # removes the features outside of the AOI
+
+    is_inside = ee.Filter.isContained(leftField='.geo', rightValue=aoi_geometry, maxError=max_error)
+    inside = candidates.filter(is_inside)
+    edge = candidates.filter(is_inside.Not())
+
+    aoi_feature = ee.Feature(aoi_geometry)  # Feature.intersection expects a Feature, not a Geometry
+
+    def intersect_aoi(feature):
+        return ee.Feature(feature).intersection(right=aoi_feature, maxError=max_error)
+
+    return inside.merge(edge.map(intersect_aoi))
+
+
 def raster_to_vector(
         image: ee.Image,
         region: ee.FeatureCollection,
@@ -47,6 +93,29 @@ def raster_to_vector(
     return vector
 
 
+def split_bounds(bounds: List[float], scale: float = None) -> Dict[str, List[float]]:
+    """
+    Splits bounds into four quadrants, client-side
+    :param bounds: bounds [xmin, ymin, xmax, ymax] to split
+    :param scale: optional, pixel size, if provided the split is snapped to a multiple of the pixel size
+    :return: dictionary containing the bounds of the four quadrants
+    """
+    x_min, y_min, x_max, y_max = bounds
+    x_mid = (x_min + x_max) / 2
+    y_mid = (y_min + y_max) / 2
+
+    if scale is not None:
+        x_mid = round(x_mid / scale) * scale
+        y_mid = round(y_mid / scale) * scale
+
+    return {
+        'bottom_left': [x_min, y_min, x_mid, y_mid],
+        'bottom_right': [x_mid, y_min, x_max, y_mid],
+        'top_left': [x_min, y_mid, x_mid, y_max],
+        'top_right': [x_mid, y_mid, x_max, y_max],
+    }
+
+
 def split_region(region: Union[ee.FeatureCollection, ee.Feature]) -> Dict[str, ee.Geometry]:
     """
     Splits a EE FeatureCollection/Feature into four equal parts
@@ -123,3 +192,240 @@ def split_region(region: Union[ee.FeatureCollection, ee.Feature]) -> Dict[str, e
         'bottom_right': bottom_right_poly,
         'bottom_left': bottom_left_poly
     }
+
+
+def split_region_adaptive(
+        region: Union[AreaOfInterest, ee.FeatureCollection],
+        max_pixels: int = int(1e8),
+        max_area: float = None,
+        scale: int = 30,
+        crs: str = 'EPSG:32630',
+        max_depth: int = 10) -> Dict[str, List[float]]:
+    """
+    Recursively splits a region into quadrants until each part covers less than a target number of pixels or area of
+    the region. Parts not covering the region are dropped. Only the simplified outline of the region is retrieved, once
+    (see AreaOfInterest.simplified), and all splitting is done client-side. The simplified outline fully covers the
+    region, so no part of the region is dropped, the areas are slightly overestimated.
+
+    The tile IDs are the path through the quadtree, starting with 't' for the full extent followed by the number of the
+    quadrant at each level (0: bottom left, 1: bottom right, 2: top left, 3: top right), e.g. 't03'. The ID of a tile
+    therefore does not depend on how the rest of the region is split.
+
+    :param region: AreaOfInterest or EE FeatureCollection of the region to split
+    :param max_pixels: maximum number of pixels of the region within a tile
+    :param max_area: optional, maximum area of the region within a tile in square meters, overrides max_pixels
+    :param scale: pixel size in meters, the splits are aligned to multiples of this value
+    :param crs: projection in which the tiles are created
+    :param max_depth: maximum number of times a tile is split
+    :return: dictionary with the tile IDs as keys and the tile bounds [xmin, ymin, xmax, ymax] as values
+    """
+    region_geometry = shape(to_area_of_interest(region).simplified.transform(crs, 1).getInfo())
+
+    if max_area is None:
+        max_area = max_pixels * scale * scale
+
+    x_min, y_min, x_max, y_max = region_geometry.bounds
+    root = [
+        math.floor(x_min / scale) * scale,
+        math.floor(y_min / scale) * scale,
+        math.ceil(x_max / scale) * scale,
+        math.ceil(y_max / scale) * scale,
+    ]
+
+    tiles = {}
+    to_split = [('t', root, region_geometry)]
+
+    while to_split:
+        tile_id, tile_bounds, tile_region = to_split.pop()
+
+        small_enough = (tile_bounds[2] - tile_bounds[0] <= scale) or (tile_bounds[3] - tile_bounds[1] <= scale)
+
+        if tile_region.area <= max_area or len(tile_id) > max_depth or small_enough:
+            tiles[tile_id] = tile_bounds
+            continue
+
+        for ind, quadrant in enumerate(split_bounds(tile_bounds, scale).values()):
+            quadrant_region = tile_region.intersection(box(*quadrant))
+            if not quadrant_region.is_empty and quadrant_region.area > 0:
+                to_split.append((f'{tile_id}{ind}', quadrant, quadrant_region))
+
+    return dict(sorted(tiles.items()))
+
+
+def create_tiles(
+        region: Union[ee.FeatureCollection, ee.Feature],
+        tile_size: int = 30000,
+        scale: int = 30,
+        crs: str = 'EPSG:32630') -> Dict[str, List[float]]:
+    """
+    Splits the bounding box of a region into a grid of square tiles. The tile edges are snapped to the pixel grid of the
+    projection, so pixels are never split between two tiles.
+
+    :param region: EE FeatureCollection/Feature to split
+    :param tile_size: size of the tiles in the units of the projection (meters)
+    :param scale: pixel size in meters, the tile edges are aligned to multiples of this value
+    :param crs: projection in which the tiles are created
+    :return: dictionary with the tile IDs ('row_col') as keys and the tile bounds [xmin, ymin, xmax, ymax] as values
+    """
+    bounds = region.geometry().bounds(1, crs).getInfo()['coordinates'][0]
+    x_coords = [coord[0] for coord in bounds]
+    y_coords = [coord[1] for coord in bounds]
+
+    x_min = math.floor(min(x_coords) / scale) * scale
+    y_min = math.floor(min(y_coords) / scale) * scale
+    x_max = math.ceil(max(x_coords) / scale) * scale
+    y_max = math.ceil(max(y_coords) / scale) * scale
+
+    tile_size = max(round(tile_size / scale), 1) * scale
+
+    tiles = {}
+
+    for row, y in enumerate(range(y_min, y_max, tile_size)):
+        for col, x in enumerate(range(x_min, x_max, tile_size)):
+            tiles[f'{row}_{col}'] = [x, y, min(x + tile_size, x_max), min(y + tile_size, y_max)]
+
+    return tiles
+
+
+def tile_to_geometry(tile_bounds: List[float], crs: str = 'EPSG:32630') -> ee.Geometry:
+    """
+    Converts the bounds of a tile to an EE Geometry
+    :param tile_bounds: tile bounds [xmin, ymin, xmax, ymax] in the units of the projection
+    :param crs: projection of the tile bounds
+    :return: EE Geometry of the tile
+    """
+    return ee.Geometry.Rectangle(tile_bounds, proj=crs, geodesic=False)
+
+
+def get_tile_seams(tiles: Dict[str, List[float]], crs: str = 'EPSG:32630') -> ee.Geometry:
+    """
+    Returns the edges shared by the tiles, i.e. all tile edges except for the ones on the outer boundary of the grid.
+
+    :param tiles: dictionary with the tile bounds as returned by create_tiles
+    :param crs: projection of the tile bounds
+    :return: EE MultiLineString containing the seams between the tiles
+    """
+    x_min = min(bounds[0] for bounds in tiles.values())
+    y_min = min(bounds[1] for bounds in tiles.values())
+    x_max = max(bounds[2] for bounds in tiles.values())
+    y_max = max(bounds[3] for bounds in tiles.values())
+
+    seams = []
+
+    for left, bottom, right, top in tiles.values():
+        if right < x_max:  # east edge
+            seams.append([[right, bottom], [right, top]])
+        if top < y_max:  # north edge
+            seams.append([[left, top], [right, top]])
+
+    return ee.Geometry.MultiLineString(seams, proj=crs, geodesic=False)
+
+
+def raster_to_vector_tiled(
+        image: ee.Image,
+        region: ee.FeatureCollection,
+        asset_id: str,
+        tiles: Dict[str, List[float]] = None,
+        tile_size: int = 30000,
+        scale: int = 30,
+        crs: str = 'EPSG:32630',
+        max_pixels: int = 1e13,
+        tile_scale: int = 1,
+        overwrite: bool = False) -> Dict[str, Union[ee.batch.Task, bool]]:
+    """
+    Converts a raster to vectors tile by tile, every tile being exported as a separate asset. This allows large areas to
+    be vectorized at full resolution. Use track_task to follow the progress of every tile and merge_vector_tiles to
+    combine the tiles once all exports are completed.
+
+    The pixels are connected through their edges only (eightConnected=False). Pixels touching diagonally across a seam
+    would otherwise be one polygon in a single vectorization, while the dissolve of merge_vector_tiles keeps polygons
+    touching in a single point apart.
+
+    :param image: EE Image to convert, the first band is expected to be an integer type
+    :param region: EE FeatureCollection of the region to vectorize
+    :param asset_id: ID of the folder under which the tiles are saved, the tiles are saved as 'tile_<tile ID>'
+    :param tiles: optional, dictionary with tile bounds as returned by create_tiles, created if not provided
+    :param tile_size: size of the tiles in meters, used when no tiles are provided
+    :param scale: a nominal scale in meters of the projection to work in
+    :param crs: projection to work in
+    :param max_pixels: the maximum number of pixels to reduce per tile
+    :param tile_scale: a scaling factor used to reduce aggregation tile size
+    :param overwrite: Boolean, if True it overwrites previously exported tiles
+    :return: dictionary with the tile IDs as keys and the EE export tasks as values
+    """
+    if tiles is None:
+        tiles = create_tiles(region, tile_size=tile_size, scale=scale, crs=crs)
+
+    tasks = {}
+
+    for tile_id, tile_bounds in tiles.items():
+        vector = image.reduceToVectors(
+            reducer=ee.Reducer.countEvery(),
+            geometry=tile_to_geometry(tile_bounds, crs),
+            scale=scale,
+            crs=crs,
+            eightConnected=False,
+            maxPixels=max_pixels,
+            tileScale=tile_scale
+        ).filter(ee.Filter.neq('label', 0))
+
+        try:
+            tasks[tile_id] = export_to_asset(
+                asset=vector,
+                asset_type='vector',
+                asset_id=f'{asset_id}/tile_{tile_id}',
+                region=region,
+                overwrite=overwrite
+            )
+        except FileExistsError as e:  # if the tile already exists the existing asset is used
+            print(e)
+            tasks[tile_id] = True
+
+    return tasks
+
+
+def merge_vector_tiles(
+        asset_id: str,
+        tiles: Dict[str, List[float]],
+        scale: int = 30,
+        crs: str = 'EPSG:32630',
+        max_error: int = 1) -> ee.FeatureCollection:
+    """
+    Merges the tiles exported by raster_to_vector_tiled into a single EE FeatureCollection. Polygons touching a seam
+    between two tiles are dissolved with the polygons of the same label on the other side of the seam, all other
+    polygons are kept as is. The dissolved polygons keep the properties of one of the polygons they were dissolved from,
+    with the pixel count recalculated from their area.
+
+    :param asset_id: ID of the folder the tiles were saved under
+    :param tiles: dictionary with the tile bounds used for the export
+    :param scale: a nominal scale in meters of the projection, used to recalculate the pixel count of merged polygons
+    :param crs: projection of the tile bounds
+    :param max_error: the maximum amount of error tolerated when performing any necessary reprojection
+    :return: EE FeatureCollection with the polygons of all tiles
+    """
+    vectors = ee.FeatureCollection([
+        ee.FeatureCollection(f'{PROJECT_PATH}/vector/{asset_id}/tile_{tile_id}') for tile_id in tiles
+    ]).flatten()
+
+    if len(tiles) == 1:
+        return vectors
+
+    is_on_seam = ee.Filter.bounds(get_tile_seams(tiles, crs), max_error)
+    on_seam = vectors.filter(is_on_seam)
+    off_seam = vectors.filter(is_on_seam.Not())
+
+    def dissolve_label(label):
+        label_polygons = on_seam.filter(ee.Filter.eq('label', label))
+        geometry = label_polygons.geometry(max_error).dissolve(max_error)
+
+        def to_feature(part):
+            part = ee.Geometry(part)
+            pixel_count = part.area(max_error, crs).divide(scale * scale).round()
+            source = label_polygons.filterBounds(part).first()
+            return ee.Feature(part).copyProperties(source).set({'label': label, 'count': pixel_count})
+
+        return ee.FeatureCollection(geometry.geometries().map(to_feature))
+
+    dissolved = ee.FeatureCollection(on_seam.aggregate_array('label').distinct().map(dissolve_label)).flatten()
+
+    return off_seam.merge(dissolved)
@@ -91,6 +91,31 @@ def vis_params_cp(
     return params
 
 
+def vis_params_threshold(
+        band: str,
+        threshold: float,
+        greater_than: bool = True,
+        color: str = 'yellow',
+        background: str = 'black',
+        opacity: float = 0.8):
+    """
+    Returns visual parameters that show the pixels selected by a threshold on a precomputed LDA score layer. With the
+    minimum and maximum both set to the threshold, the two color palette splits the pixels at the threshold, so a
+    threshold can be changed without recomputing the layer.
+
+    :param band: name of the band containing the LDA scores
+    :param threshold: threshold value
+    :param greater_than: if True the pixels above the threshold are selected, otherwise the pixels below it
+    :param color: color of the selected pixels
+    :param background: color of the pixels that are not selected
+    :param opacity: opacity of the layer
+    :return: dictionary containing the parameters for visualization
+    """
+    palette = [background, color] if greater_than else [color, background]
+
+    return vis_params_cp([band], threshold, threshold, palette=palette, opacity=opacity)
+
+
 def vis_params_rgb(
         bands: List[int] = None,
         min_val: Union[int, float] = 0,
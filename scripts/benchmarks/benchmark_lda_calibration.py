@@ -0,0 +1,97 @@
+"""
+Benchmark of the LDA calibration, comparing the sklearn based calibration that was used before with the closed-form
+calibration of gee_functions.local.lda on synthetic data of production size: 8 classes, 80 bands and 5000 samples per
+class for 3 calibration years.
+"""
+
+# standard libs
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.discriminant_analysis import LinearDiscriminantAnalysis as LDA
+
+# local imports
+from gee_functions.local.lda import calc_class_statistics, solve_one_vs_rest, calibrate_lda
+
+# globals
+NO_OF_CLASSES = 8
+NO_OF_BANDS = 80
+NO_OF_SAMPLES = 3 * 5000 * NO_OF_CLASSES
+REPEATS = 3
+
+
+def create_synthetic_samples(seed=0):
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, NO_OF_CLASSES, NO_OF_SAMPLES)
+    mixing = rng.normal(size=(NO_OF_BANDS, NO_OF_BANDS)) / np.sqrt(NO_OF_BANDS)
+    class_means = rng.normal(size=(NO_OF_CLASSES, NO_OF_BANDS))
+    X = rng.normal(size=(NO_OF_SAMPLES, NO_OF_BANDS)) @ mixing + class_means[labels]
+    return pd.DataFrame(X, columns=[f'band_{ind}' for ind in range(NO_OF_BANDS)]), labels
+
+
+def get_lda_params_sklearn(X, y):
+    """The sklearn based calibration as it was implemented in lda.get_lda_params"""
+    sklearn_lda = LDA(n_components=1, store_covariance=True)
+
+    LDA_clf = sklearn_lda.fit(X, y)
+    LDA_fit = sklearn_lda.fit_transform(X, y)
+
+    greater_than = np.mean(LDA_fit[:, 0][y == 0]) <= np.mean(LDA_fit[:, 0][y == 1])
+
+    coefficients = list(LDA_clf.scalings_.flatten())
+
+    pred = X.copy()
+    for ind, band in enumerate(X.columns):
+        pred[band] = X[band] * coefficients[ind]
+
+    sklearn_df = pd.DataFrame(data=LDA_fit, columns=['Sklearn Prediction'])
+    man_df = pd.DataFrame(data=pred.sum(axis=1).values, columns=['Manual Prediction'])
+    sklearn_df['Manual Prediction'] = man_df['Manual Prediction']
+    sklearn_df['intercept'] = sklearn_df['Sklearn Prediction'] - sklearn_df['Manual Prediction']
+    intercept = sklearn_df['intercept'].mode().values
+
+    return intercept, coefficients, LDA_fit, greater_than, LDA_clf.covariance_
+
+
+def time_function(function):
+    times = []
+    for _ in range(REPEATS):
+        start_time = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start_time)
+    return min(times), result
+
+
+def main():
+    X, labels = create_synthetic_samples()
+    print(f'{NO_OF_SAMPLES} samples, {NO_OF_BANDS} bands, {NO_OF_CLASSES} classes')
+
+    sklearn_time, sklearn_results = time_function(
+        lambda: [get_lda_params_sklearn(X, (labels == cl).astype(int)) for cl in range(NO_OF_CLASSES)])
+    print(f'sklearn, one fit per class: {sklearn_time:.3f} s')
+
+    def closed_form_per_class():
+        results = []
+        for cl in range(NO_OF_CLASSES):
+            _, counts, means, covariances = calc_class_statistics(X.to_numpy(), (labels == cl).astype(int))
+            results.append(solve_one_vs_rest(counts, means, covariances))
+        return results
+
+    per_class_time, _ = time_function(closed_form_per_class)
+    print(f'closed form, one solve per class: {per_class_time:.3f} s')
+
+    batched_time, (_, discriminants) = time_function(lambda: calibrate_lda(X.to_numpy(), labels))
+    print(f'closed form, all classes batched: {batched_time:.3f} s')
+
+    # the sign of the sklearn discriminant is arbitrary, the scores are compared after aligning the signs
+    max_difference = 0
+    for cl, (_, _, sklearn_fit, _, _) in enumerate(sklearn_results):
+        scores = X.to_numpy() @ discriminants['coefficients'][cl] + discriminants['intercepts'][cl]
+        sign = np.sign(sklearn_fit[:, 0] @ scores)
+        max_difference = max(max_difference, np.abs(sign * sklearn_fit[:, 0] - scores).max())
+    print(f'maximum difference between the scores: {max_difference:.2e}')
+
+
+if __name__ == '__main__':
+    main()
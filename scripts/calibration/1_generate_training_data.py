@@ -18,9 +18,12 @@ Date: 06/09/2022
 from gee_functions.constants import AOI, AOI_NAME, DATA_CREATION_METHOD
 from gee_functions.classification import create_feature_data
 from gee_functions.export import track_task
+from gee_functions.aoi import AreaOfInterest
 
 # globals
 
+AREA_OF_INTEREST = AreaOfInterest(AOI, name=AOI_NAME)  # geometries of the AOI are cached locally
+
 CALIBRATION_YEARS = [
     1997,
     2000,
@@ -31,6 +34,9 @@ SENSOR = 'landsat'  # 'sentinel'
 
 def main():
 
+    if AREA_OF_INTEREST.clip_method == 'mask':  # the mask asset has to exist before the feature data is created
+        track_task(AREA_OF_INTEREST.create_mask())
+
     tasks = {}
 
     for year in CALIBRATION_YEARS:
@@ -41,7 +47,7 @@ def main():
 
         task = create_feature_data(
             summer_dates,
-            aoi=AOI,
+            aoi=AREA_OF_INTEREST,
             aoi_name=AOI_NAME,
             creation_method=DATA_CREATION_METHOD,
             sensor=SENSOR,
@@ -52,7 +58,7 @@ def main():
 
         task = create_feature_data(
             winter_dates,
-            aoi=AOI,
+            aoi=AREA_OF_INTEREST,
             aoi_name=AOI_NAME,
             creation_method=DATA_CREATION_METHOD,
             sensor=SENSOR,
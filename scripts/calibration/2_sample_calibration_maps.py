@@ -2,7 +2,7 @@
 Script used to sample the feature data based on the land cover classes of the Campo de Cartagena calibration maps
 developed by TODO(Source)
 
-The samples are exported to google drive as a csv file.
+The samples are downloaded directly into a local Parquet file, or exported to google drive as csv files.
 
 Author: Thedmer Postma
 Date: 07/09/2022
@@ -13,47 +13,83 @@ import ee
 
 # local imports
 from gee_functions.constants import PROJECT_PATH, AOI, AOI_NAME, CALIBRATION_MAPS, CALIBRATION_LC_CLASSES, \
-    DATA_CREATION_METHOD
-from gee_functions.lda import take_strat_sample
+    DATA_CREATION_METHOD, DATA_DIR
+from gee_functions.lda import create_strat_samples, take_strat_sample, merge_samples
+from gee_functions.download import download_features
 from gee_functions.export import track_task
+from gee_functions.aoi import AreaOfInterest
 
+AREA_OF_INTEREST = AreaOfInterest(AOI, name=AOI_NAME)  # geometries of the AOI are cached locally
+
+SEASONS = ['summer', 'winter']
+
+# 'download' fetches the samples directly into a local Parquet file, 'drive' exports them to the Google Drive as CSV
+SAMPLE_TRANSFER: str = 'download'  # 'download', 'drive'
+
+SAMPLE_DIR = DATA_DIR.joinpath('calibration_samples', DATA_CREATION_METHOD)
 
-def main():
-    training_data_summer = {}
-    training_data_winter = {}
+
+def load_training_data(season):
+    training_data = {}
 
     for year in CALIBRATION_MAPS.keys():
-        training_data_summer[year] = ee.Image(
-            f'{PROJECT_PATH}/raster/data/{AOI_NAME}/landsat/{DATA_CREATION_METHOD}/feature_data_{AOI_NAME}_summer_{year}')
-        training_data_winter[year] = ee.Image(
-            f'{PROJECT_PATH}/raster/data/{AOI_NAME}/landsat/{DATA_CREATION_METHOD}/feature_data_{AOI_NAME}_winter_{year}')
+        training_data[year] = ee.Image(
+            f'{PROJECT_PATH}/raster/data/{AOI_NAME}/landsat/{DATA_CREATION_METHOD}/feature_data_{AOI_NAME}_{season}_{year}')
+
+    return training_data
 
-    tasks = {}
 
-    task_summer, _, _ = take_strat_sample(
-        CALIBRATION_MAPS,
-        training_data_summer,
-        CALIBRATION_LC_CLASSES,
-        AOI,
-        file_name=f'calibration_samples_summer',
-        dir_name=f'ia_classification/{DATA_CREATION_METHOD}'
-    )
+def download_samples():
+    SAMPLE_DIR.mkdir(parents=True, exist_ok=True)
 
-    tasks[f'sample_summer'] = task_summer
+    for season in SEASONS:
+        samples, _, _ = create_strat_samples(
+            CALIBRATION_MAPS,
+            load_training_data(season),
+            CALIBRATION_LC_CLASSES,
+            AREA_OF_INTEREST,
+        )
+        # the calibration years are downloaded concurrently
+        no_of_rows = download_features(samples, SAMPLE_DIR.joinpath(f'calibration_samples_{season}.parquet'))
+        print(f'Downloaded {no_of_rows} {season} samples')
 
-    task_winter, _, _ = take_strat_sample(
-        CALIBRATION_MAPS,
-        training_data_winter,
-        CALIBRATION_LC_CLASSES,
-        AOI,
-        file_name=f'calibration_samples_winter',
-        dir_name=f'ia_classification/{DATA_CREATION_METHOD}'
-    )
 
-    tasks[f'sample_winter'] = task_winter
+def export_samples():
+    tasks = {}
+
+    # the samples of both seasons and all calibration years are exported at the same time
+    for season in SEASONS:
+        season_tasks, _, _ = take_strat_sample(
+            CALIBRATION_MAPS,
+            load_training_data(season),
+            CALIBRATION_LC_CLASSES,
+            AREA_OF_INTEREST,
+            file_name=f'calibration_samples_{season}',
+            dir_name=f'ia_classification/{DATA_CREATION_METHOD}'
+        )
+
+        for year, task in season_tasks.items():
+            tasks[f'sample_{season}_{year}'] = task
 
     track_task(tasks)
 
+    # once the CSV files are downloaded from the Google Drive the years are combined into one file per season
+    for season in SEASONS:
+        sample_files = {
+            year: SAMPLE_DIR.joinpath(f'calibration_samples_{season}_{year}.csv') for year in CALIBRATION_MAPS.keys()
+        }
+        if all(path.exists() for path in sample_files.values()):
+            merge_samples(sample_files, SAMPLE_DIR.joinpath(f'calibration_samples_{season}.parquet'))
+        else:
+            print(f'Download the {season} samples to {SAMPLE_DIR} to merge them')
+
+
+def main():
+    if SAMPLE_TRANSFER == 'download':
+        download_samples()
+    else:
+        export_samples()
+
 
 if __name__ == '__main__':
     main()
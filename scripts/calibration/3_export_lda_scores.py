@@ -0,0 +1,57 @@
+"""
+Script to export the LDA scores of all classes for the calibration years
+
+The LDA of every class is calibrated with the samples of script 2, using the same selection of samples as the
+calibrations shown in the notebook (see lda.create_lda_calibration). The calibration and the histograms of its scores are
+stored in DATA_DIR, where the notebook loads them from, and the scores are exported as one asset per season and year.
+The thresholds chosen on the histograms can thus be previewed on the exported layers by changing only the visualization
+parameters (see visualization.vis_params_threshold). The training areas are created from the scores with
+lda.calc_training_areas once the thresholds are final.
+"""
+
+# standard libs
+import ee
+
+# local imports
+from gee_functions.constants import PROJECT_PATH, AOI, AOI_NAME, BANDNAMES, CALIBRATION_MAPS, DATA_CREATION_METHOD, \
+    DATA_DIR
+from gee_functions.lda import create_lda_calibration, export_lda_scores
+from gee_functions.export import track_task
+from gee_functions.aoi import AreaOfInterest
+
+AREA_OF_INTEREST = AreaOfInterest(AOI, name=AOI_NAME)  # geometries of the AOI are cached locally
+
+SEASONS = ['summer', 'winter']
+
+SAMPLE_DIR = DATA_DIR.joinpath('calibration_samples', DATA_CREATION_METHOD)
+
+
+def main():
+    tasks = {}
+
+    for season in SEASONS:
+        lda_params = create_lda_calibration(
+            SAMPLE_DIR.joinpath(f'calibration_samples_{season}'),
+            BANDNAMES,
+            season,
+            output_dir=DATA_DIR.joinpath(f'lda_calibration_{season}'),
+        )
+
+        for year in CALIBRATION_MAPS.keys():
+            feature_data = ee.Image(
+                f'{PROJECT_PATH}/raster/data/{AOI_NAME}/landsat/{DATA_CREATION_METHOD}/feature_data_{AOI_NAME}_{season}_{year}')
+
+            tasks[f'lda_scores_{season}_{year}'] = export_lda_scores(
+                feature_data,
+                lda_params,
+                AREA_OF_INTEREST,
+                AOI_NAME,
+                season,
+                year,
+            )
+
+    track_task(tasks)
+
+
+if __name__ == '__main__':
+    main()
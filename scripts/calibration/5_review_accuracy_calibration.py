@@ -8,14 +8,15 @@ Date: 12/09/2022
 import ee
 from gee_functions.constants import AOI, AOI_NAME, CLF_RUN, CALIBRATION_MAPS, PROJECT_PATH
 from gee_functions.validation import calc_area, calc_validation_score
+from gee_functions.vector import clip_to_aoi
 
 
 def load_validation_polygons(year):
     pol_ic = ee.FeatureCollection(f'users/Postm087/vector/validation/cdc/val_ic_{str(year)[2:]}')
     pol_it = ee.FeatureCollection(f'users/Postm087/vector/validation/cdc/val_it_{str(year)[2:]}')
 
-    pol_ic = ee.FeatureCollection(pol_ic.geometry().intersection(AOI.geometry()), ee.ErrorMargin(1))
-    pol_it = ee.FeatureCollection(pol_it.geometry().intersection(AOI.geometry()), ee.ErrorMargin(1))
+    pol_ic = clip_to_aoi(pol_ic, AOI)
+    pol_it = clip_to_aoi(pol_it, AOI)
 
     pol_ia = pol_ic.merge(pol_it)
 
@@ -18,9 +18,11 @@ Date: 06/09/2022
 from gee_functions.constants import AOI, AOI_NAME, DATA_CREATION_METHOD, VALIDATION_MAPS
 from gee_functions.classification_lda import create_feature_data
 from gee_functions.export import track_task
+from gee_functions.aoi import AreaOfInterest
 
 # globals
 
+AREA_OF_INTEREST = AreaOfInterest(AOI, name=AOI_NAME)  # geometries of the AOI are cached locally
 SENSOR = 'landsat'  # 'sentinel'
 
 
@@ -35,7 +37,7 @@ def main():
 
         task = create_feature_data(
                 summer_dates,
-                aoi=AOI,
+                aoi=AREA_OF_INTEREST,
                 aoi_name=AOI_NAME,
                 creation_method=DATA_CREATION_METHOD,
                 sensor=SENSOR,
@@ -46,7 +48,7 @@ def main():
 
         task = create_feature_data(
             winter_dates,
-            aoi=AOI,
+            aoi=AREA_OF_INTEREST,
             aoi_name=AOI_NAME,
             creation_method=DATA_CREATION_METHOD,
             sensor=SENSOR,
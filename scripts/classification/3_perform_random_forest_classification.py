@@ -13,6 +13,9 @@ from gee_functions.constants import GEE_USER_PATH, PROJECT_PATH, AOI, AOI_NAME,
     DATA_CREATION_METHOD, VALIDATION_MAPS
 from gee_functions.classification import classify_irrigated_areas, join_seasonal_irrigated_areas
 from gee_functions.export import track_task
+from gee_functions.aoi import AreaOfInterest
+
+AREA_OF_INTEREST = AreaOfInterest(AOI, name=AOI_NAME)  # geometries of the AOI are cached locally
 
 # Number of Trees
 TREES = 500
@@ -70,7 +73,7 @@ def main():
                 classification_task, _ = classify_irrigated_areas(
                     feature_data,
                     training,
-                    AOI,
+                    AREA_OF_INTEREST,
                     aoi_name=AOI_NAME,
                     clf_folder=CLF_RUN,
                     season=season,
@@ -107,7 +110,7 @@ def main():
                 ia_winter,
                 AOI_NAME,
                 year,
-                AOI,
+                AREA_OF_INTEREST,
                 clf_folder=CLF_RUN,
                 overwrite=False,
                 export_method='asset',
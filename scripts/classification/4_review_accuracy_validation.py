@@ -7,8 +7,11 @@ Date: 12/09/2022
 
 import ee
 from gee_functions.constants import AOI, AOI_NAME, CLF_RUN, VALIDATION_MAPS, PROJECT_PATH, IRRIGATED_AREA_CLASSES
-from gee_functions.validation import calc_area, calc_validation_score, sample_feature_collection
-from gee_functions.vector import raster_to_vector
+from gee_functions.validation import calc_area, calc_area_per_class, calc_validation_score, \
+    sample_feature_collection
+from gee_functions.accuracy import calc_error_matrix, calc_accuracy_metrics
+from gee_functions.vector import create_tiles, raster_to_vector_tiled, merge_vector_tiles
+from gee_functions.export import track_task
 
 
 def load_validation_polygons(asset: ee.FeatureCollection):
@@ -21,13 +24,24 @@ def load_validation_raster(val_map: ee.Image, target_classes: list[int]):
     return val_map.addBands(val_binary)
 
 
+def load_irrigated_area(year: int) -> ee.Image:
+    return ee.Image(
+        f'{PROJECT_PATH}/raster/results/irrigated_area/{AOI_NAME}/{CLF_RUN}/irrigated_areas_{AOI_NAME}_{year}'
+    ).select('ia_year')
+
+
 def main():
+    # The yearly maps are stacked as bands so the area per class for all years is retrieved in a single request
+    irrigated_area_all_years = ee.Image.cat(
+        [load_irrigated_area(year).rename(str(year)) for year in VALIDATION_MAPS]
+    )
+    ia_class_names = {value: name for name, value in IRRIGATED_AREA_CLASSES.items()}
+    area_per_class = calc_area_per_class(irrigated_area_all_years, AOI, class_names=ia_class_names)
+
     for year, val_map_info in VALIDATION_MAPS.items():
         print(f'starting validation for year {year}')
 
-        irrigated_area = ee.Image(
-            f'{PROJECT_PATH}/raster/results/irrigated_area/{AOI_NAME}/{CLF_RUN}/irrigated_areas_{AOI_NAME}_{year}'
-        ).select('ia_year')
+        irrigated_area = load_irrigated_area(year)
 
         if val_map_info['type'] == 'vector':
             # Need to load the polygons, transform to binary raster to calculate the total area
@@ -37,7 +51,7 @@ def main():
 
                 ia_to_validate = [IRRIGATED_AREA_CLASSES[val] for val in value['val_ia_classes']]
                 ia_binary = irrigated_area.eq(ia_to_validate).reduce('sum').gt(0).rename('ia_year')
-                area = round(calc_area(ia_binary, AOI).getInfo())
+                area = round(sum(area_per_class[str(year)].get(val, 0) for val in value['val_ia_classes']))
 
                 val_polygons = load_validation_polygons(value['asset'])
 
@@ -82,20 +96,31 @@ def main():
                 ia_to_validate = [IRRIGATED_AREA_CLASSES[val] for val in value['val_ia_classes']]
                 ia_binary = irrigated_area.eq(ia_to_validate).reduce('sum').gt(0).rename('ia_year')
 
-                area = round(calc_area(ia_binary, AOI).getInfo())
+                area = round(sum(area_per_class[str(year)].get(val, 0) for val in value['val_ia_classes']))
 
                 val_map = load_validation_raster(value['asset'], value['irrigated_pixel_values'])
 
                 area_val = round(calc_area(val_map.select('binary_irrigated_area'), AOI).getInfo())
 
-                val_polygons = raster_to_vector(
+                # The reference raster is compared pixel by pixel with the classification
+                error_matrix = calc_error_matrix(
+                    ia_binary,
                     val_map.select('binary_irrigated_area'),
                     AOI,
-                    tile_scale=8
+                    class_values=[0, 1],
                 )
 
+                total_area = sum(area_per_class[str(year)].values())
+                metrics = calc_accuracy_metrics(error_matrix, class_areas=[total_area - area, area])
+
+                # The polygons of the reference raster are vectorized tile by tile at full resolution, so the polygon
+                # based score is comparable with the years validated with vector maps
+                tiles = create_tiles(AOI)
+                vector_asset_id = f'validation/{AOI_NAME}/{key}_{year}'
+                track_task(raster_to_vector_tiled(val_map.select('binary_irrigated_area'), AOI, vector_asset_id, tiles))
+
                 val_polygons = sample_feature_collection(
-                    feature_collection=val_polygons,
+                    feature_collection=merge_vector_tiles(vector_asset_id, tiles),
                     fraction=.3,
                     min_area=50000,
                     max_area=500000,
@@ -111,7 +136,13 @@ def main():
 
                 val_score = round(val_score.get('mean').getInfo(), 2)
 
-                print(f'{year}:\nvalidation score {key}: {val_score}\ntotal irrigated area: {area} hectares'
+                print(f'{year}:\nvalidation score {key}: {val_score}'
+                      f'\noverall accuracy {key}: {round(metrics["overall_accuracy"], 2)} '
+                      f'(kappa: {round(metrics["kappa"], 2)}, '
+                      f'area-adjusted: {round(metrics["area_adjusted"]["overall_accuracy"], 2)})'
+                      f'\nuser\'s accuracy: {round(metrics["users_accuracy"][1], 2)} & '
+                      f'producer\'s accuracy: {round(metrics["producers_accuracy"][1], 2)}'
+                      f'\ntotal irrigated area: {area} hectares'
                       f'\ntotal irrigated area validation: {area_val} hectares'
                       )
 
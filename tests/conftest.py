@@ -0,0 +1,10 @@
+"""
+The tests only cover the functions that do not require the EE, the repository root is added to the path so the packages
+can be imported without installing them.
+"""
+
+import sys
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
@@ -0,0 +1,66 @@
+"""
+Tests of the local error matrices and of the accuracy metrics against the worked example of Olofsson et al. (2014),
+'Good practices for estimating area and assessing accuracy of land change', section 5 and table 8
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('ee')
+
+from gee_functions.accuracy import calc_accuracy_metrics, calc_error_matrix_from_arrays
+
+# deforestation, forest gain, stable forest and stable non-forest, the map classes as rows
+OLOFSSON_ERROR_MATRIX = np.array([
+    [66, 0, 5, 4],
+    [0, 55, 8, 12],
+    [1, 0, 153, 11],
+    [2, 1, 9, 313],
+])
+# mapped area in 30 m pixels
+OLOFSSON_CLASS_AREAS = [200000, 150000, 3200000, 6450000]
+PIXEL_AREA_HA = .09
+
+
+def test_accuracy_metrics_olofsson():
+    metrics = calc_accuracy_metrics(OLOFSSON_ERROR_MATRIX, OLOFSSON_CLASS_AREAS)
+    area_adjusted = metrics['area_adjusted']
+
+    # the values as reported in the paper
+    assert area_adjusted['overall_accuracy'] == pytest.approx(.947, abs=5e-4)
+    np.testing.assert_allclose(area_adjusted['users_accuracy'], [.88, .73, .93, .96], atol=5e-3)
+    np.testing.assert_allclose(area_adjusted['producers_accuracy'], [.75, .85, .93, .96], atol=5e-3)
+    np.testing.assert_allclose(area_adjusted['area'] * PIXEL_AREA_HA, [21158, 11686, 285770, 581386], atol=.5)
+    # 95 % confidence intervals
+    np.testing.assert_allclose(1.96 * area_adjusted['area_standard_error'] * PIXEL_AREA_HA,
+                               [6158, 3756, 15510, 16282], atol=.5)
+
+
+def test_accuracy_metrics_sample_counts():
+    metrics = calc_accuracy_metrics(OLOFSSON_ERROR_MATRIX)
+
+    total = OLOFSSON_ERROR_MATRIX.sum()
+    expected_accuracy = (OLOFSSON_ERROR_MATRIX.sum(axis=1) * OLOFSSON_ERROR_MATRIX.sum(axis=0)).sum() / total ** 2
+
+    assert metrics['overall_accuracy'] == pytest.approx(587 / 640)
+    assert metrics['kappa'] == pytest.approx((587 / 640 - expected_accuracy) / (1 - expected_accuracy))
+    np.testing.assert_allclose(metrics['users_accuracy'], [66 / 75, 55 / 75, 153 / 165, 313 / 325])
+    np.testing.assert_allclose(metrics['producers_accuracy'], [66 / 69, 55 / 56, 153 / 175, 313 / 340])
+    assert 'area_adjusted' not in metrics
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 6, 100])
+def test_error_matrix_from_arrays(chunk_rows):
+    rng = np.random.default_rng(0)
+    # 0 is nodata, the class values are not sorted
+    classified = rng.integers(0, 4, (20, 30)).astype(np.uint8)
+    reference = rng.integers(0, 4, (20, 30)).astype(np.uint8)
+    class_values = [3, 1, 2]
+
+    error_matrix = calc_error_matrix_from_arrays(classified, reference, class_values, chunk_rows=chunk_rows)
+
+    expected = np.array([[((classified == row) & (reference == col)).sum() for col in class_values]
+                         for row in class_values])
+
+    assert error_matrix.dtype == np.int64
+    np.testing.assert_array_equal(error_matrix, expected)
@@ -0,0 +1,199 @@
+"""
+Tests of the paged download of FeatureCollections, with the pages served by a local HTTP server
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from gee_functions.download import create_sample_schema, download_features, features_to_table, iter_feature_pages
+
+SCHEMA = pa.schema([pa.field('NDVI', pa.float32()), pa.field('lc', pa.int32()), pa.field('year', pa.int32())])
+
+
+def create_features(collection, no_of_features, **properties):
+    return [{'type': 'Feature', 'geometry': None,
+             'properties': {'NDVI': ind / 100, 'lc': ind, 'collection': collection, **properties}}
+            for ind in range(no_of_features)]
+
+
+class PageServer(ThreadingHTTPServer):
+    """
+    Serves the features of several collections in pages like the computeFeatures endpoint. The requests of the pages
+    in failing_pages fail the given number of times before the page is served.
+    """
+
+    def __init__(self, collections, failing_pages=None):
+        super().__init__(('127.0.0.1', 0), PageHandler)
+        self.collections = collections
+        self.failing_pages = {} if failing_pages is None else dict(failing_pages)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class PageHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlparse(self.path).query))
+        collection, page_size = query['expression'], int(query['pageSize'])
+        start = int(query.get('pageToken', 0))
+
+        with self.server.lock:
+            self.server.requests.append((collection, start))
+            failures = self.server.failing_pages.get((collection, start), 0)
+            if failures > 0:
+                self.server.failing_pages[(collection, start)] = failures - 1
+                self.send_error(503)
+                return
+
+        features = self.server.collections[collection]
+        response = {'type': 'FeatureCollection', 'features': features[start:start + page_size]}
+        if start + page_size < len(features):
+            response['nextPageToken'] = str(start + page_size)
+
+        body = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(collections, failing_pages=None):
+        server = PageServer(collections, failing_pages)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+
+        def compute_features(params):
+            # the collection is identified by its name, the HTTP errors are raised by urlopen
+            with urllib.request.urlopen(f'{server.url}/?{urllib.parse.urlencode(params)}', timeout=10) as response:
+                return json.load(response)
+
+        return server, compute_features
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_all_pages_are_joined(serve):
+    features = create_features('a', 25)
+    server, compute_features = serve({'a': features})
+
+    pages = list(iter_feature_pages('a', page_size=10, compute_features=compute_features))
+
+    assert [len(page) for page in pages] == [10, 10, 5]
+    assert [feature for page in pages for feature in page] == features
+    assert server.requests == [('a', 0), ('a', 10), ('a', 20)]
+
+
+def test_failed_page_is_retried(serve):
+    features = create_features('a', 25)
+    server, compute_features = serve({'a': features}, failing_pages={('a', 10): 2})
+
+    pages = list(iter_feature_pages('a', page_size=10, retry_delay=0, compute_features=compute_features))
+
+    assert [feature for page in pages for feature in page] == features
+    # the failed page is requested again, the download does not restart from the first page
+    assert server.requests == [('a', 0), ('a', 10), ('a', 10), ('a', 10), ('a', 20)]
+
+
+def test_failed_page_raises_after_retries(serve):
+    server, compute_features = serve({'a': create_features('a', 25)}, failing_pages={('a', 20): 3})
+
+    with pytest.raises(urllib.error.HTTPError):
+        list(iter_feature_pages('a', page_size=10, max_retries=2, retry_delay=0, compute_features=compute_features))
+
+    assert server.requests.count(('a', 20)) == 3
+
+
+def test_download_features(serve, tmp_path):
+    collections = {'2019': create_features('2019', 23), '2020': create_features('2020', 7)}
+    server, compute_features = serve(dict(collections), failing_pages={('2019', 5): 1})
+    output_file = tmp_path / 'samples.parquet'
+
+    no_of_rows = download_features({key: key for key in collections}, str(output_file), schema=SCHEMA, page_size=5,
+                                   max_workers=2, compute_features=compute_features)
+
+    table = pq.read_table(output_file).to_pandas().sort_values(['year', 'lc'])
+
+    assert no_of_rows == len(table) == 30
+    assert table['year'].tolist() == [2019] * 23 + [2020] * 7
+    assert table['lc'].tolist() == list(range(23)) + list(range(7))
+
+
+def test_default_schema_from_first_page(serve, tmp_path):
+    # the samples do not contain the band EVI
+    collections = {'2019': create_features('2019', 12, NDWI=.5, **{'class': 'forest'}),
+                   '2020': create_features('2020', 3, NDWI=.5, **{'class': 'shrub'})}
+    server, compute_features = serve(collections)
+    output_file = tmp_path / 'samples.parquet'
+
+    no_of_rows = download_features({key: key for key in collections}, str(output_file),
+                                   bandnames=['NDVI', 'EVI', 'NDWI'], page_size=5, compute_features=compute_features)
+
+    table = pq.read_table(output_file)
+
+    assert no_of_rows == table.num_rows == 15
+    assert table.schema.names == ['NDVI', 'NDWI', 'lc', 'class', 'year']
+    assert table.schema.field('NDVI').type == pa.float32()
+    assert table.column('NDWI').null_count == 0
+
+
+def test_sample_schema_from_properties():
+    schema = create_sample_schema(['NDVI', 'EVI'], key_column=None, properties=['EVI', 'lc', 'class'])
+
+    assert schema.names == ['EVI', 'lc', 'class']
+
+    with pytest.raises(ValueError):
+        create_sample_schema(['NDVI', 'EVI'], properties=['lc', 'class'])
+
+
+def test_declared_band_missing_from_samples_raises(serve, tmp_path):
+    server, compute_features = serve({'a': create_features('a', 5)})
+    schema = pa.schema([pa.field('NDVI', pa.float32()), pa.field('EVI', pa.float32()), pa.field('lc', pa.int32())])
+
+    with pytest.raises(ValueError, match='EVI'):
+        download_features({'2019': 'a'}, str(tmp_path / 'samples.parquet'), schema=schema,
+                          compute_features=compute_features)
+
+
+def test_property_missing_from_some_features():
+    features = create_features('a', 3)
+    del features[1]['properties']['NDVI']
+
+    table = features_to_table(features, SCHEMA, {'year': 2019})
+
+    assert table.column('NDVI').to_pylist() == [0, None, pytest.approx(.02)]
+    assert table.column('year').to_pylist() == [2019] * 3
+
+
+def test_download_without_features(serve, tmp_path):
+    server, compute_features = serve({'a': []})
+    output_file = tmp_path / 'samples.parquet'
+
+    no_of_rows = download_features({'2019': 'a'}, str(output_file), schema=SCHEMA, compute_features=compute_features)
+
+    assert no_of_rows == pq.read_table(output_file).num_rows == 0
+    assert pq.read_schema(output_file).names == SCHEMA.names
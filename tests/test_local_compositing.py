@@ -0,0 +1,180 @@
+"""
+Tests of the local temporal statistics against the NumPy nan-reductions, and of the month edges of the local monthly
+composites
+"""
+
+import warnings
+
+import numpy as np
+import pytest
+
+from gee_functions.local.compositing import (
+    ORDER_STATISTICS,
+    STATISTICS,
+    calc_moment_statistics,
+    calc_no_of_months,
+    calc_order_statistics,
+    calc_temporal_statistics_chunked,
+    create_monthly_composites,
+)
+
+PERCENTILES = [0, 10, 15, 50, 85, 90, 100]
+
+
+def create_stack(shape=(9, 3, 20, 30), missing=0., seed=0):
+    """Scene stack (time, band, y, x), with a fraction of the values masked as NaN"""
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0, 1, shape).astype(np.float32)
+    data[rng.random(shape) < missing] = np.nan
+
+    return data
+
+
+@pytest.mark.parametrize('missing', [0., .3, .9])
+def test_order_statistics(missing):
+    data = create_stack(missing=missing)
+
+    result = calc_order_statistics(data, PERCENTILES)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # pixels without valid values
+        expected = np.nanpercentile(data.astype(np.float64), PERCENTILES, axis=0)
+
+    assert np.isnan(expected).any() == (missing > .5)
+
+    assert result.shape == (len(PERCENTILES),) + data.shape[1:]
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, expected, rtol=1e-6, atol=1e-6)
+
+
+def test_order_statistics_missing_scenes():
+    data = create_stack(shape=(6, 10))
+    # pixels with 0, 1, 2 and all but one valid values
+    data[:, 0] = np.nan
+    data[1:, 1] = np.nan
+    data[::3, 2] = np.nan
+    data[2, 3] = np.nan
+
+    result = calc_order_statistics(data, PERCENTILES)
+
+    assert np.isnan(result[:, 0]).all()
+    np.testing.assert_array_equal(result[:, 1], data[0, 1])
+    expected = np.nanpercentile(data[:, 2:].astype(np.float64), PERCENTILES, axis=0)
+    np.testing.assert_allclose(result[:, 2:], expected, rtol=1e-6, atol=1e-6)
+
+
+def test_order_statistics_without_scenes():
+    result = calc_order_statistics(np.zeros((0, 4, 5), dtype=np.float32), [50])
+
+    assert result.shape == (1, 4, 5)
+    assert np.isnan(result).all()
+
+
+def test_moment_statistics():
+    data = create_stack(missing=.3)
+    data[:, 0, 0, 0] = np.nan
+
+    mean, std = calc_moment_statistics(data)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        expected_mean = np.nanmean(data.astype(np.float64), axis=0)
+        expected_std = np.nanstd(data.astype(np.float64), axis=0)
+
+    assert mean.dtype == std.dtype == np.float32
+    assert np.isnan(mean[0, 0, 0]) and np.isnan(std[0, 0, 0])
+    np.testing.assert_allclose(mean, expected_mean, rtol=1e-5, atol=1e-6)
+    np.testing.assert_allclose(std, expected_std, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 64])
+def test_temporal_statistics_chunked(tmp_path, chunk_rows):
+    data = create_stack(missing=.3)
+    bandnames = ['NDVI', 'NDWI', 'EVI']
+    np.save(tmp_path / 'stack.npy', data)
+
+    result, names = calc_temporal_statistics_chunked(np.load(tmp_path / 'stack.npy', mmap_mode='r'), bandnames,
+                                                     chunk_rows=chunk_rows)
+
+    assert names == [f'{band}_{stat}' for band in bandnames for stat in STATISTICS]
+
+    values = data.astype(np.float64)
+    expected = {
+        'mean': np.nanmean(values, axis=0),
+        'stdDev': np.nanstd(values, axis=0),
+        **{stat: np.nanpercentile(values, percentile, axis=0) for stat, percentile in ORDER_STATISTICS.items()},
+    }
+    for ind, name in enumerate(names):
+        band, _, stat = name.rpartition('_')
+        np.testing.assert_allclose(result[ind], expected[stat][bandnames.index(band)], rtol=1e-5, atol=1e-6)
+
+
+def test_temporal_statistics_output_bands():
+    data = create_stack()
+
+    result, names = calc_temporal_statistics_chunked(data, ['R', 'NIR', 'SWIR'], ['NIR_p85', 'R_mean', 'G_mean'],
+                                                     chunk_rows=5)
+
+    # bands without an input band are ignored
+    assert names == ['NIR_p85', 'R_mean']
+    np.testing.assert_allclose(result[0], np.percentile(data[:, 1], 85, axis=0), rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(result[1], data[:, 0].mean(axis=0, dtype=np.float64), rtol=1e-5, atol=1e-6)
+
+
+def create_scene_dates(*dates):
+    """Scenes of one band and 2 x 2 pixels, the value of every scene is its number starting from 1"""
+    data = np.arange(1, len(dates) + 1, dtype=np.float32)[:, None, None, None] * np.ones((1, 1, 2, 2), np.float32)
+
+    return data, np.array(dates, dtype='datetime64[D]')
+
+
+def test_monthly_composites_month_edges(capsys):
+    # the first and last day of January and February, and a scene in April
+    data, dates = create_scene_dates('2020-01-01', '2020-01-31', '2020-02-01', '2020-02-29', '2020-04-10')
+
+    composites, properties = create_monthly_composites(data, dates, '2020-01-01', '2020-05-01', stats=['median', 'mean'])
+
+    # the scenes of the last day of a month are included, the EE filter ends a day earlier; March has no scenes
+    assert [(prop['date_info'], prop['stat']) for prop in properties] == [
+        ('Jan_2020', 'median'), ('Jan_2020', 'mean'),
+        ('Feb_2020', 'median'), ('Feb_2020', 'mean'),
+        ('Apr_2020', 'median'), ('Apr_2020', 'mean'),
+    ]
+    np.testing.assert_array_equal(composites[:, 0, 0, 0], [1.5, 1.5, 3.5, 3.5, 5, 5])
+    assert 'No data available for: Mar 2020' in capsys.readouterr().out
+
+    assert [prop['month'] for prop in properties[:2]] == ['Jan', 1]
+    assert properties[0]['system:time_start'] == int(np.datetime64('2020-01-01', 'ms').astype(np.int64))
+
+
+def test_monthly_composites_start_within_month():
+    # the months run from the 15th up to the 14th of the next month, the scenes are passed unsorted
+    data, dates = create_scene_dates('2020-02-15', '2020-01-15', '2020-02-14', '2020-03-14', '2020-03-15')
+
+    composites, properties = create_monthly_composites(data, dates, '2020-01-15', '2020-03-15', stats=['max'])
+
+    assert calc_no_of_months(np.datetime64('2020-01-15'), np.datetime64('2020-03-14')) == 1
+    assert [prop['date_info'] for prop in properties] == ['Jan_2020', 'Feb_2020']
+    # p90 of the scenes 2 and 3, and of the scenes 1 and 4
+    np.testing.assert_allclose(composites[:, 0, 0, 0], [2.9, 3.7], rtol=1e-6)
+
+
+def test_monthly_composites_fill_from_neighbors():
+    data, dates = create_scene_dates('2020-01-10', '2020-02-10', '2020-03-10')
+    data[1, 0, 0, 0] = np.nan
+
+    composites, _ = create_monthly_composites(data, dates, '2020-02-01', '2020-03-01', fill_from_neighbors=True)
+
+    # the masked pixel of February is filled with the median of January and March
+    np.testing.assert_array_equal(composites[0, 0], [[2, 2], [2, 2]])
+
+    composites, _ = create_monthly_composites(data, dates, '2020-02-01', '2020-03-01')
+
+    assert np.isnan(composites[0, 0, 0, 0])
+
+
+def test_monthly_composites_unknown_statistic():
+    data, dates = create_scene_dates('2020-01-10')
+
+    with pytest.raises(ValueError):
+        create_monthly_composites(data, dates, '2020-01-01', '2020-02-01', stats=['p15'])
@@ -0,0 +1,109 @@
+"""
+Tests of the local gap filling against a pixel by pixel transcription of the algorithm of gap_fill.gap_fill, in which
+the neighbours are counted like the local version (see the docstring of local.gap_fill)
+"""
+
+import numpy as np
+import pytest
+
+from gee_functions.local.gap_fill import MAX_SCALE, MIN_SCALE, gap_fill
+
+RADIUS = 3
+MIN_NEIGHBORS = 20
+
+
+def gap_fill_reference(src, fill, radius, min_scale=MIN_SCALE, max_scale=MAX_SCALE, min_neighbors=MIN_NEIGHBORS):
+    """The fit, the fallbacks and the neighbour count of gap_fill.gap_fill, evaluated per pixel in float64"""
+    filled = src.astype(np.float64)
+
+    for row, col in zip(*np.nonzero(np.isnan(src) & ~np.isnan(fill))):
+        window = (slice(max(row - radius, 0), row + radius + 1), slice(max(col - radius, 0), col + radius + 1))
+        src_window, fill_window = src[window].astype(np.float64), fill[window].astype(np.float64)
+        common = ~np.isnan(src_window) & ~np.isnan(fill_window)
+
+        if common.sum() < min_neighbors:
+            continue
+
+        # linearFit of the source on the fill scene over the common pixels
+        x, y = fill_window[common], src_window[common]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            scale = ((x - x.mean()) * (y - y.mean())).sum() / ((x - x.mean()) ** 2).sum()
+        offset = y.mean() - scale * x.mean()
+
+        # mean and stdDev of the valid pixels of each scene
+        src_mean, src_std = np.nanmean(src_window), np.nanstd(src_window)
+        fill_mean, fill_std = np.nanmean(fill_window), np.nanstd(fill_window)
+
+        if not min_scale <= scale <= max_scale:
+            scale = src_std / fill_std
+            offset = src_mean - fill_mean * scale
+
+        if not min_scale <= scale <= max_scale:
+            scale, offset = 1, src_mean - fill_mean
+
+        filled[row, col] = fill[row, col] * scale + offset
+
+    return filled
+
+
+def create_scenes(shape=(30, 40), scale=1.5, noise=.02, seed=0):
+    """A fill scene and a source scene that is linearly related to it, with SLC-off like stripes of missing pixels"""
+    rng = np.random.default_rng(seed)
+    fill = rng.uniform(.05, .4, shape).astype(np.float32)
+    src = (scale * fill + .02 + rng.normal(0, noise, shape)).astype(np.float32)
+
+    rows, cols = np.indices(shape[-2:])
+    src[..., (cols + 2 * rows) % 9 < 3] = np.nan
+    fill[rng.random(shape) < .05] = np.nan
+
+    return src, fill
+
+
+@pytest.mark.parametrize('chunk_rows', [4, 7, 100])
+def test_gap_fill_matches_reference(chunk_rows):
+    src, fill = create_scenes()
+
+    result = gap_fill(src, fill, RADIUS, min_neighbors=MIN_NEIGHBORS, chunk_rows=chunk_rows, max_workers=2)
+
+    # the strips only use their own rows and the rows within the kernel, the result does not depend on the strips
+    np.testing.assert_allclose(result, gap_fill_reference(src, fill, RADIUS), rtol=1e-5, atol=1e-6)
+    np.testing.assert_array_equal(result[~np.isnan(src)], src[~np.isnan(src)])
+
+
+@pytest.mark.parametrize('scale, uncorrelated', [
+    (1.5, False),  # the fit is used
+    (1.5, True),  # the fit is below MIN_SCALE, the ratio of the standard deviations is used
+    (5, False),  # the fit and the ratio are above MAX_SCALE, only the difference of the means is applied
+])
+def test_gap_fill_fallbacks(scale, uncorrelated):
+    src, fill = create_scenes(scale=scale, noise=.01, seed=1)
+    if uncorrelated:
+        shuffled = np.random.default_rng(2).permutation(fill.ravel()).reshape(fill.shape)
+        src = np.where(np.isnan(src), np.nan, shuffled)
+
+    result = gap_fill(src, fill, RADIUS, min_neighbors=MIN_NEIGHBORS)
+
+    np.testing.assert_allclose(result, gap_fill_reference(src, fill, RADIUS), rtol=1e-5, atol=1e-6)
+
+
+def test_gap_fill_min_neighbors():
+    src, fill = create_scenes()
+    # too few common pixels around the upper left corner
+    fill[:8, :8] = np.nan
+    fill[2, 2] = .2
+    src[2, 2] = np.nan
+
+    result = gap_fill(src, fill, RADIUS, min_neighbors=MIN_NEIGHBORS)
+
+    assert np.isnan(result[2, 2])
+    np.testing.assert_allclose(result, gap_fill_reference(src, fill, RADIUS), rtol=1e-5, atol=1e-6)
+
+
+def test_gap_fill_bands():
+    src, fill = create_scenes(shape=(2, 20, 25), seed=3)
+
+    result = gap_fill(src, fill, RADIUS, min_neighbors=MIN_NEIGHBORS, chunk_rows=6)
+
+    for band in range(2):
+        np.testing.assert_allclose(result[band], gap_fill_reference(src[band], fill[band], RADIUS), rtol=1e-5,
+                                   atol=1e-6)
@@ -0,0 +1,29 @@
+"""
+Tests that the local functions can be used without EE credentials or a network connection
+"""
+
+import subprocess
+import sys
+
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+
+LOCAL_MODULES = ['validation', 'lda', 'outliers', 'samples', 'indices', 'preprocessing', 'compositing', 'gap_fill']
+
+
+@pytest.mark.parametrize('module', LOCAL_MODULES)
+def test_import_without_ee(module):
+    # a separate interpreter, so the result does not depend on modules imported by other tests
+    code = (
+        f'import sys\n'
+        f'import gee_functions.local.{module}\n'
+        f'from gee_functions import local\n'
+        f'assert "gee_functions.constants" not in sys.modules\n'
+        f'assert "ee" not in sys.modules\n'
+    )
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,134 @@
+"""
+Parity tests of the local indices against NumPy transcriptions of the EE operations in indices.py
+"""
+
+import numpy as np
+import pytest
+
+from gee_functions.local.indices import INDICES, calc_index, calc_indices
+
+BANDNAMES = ['B', 'G', 'R', 'NIR', 'SWIR']
+
+
+def ee_divide(numerator, denominator):
+    """Division of image.expression, division by zero returns 0 and masked inputs stay masked"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result = np.where(denominator == 0, 0, numerator / denominator)
+    result[np.isnan(numerator) | np.isnan(denominator)] = np.nan
+    return result
+
+
+def ee_normalized_difference(a, b):
+    """image.normalizedDifference, which masks the pixels with a negative value in either band"""
+    result = ee_divide(a - b, a + b)
+    result[(a < 0) | (b < 0)] = np.nan
+    return result
+
+
+def ee_index(bands, index):
+    """The expressions of indices.py, evaluated in float64"""
+    B, G, R, NIR, SWIR = (bands[:, BANDNAMES.index(band)].astype(np.float64) for band in BANDNAMES)
+
+    expressions = {
+        'NDVI': lambda: ee_normalized_difference(NIR, R),
+        'NDWI': lambda: ee_normalized_difference(NIR, SWIR),
+        'NDWBI': lambda: ee_normalized_difference(G, SWIR),
+        'NDBI': lambda: ee_normalized_difference(SWIR, NIR),
+        'EVI': lambda: 2.5 * ee_divide(NIR - R, NIR + 6 * R - 7.5 * B + 1),
+        'SAVI': lambda: ee_divide((1 + 0.5) * (NIR - R), NIR + R + 0.5),
+        'GI': lambda: ee_divide(NIR, G),
+        'GCVI': lambda: ee_divide(NIR, G) - 1,
+        'WGI': lambda: ee_normalized_difference(NIR, SWIR) * (ee_divide(NIR, G) - 1),
+    }
+
+    return expressions[index]()
+
+
+def create_scenes(seed=0, shape=(3, 5, 40, 50)):
+    rng = np.random.default_rng(seed)
+    data = rng.uniform(.01, .6, shape).astype(np.float32)
+
+    # a low blue band keeps the denominator of the EVI away from 0, where float32 rounding dominates
+    data[:, BANDNAMES.index('B')] *= .2
+
+    return data
+
+
+def set_pixel(data, pixel, **values):
+    for band, value in values.items():
+        data[(pixel[0], BANDNAMES.index(band)) + pixel[1:]] = value
+
+
+@pytest.mark.parametrize('index', list(INDICES))
+def test_index_parity(index):
+    data = create_scenes()
+
+    np.testing.assert_allclose(calc_index(data, BANDNAMES, index), ee_index(data, index), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize('index', list(INDICES))
+def test_index_parity_edge_cases(index):
+    data = create_scenes(seed=1)
+
+    # masked pixels
+    set_pixel(data, (0, 0, 0), NIR=np.nan)
+    set_pixel(data, (0, 0, 1), R=np.nan, G=np.nan, B=np.nan, SWIR=np.nan)
+    # negative reflectances, which normalizedDifference masks
+    set_pixel(data, (0, 1, 0), NIR=-.01)
+    set_pixel(data, (0, 1, 1), R=-.02, G=-.02, SWIR=-.02)
+    # zero denominators of the normalized differences, the GI and GCVI, the EVI and the SAVI
+    set_pixel(data, (1, 0, 0), NIR=0, R=0, G=0, SWIR=0)
+    set_pixel(data, (1, 0, 1), NIR=.5, R=1, B=1)
+    set_pixel(data, (1, 0, 2), NIR=-.25, R=-.25)
+    # division by zero with a masked numerator remains masked
+    set_pixel(data, (1, 1, 0), NIR=np.nan, G=0)
+
+    result = calc_index(data, BANDNAMES, index)
+    expected = ee_index(data, index)
+
+    np.testing.assert_array_equal(np.isnan(result), np.isnan(expected))
+    np.testing.assert_allclose(result, expected, rtol=1e-5, atol=1e-6)
+
+
+def test_normalized_difference_masking():
+    data = create_scenes(shape=(1, 5, 1, 4))
+    set_pixel(data, (0, 0, 0), NIR=-.1)
+    set_pixel(data, (0, 0, 1), R=-.1)
+    set_pixel(data, (0, 0, 2), NIR=0, R=0)
+
+    ndvi = calc_index(data, BANDNAMES, 'NDVI')[0, 0]
+
+    assert np.isnan(ndvi[0]) and np.isnan(ndvi[1])
+    assert ndvi[2] == 0
+    assert np.isfinite(ndvi[3])
+
+
+def test_division_by_zero():
+    data = create_scenes(shape=(1, 5, 1, 2))
+    set_pixel(data, (0, 0, 0), G=0)
+
+    np.testing.assert_array_equal(calc_index(data, BANDNAMES, 'GI')[0, 0, 0], 0)
+    np.testing.assert_array_equal(calc_index(data, BANDNAMES, 'GCVI')[0, 0, 0], -1)
+
+
+def test_calc_indices():
+    data = create_scenes()
+    indices = ['NDVI', 'EVI', 'WGI']
+    mask = np.random.default_rng(2).random((data.shape[0],) + data.shape[2:]) > .3
+
+    result = calc_indices(data, BANDNAMES, indices, mask=mask)
+
+    assert result.shape == (data.shape[0], len(indices)) + data.shape[2:]
+    for ind, index in enumerate(indices):
+        expected = np.where(mask, ee_index(data, index), np.nan)
+        np.testing.assert_allclose(result[:, ind], expected, rtol=1e-5, atol=1e-6)
+
+
+def test_missing_band():
+    data = create_scenes(shape=(1, 5, 2, 2))
+
+    with pytest.raises(ValueError):
+        calc_index(data[:, :4], BANDNAMES[:4], 'NDWI')
+
+    with pytest.raises(ValueError):
+        calc_index(data, BANDNAMES, 'NDXI')
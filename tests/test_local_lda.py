@@ -0,0 +1,169 @@
+"""
+Tests of the closed form LDA calibration against the sklearn based calibration it replaced
+"""
+
+import ast
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from gee_functions.local.lda import calibrate_lda, migrate_thresholds, optimize_threshold
+
+sklearn_lda = pytest.importorskip('sklearn.discriminant_analysis')
+
+NO_OF_SAMPLES = 3000
+NO_OF_BANDS = 6
+NO_OF_CLASSES = 5
+
+
+def create_samples(seed=0):
+    rng = np.random.default_rng(seed)
+    labels = rng.integers(0, NO_OF_CLASSES, NO_OF_SAMPLES)
+    class_means = rng.normal(0, 2, (NO_OF_CLASSES, NO_OF_BANDS))
+    mixing = rng.normal(0, 1, (NO_OF_BANDS, NO_OF_BANDS))
+    X = class_means[labels] + rng.normal(0, 1, (NO_OF_SAMPLES, NO_OF_BANDS)) @ mixing
+
+    return X, labels
+
+
+def get_lda_params_sklearn(X, y, flip=False):
+    """
+    The sklearn based calibration as it was implemented in lda.get_lda_params. The sign of the discriminant follows
+    from the SVD and is arbitrary, flip emulates an SVD returning the opposite sign.
+    """
+    lda = sklearn_lda.LinearDiscriminantAnalysis(n_components=1, store_covariance=True)
+    sign = -1 if flip else 1
+    LDA_fit = sign * lda.fit_transform(X, y)[:, 0]
+    greater_than = not np.mean(LDA_fit[y == 0]) > np.mean(LDA_fit[y == 1])
+
+    return sign * lda.scalings_[:, 0], LDA_fit, greater_than
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('flip', [False, True])
+def test_calibration_matches_sklearn(seed, flip):
+    X, labels = create_samples(seed)
+    classes, discriminants = calibrate_lda(X, labels)
+
+    for ind, class_value in enumerate(classes):
+        y = (labels == class_value).astype(int)
+        sklearn_coefficients, sklearn_scores, greater_than = get_lda_params_sklearn(X, y, flip)
+        scores = X @ discriminants['coefficients'][ind] + discriminants['intercepts'][ind]
+
+        # the sklearn discriminant is equal up to its sign, which is positive when the target class scores higher
+        sign = 1 if greater_than else -1
+        np.testing.assert_allclose(sign * sklearn_coefficients, discriminants['coefficients'][ind], rtol=1e-6)
+        np.testing.assert_allclose(sign * sklearn_scores, scores, atol=1e-8)
+
+        # the target class always has the higher scores
+        assert scores[y == 1].mean() > scores[y == 0].mean()
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+@pytest.mark.parametrize('flip', [False, True])
+def test_migrated_thresholds_select_same_samples(seed, flip):
+    X, labels = create_samples(seed)
+    classes, discriminants = calibrate_lda(X, labels)
+
+    for ind, class_value in enumerate(classes):
+        y = (labels == class_value).astype(int)
+        _, sklearn_scores, greater_than = get_lda_params_sklearn(X, y, flip)
+        scores = X @ discriminants['coefficients'][ind] + discriminants['intercepts'][ind]
+
+        # a threshold between two samples, so rounding differences of the scores do not change the selection
+        sorted_scores = np.sort(sklearn_scores)
+        middle = len(sorted_scores) // 3 if greater_than else 2 * len(sorted_scores) // 3
+        threshold = (sorted_scores[middle] + sorted_scores[middle + 1]) / 2
+
+        selected = sklearn_scores >= threshold if greater_than else sklearn_scores <= threshold
+        migrated = migrate_thresholds({'class': threshold}, {'class': greater_than})['class']
+
+        np.testing.assert_array_equal(scores >= migrated, selected)
+
+
+def load_default_thresholds(season):
+    """
+    The legacy and default thresholds of constants.py. Importing constants initializes the EE, so only the assignments
+    of the thresholds are executed.
+    """
+    names = {f'LEGACY_{season}_THRESHOLDS', f'LEGACY_{season}_GREATER_THAN', f'{season}_DEFAULT_THRESHOLDS'}
+    path = Path(__file__).parents[1] / 'gee_functions' / 'constants.py'
+
+    assignments = [node for node in ast.parse(path.read_text()).body
+                   if isinstance(node, ast.AnnAssign) and node.target.id in names]
+    namespace = {'Dict': dict, 'migrate_thresholds': migrate_thresholds}
+    exec(compile(ast.Module(body=assignments, type_ignores=[]), str(path), 'exec'), namespace)
+
+    return (namespace[f'LEGACY_{season}_THRESHOLDS'], namespace[f'LEGACY_{season}_GREATER_THAN'],
+            namespace[f'{season}_DEFAULT_THRESHOLDS'])
+
+
+@pytest.mark.parametrize('season', ['SUMMER', 'WINTER'])
+def test_default_thresholds_select_same_samples(season):
+    legacy_thresholds, legacy_greater_than, default_thresholds = load_default_thresholds(season)
+    X, labels = create_samples()
+    classes, discriminants = calibrate_lda(X, labels)
+
+    assert default_thresholds.keys() == legacy_thresholds.keys()
+
+    for ind, key in enumerate(legacy_thresholds):
+        # a sklearn calibration with the orientation the legacy threshold was chosen on
+        class_ind = ind % len(classes)
+        y = (labels == classes[class_ind]).astype(int)
+        _, sklearn_scores, greater_than = get_lda_params_sklearn(X, y)
+        if greater_than != legacy_greater_than[key]:
+            _, sklearn_scores, greater_than = get_lda_params_sklearn(X, y, flip=True)
+
+        threshold = legacy_thresholds[key]
+        selected = sklearn_scores >= threshold if greater_than else sklearn_scores <= threshold
+        scores = X @ discriminants['coefficients'][class_ind] + discriminants['intercepts'][class_ind]
+
+        np.testing.assert_array_equal(scores >= default_thresholds[key], selected)
+        assert 0 < selected.sum() < len(selected)
+
+
+def test_migrate_thresholds():
+    thresholds = {'summer_forest': 1.5, 'summer_shrub': .75}
+    greater_than = {'summer_forest': True, 'summer_shrub': False}
+
+    assert migrate_thresholds(thresholds, greater_than) == {'summer_forest': 1.5, 'summer_shrub': -.75}
+
+
+@pytest.mark.parametrize('greater_than', [True, False])
+def test_optimize_threshold_separable(greater_than):
+    sign = 1 if greater_than else -1
+    scores = sign * np.array([0., 1., 2., 3., 4., 5.])
+    is_target = np.array([False, False, False, True, True, True])
+
+    for objective in ['youden', 'f1', 'precision']:
+        result = optimize_threshold(scores, is_target, greater_than, objective)
+
+        assert result['threshold'] == sign * 2.5
+        assert result['precision'] == result['recall'] == 1
+
+
+def test_optimize_threshold_precision():
+    scores = np.array([0., 1., 2., 3., 4., 5., 6.])
+    is_target = np.array([False, True, False, True, False, True, True])
+
+    result = optimize_threshold(scores, is_target, objective='precision', target_precision=.75)
+
+    # the four highest scores contain three of the four targets
+    assert result['threshold'] == 2.5
+    assert result['precision'] == .75
+    assert result['recall'] == .75
+
+
+def test_optimize_threshold_unattainable_precision():
+    # the highest scores belong to the other classes, so the precision of every threshold stays below the target
+    scores = np.array([0., 1., 2., 3., 4., 5.])
+    is_target = np.array([True, False, True, False, False, False])
+
+    result = optimize_threshold(scores, is_target, objective='precision', target_precision=.95)
+
+    assert result['threshold'] is None
+    assert result['objective'] is None
+    assert result['recall'] is None
+    assert result['precision'] == pytest.approx(2 / 6)
@@ -0,0 +1,83 @@
+"""
+Tests of the outlier removal from sample tables against the pandas quantiles and the in memory mask
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gee_functions.local.outliers import (
+    calc_outlier_bounds,
+    calc_outlier_mask,
+    calc_outlier_mask_chunked,
+    calc_quantiles,
+)
+
+QUANTILES = (0, .05, .25, .5, .95, 1)
+
+
+def create_samples(no_of_samples=1000, no_of_bands=4, missing=.05, seed=0):
+    """Heavy tailed samples (rows, bands), so that outliers occur, with a fraction of the values missing"""
+    rng = np.random.default_rng(seed)
+    values = rng.standard_t(3, (no_of_samples, no_of_bands)).astype(np.float32)
+    values[rng.random(values.shape) < missing] = np.nan
+
+    return values
+
+
+@pytest.mark.parametrize('no_of_samples', [1, 2, 7, 1000])
+def test_quantiles(no_of_samples):
+    values = create_samples(no_of_samples)[:, 0]
+    values[0] = np.nan
+
+    result = calc_quantiles(values, QUANTILES)
+
+    if no_of_samples == 1:
+        assert np.isnan(result).all()
+    else:
+        np.testing.assert_allclose(result, pd.Series(values).quantile(QUANTILES), rtol=1e-6)
+        np.testing.assert_allclose(result, np.nanquantile(values.astype(np.float64), QUANTILES), rtol=1e-6)
+
+
+def test_outlier_mask_matches_pandas():
+    values = create_samples()
+    df = pd.DataFrame(values)
+
+    q1, q3 = df.quantile(.05), df.quantile(.95)
+    iqr = q3 - q1
+    expected = ~((df < (q1 - 1.5 * iqr)) | (df > (q3 + 1.5 * iqr))).any(axis=1)
+
+    keep = calc_outlier_mask(values)
+
+    np.testing.assert_array_equal(keep, expected)
+    # outliers occur, so the comparison is not trivial
+    assert 0 < (~keep).sum() < len(keep) * .1
+
+
+@pytest.mark.parametrize('chunk_rows', [7, 100, 5000])
+def test_chunked_mask_matches_mask(tmp_path, chunk_rows):
+    values = create_samples(no_of_samples=2000)
+    np.save(tmp_path / 'samples.npy', values)
+
+    # the sample covers every row, so the limits are the same as from all values
+    keep = calc_outlier_mask_chunked(np.load(tmp_path / 'samples.npy', mmap_mode='r'), chunk_rows=chunk_rows,
+                                     sample_size=len(values))
+
+    np.testing.assert_array_equal(keep, calc_outlier_mask(values))
+    np.testing.assert_array_equal(keep, calc_outlier_mask(values, bounds=calc_outlier_bounds(values)))
+
+
+def test_chunked_mask_sample():
+    values = create_samples(no_of_samples=20000)
+
+    keep = calc_outlier_mask_chunked(values, chunk_rows=3000, sample_size=5000)
+
+    # the limits are estimated from a sample, so only a few samples near the limits may differ
+    assert (keep != calc_outlier_mask(values)).mean() < .005
+
+
+def test_chunked_mask_without_samples():
+    keep = calc_outlier_mask_chunked(np.empty((0, 3), dtype=np.float32))
+
+    assert keep.shape == (0,)
+    assert keep.dtype == bool
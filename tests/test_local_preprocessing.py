@@ -0,0 +1,142 @@
+"""
+Tests of the local masking and scaling of Landsat and Sentinel-2 scenes, using the synthetic QA generators
+"""
+
+import numpy as np
+import pytest
+
+from gee_functions.local.preprocessing import (
+    calc_landsat_mask,
+    cloud_mask_ls457,
+    cloud_mask_ls8,
+    cloud_mask_s2,
+    create_synthetic_landsat_qa,
+    create_synthetic_s2_qa,
+    get_landsat_scale_factors,
+    iter_landsat_chunks,
+    iter_s2_chunks,
+    scale_scene,
+)
+
+LANDSAT_BANDS = ['SR_B2', 'SR_B3', 'SR_B4', 'SR_B5', 'SR_B6', 'SR_B7', 'ST_B10']
+
+
+def create_digital_numbers(shape, seed=0):
+    return np.random.default_rng(seed).integers(7273, 43636, shape, dtype=np.uint16)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_landsat_mask_synthetic(seed):
+    qa_pixel, qa_radsat, expected = create_synthetic_landsat_qa((4, 60, 70), seed=seed)
+
+    np.testing.assert_array_equal(calc_landsat_mask(qa_pixel, qa_radsat), expected)
+    # all masked conditions occur, so the comparison is not trivial
+    assert 0 < expected.mean() < 1
+
+
+@pytest.mark.parametrize('bit, valid', [
+    (0, False),  # fill
+    (1, False),  # dilated cloud
+    (2, False),  # cirrus
+    (3, False),  # cloud
+    (4, False),  # cloud shadow
+    (5, True),  # snow
+    (6, True),  # clear
+    (7, True),  # water
+    (8, True),  # cloud confidence
+    (14, True),  # cirrus confidence
+])
+def test_landsat_mask_bits(bit, valid):
+    qa_pixel = np.array([1 << bit, 0], dtype=np.uint16)
+
+    np.testing.assert_array_equal(calc_landsat_mask(qa_pixel), [valid, True])
+
+
+def test_landsat_mask_saturation():
+    qa_pixel = np.zeros(3, dtype=np.uint16)
+    qa_radsat = np.array([0, 1, 1 << 6], dtype=np.uint16)
+
+    np.testing.assert_array_equal(calc_landsat_mask(qa_pixel, qa_radsat), [True, False, False])
+
+
+def test_collection_1_masks():
+    # clear, cloud of low confidence, cloud of high confidence, cloud shadow, the value 96
+    pixel_qa = np.array([66, 1 << 5, (1 << 5) | (1 << 7), 1 << 3, 96], dtype=np.uint16)
+
+    np.testing.assert_array_equal(cloud_mask_ls457(pixel_qa), [True, True, False, False, False])
+    np.testing.assert_array_equal(cloud_mask_ls8(pixel_qa), [True, False, False, False, False])
+
+
+def test_landsat_scale_factors():
+    scale, offset = get_landsat_scale_factors(['SR_B2', 'ST_B10'])
+
+    np.testing.assert_allclose(scale, [2.75e-05, 0.00341802])
+    np.testing.assert_allclose(offset, [-0.2, 149.0])
+
+    with pytest.raises(ValueError):
+        get_landsat_scale_factors(['QA_PIXEL'])
+
+
+def test_scale_landsat_scene():
+    data = np.array([[[10000, 20000]], [[30000, 40000]]], dtype=np.uint16)
+    scale, offset = get_landsat_scale_factors(['SR_B4', 'ST_B10'])
+    mask = np.array([[True, False]])
+
+    scaled = scale_scene(data, scale, offset, mask)
+
+    assert scaled.dtype == np.float32
+    np.testing.assert_allclose(scaled[:, 0, 0], [10000 * 2.75e-05 - 0.2, 30000 * 0.00341802 + 149.0], rtol=1e-6)
+    assert np.isnan(scaled[:, 0, 1]).all()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 8])
+def test_iter_landsat_chunks(chunk_size):
+    shape = (7, 30, 40)
+    qa_pixel, qa_radsat, expected = create_synthetic_landsat_qa(shape, seed=2)
+    data = create_digital_numbers((shape[0], len(LANDSAT_BANDS)) + shape[1:])
+
+    scenes = ((data[ind], qa_pixel[ind], qa_radsat[ind]) for ind in range(shape[0]))
+    chunks = list(iter_landsat_chunks(scenes, LANDSAT_BANDS, chunk_size))
+
+    assert [len(chunk) for chunk, _ in chunks] == [min(chunk_size, shape[0] - start)
+                                                   for start in range(0, shape[0], chunk_size)]
+
+    values = np.concatenate([chunk for chunk, _ in chunks])
+    mask = np.concatenate([chunk_mask for _, chunk_mask in chunks])
+    np.testing.assert_array_equal(mask, expected)
+
+    scale, offset = get_landsat_scale_factors(LANDSAT_BANDS)
+    reference = data * scale.astype(np.float64)[:, None, None] + offset.astype(np.float64)[:, None, None]
+    reference[~np.broadcast_to(expected[:, None], reference.shape)] = np.nan
+
+    np.testing.assert_allclose(values, reference, rtol=1e-6, atol=1e-5)
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_s2_mask_synthetic(seed):
+    qa60, expected = create_synthetic_s2_qa((4, 60, 70), seed=seed)
+
+    np.testing.assert_array_equal(cloud_mask_s2(qa60), expected)
+    assert 0 < expected.mean() < 1
+
+
+def test_s2_mask_bits():
+    # opaque clouds (10) and cirrus (11) are masked, the other bits are not used
+    qa60 = np.array([0, 1 << 10, 1 << 11, (1 << 10) | (1 << 11), 1 << 9, 1 << 12], dtype=np.uint16)
+
+    np.testing.assert_array_equal(cloud_mask_s2(qa60), [True, False, False, False, True, True])
+
+
+def test_iter_s2_chunks():
+    shape = (5, 30, 40)
+    qa60, expected = create_synthetic_s2_qa(shape, seed=3)
+    data = np.random.default_rng(3).integers(0, 10000, (shape[0], 4) + shape[1:], dtype=np.uint16)
+
+    chunks = list(iter_s2_chunks(((data[ind], qa60[ind]) for ind in range(shape[0])), chunk_size=2))
+
+    values = np.concatenate([chunk for chunk, _ in chunks])
+    mask = np.concatenate([chunk_mask for _, chunk_mask in chunks])
+    np.testing.assert_array_equal(mask, expected)
+
+    reference = np.where(expected[:, None], data * 0.0001, np.nan)
+    np.testing.assert_allclose(values, reference, rtol=1e-6)
@@ -0,0 +1,108 @@
+"""
+Tests of the sample store against the pandas based selection of the calibration samples it replaced
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from gee_functions.local.samples import SampleStore, load_sample_store
+
+BANDNAMES = ['B1', 'B2', 'B3']
+LC_CLASSES = {1: 'forest', 2: 'forest', 3: 'shrub', 4: 'irrigated_crops'}
+
+
+def create_sample_file(path, seed=0, no_of_samples=2000):
+    rng = np.random.default_rng(seed)
+    lc = rng.integers(1, 5, no_of_samples)
+
+    df = pd.DataFrame(rng.standard_t(3, (no_of_samples, len(BANDNAMES))).astype(np.float32), columns=BANDNAMES)
+    df['B1'] += lc
+    df.loc[rng.random(no_of_samples) < .05, 'B2'] = np.nan
+    df['lc'] = lc
+    df['class'] = [LC_CLASSES[value] for value in lc]
+    df['year'] = 2009
+
+    df.to_csv(path, index=False)
+
+    return df
+
+
+def get_data_pandas(df, bandnames, target_class, n_other):
+    """The selection of lda.get_data before the SampleStore, including its comparison of lc with the class name"""
+    df = df.copy()
+    df['lc_bin'] = (df['class'] == target_class).astype(int)
+    df = df[bandnames + ['lc', 'lc_bin', 'class']].dropna()
+
+    q1 = df[bandnames].quantile(.05)
+    q3 = df[bandnames].quantile(.95)
+    iqr = q3 - q1
+    df = df[~((df[bandnames] < (q1 - 1.5 * iqr)) | (df[bandnames] > (q3 + 1.5 * iqr))).any(axis=1)]
+
+    df_target = df[(df['class'] == target_class)]
+    df_other = df[~(df['lc'] == target_class)].groupby('lc').sample(n=n_other, random_state=1)
+    df = pd.concat([df_target, df_other])
+
+    return df[bandnames], df[['lc', 'lc_bin', 'class']]
+
+
+@pytest.mark.parametrize('target_class', ['forest', 'shrub'])
+def test_get_data_matches_pandas(tmp_path, target_class):
+    df = create_sample_file(tmp_path / 'samples.csv')
+
+    X, y = SampleStore(tmp_path / 'samples.csv').get_data(BANDNAMES, target_class, n_other=200)
+    X_pandas, y_pandas = get_data_pandas(df, BANDNAMES, target_class, 200)
+
+    np.testing.assert_array_equal(X.index, X_pandas.index)
+    np.testing.assert_allclose(X.to_numpy(), X_pandas.to_numpy(), rtol=1e-6)
+    np.testing.assert_array_equal(y['lc_bin'], y_pandas['lc_bin'])
+    np.testing.assert_array_equal(y['lc'], y_pandas['lc'])
+
+    # the land cover values of the target class are sampled as well
+    assert y['lc_bin'].sum() == (y['class'] == target_class).sum() > (df['class'] == target_class).sum() * .8
+
+
+def test_get_data_all_samples(tmp_path):
+    create_sample_file(tmp_path / 'samples.csv')
+    sample_store = SampleStore(tmp_path / 'samples.csv')
+
+    X, y = sample_store.get_data(['B1', 'B4'], 'shrub', subsample_other=False)
+
+    # bands that are not in the samples are ignored
+    assert list(X.columns) == ['B1']
+    pd.testing.assert_frame_equal(X, sample_store.get_filtered(['B1']))
+    np.testing.assert_array_equal(y['lc_bin'], y['class'] == 'shrub')
+
+
+def test_filtered_samples_are_not_modified(tmp_path):
+    create_sample_file(tmp_path / 'samples.csv')
+    sample_store = SampleStore(tmp_path / 'samples.csv')
+    expected = sample_store.get_filtered(BANDNAMES).to_numpy().copy()
+
+    X = sample_store.get_filtered(BANDNAMES)
+    with pytest.raises(ValueError):
+        X.to_numpy()[0, 0] = 100
+    X['B1'] *= 2
+    X.drop(index=X.index[:10], inplace=True)
+
+    np.testing.assert_array_equal(sample_store.get_filtered(BANDNAMES).to_numpy(), expected)
+
+
+def test_sample_store_is_reloaded(tmp_path):
+    path = tmp_path / 'samples.csv'
+    create_sample_file(path)
+    sample_store = load_sample_store(tmp_path / 'samples')
+
+    assert load_sample_store(tmp_path / 'samples') is sample_store
+
+    df = create_sample_file(path, seed=1, no_of_samples=500)
+    # the modification time may not change within the resolution of the file system
+    modified = path.stat().st_mtime + 10
+    os.utime(path, (modified, modified))
+
+    reloaded = load_sample_store(tmp_path / 'samples')
+
+    assert reloaded is not sample_store
+    assert len(reloaded.lc) == len(df)
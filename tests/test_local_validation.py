@@ -0,0 +1,118 @@
+"""
+Tests of the local validation of irrigated area maps against a per polygon reference, like the reduceRegion per polygon
+of validation.calc_validation_score
+"""
+
+import numpy as np
+import pytest
+
+gpd = pytest.importorskip('geopandas')
+rasterio = pytest.importorskip('rasterio')
+
+from rasterio import features
+from shapely.geometry import box
+
+from gee_functions.local.validation import (
+    assign_polygon_layers,
+    calc_validation_scores,
+    rasterize_polygons,
+    validate_irrigated_area,
+)
+
+CRS = 'EPSG:32630'
+# 30 m pixels, the upper left corner of the grid is at (600000, 4200000)
+TRANSFORM = rasterio.transform.from_origin(600000, 4200000, 30, 30)
+SHAPE = (40, 50)
+
+
+def create_polygons(*bounds):
+    """Boxes given by their pixel bounds (col_min, row_min, col_max, row_max) on the grid"""
+    return gpd.GeoDataFrame(
+        geometry=[box(*TRANSFORM * (col_min, row_max), *TRANSFORM * (col_max, row_min))
+                  for col_min, row_min, col_max, row_max in bounds],
+        crs=CRS,
+    )
+
+
+def calc_reference_scores(binary, polygons, valid):
+    """The pixel counts of every polygon rasterized on its own"""
+    total_pixels, irrigated_pixels = [], []
+
+    for geometry in polygons.geometry:
+        inside = features.rasterize([(geometry, 1)], out_shape=binary.shape, transform=TRANSFORM).astype(bool) & valid
+        total_pixels.append(inside.sum())
+        irrigated_pixels.append(binary[inside].sum())
+
+    total_pixels, irrigated_pixels = np.array(total_pixels), np.array(irrigated_pixels, dtype=np.float64)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return total_pixels, irrigated_pixels, np.minimum(irrigated_pixels / total_pixels, 1)
+
+
+def write_map(path, irrigated_area, nodata=255):
+    with rasterio.open(path, 'w', driver='GTiff', height=SHAPE[0], width=SHAPE[1], count=1, dtype='uint8', crs=CRS,
+                       transform=TRANSFORM, nodata=nodata) as dst:
+        dst.write(irrigated_area, 1)
+
+
+def test_overlapping_polygons_are_rasterized_separately():
+    # the second and third polygon overlap the first, the fourth only shares a border with the first
+    polygons = create_polygons((2, 2, 12, 12), (8, 8, 20, 20), (5, 5, 7, 7), (12, 2, 16, 6))
+
+    layers = assign_polygon_layers(polygons)
+    polygon_ids = rasterize_polygons(polygons, TRANSFORM, SHAPE)
+
+    np.testing.assert_array_equal(layers, [0, 1, 1, 0])
+    assert polygon_ids.shape == (2,) + SHAPE
+
+    binary = np.random.default_rng(0).integers(0, 2, SHAPE)
+    valid = np.ones(SHAPE, dtype=bool)
+
+    for result, expected in zip(calc_validation_scores(binary, polygon_ids, len(polygons)),
+                                calc_reference_scores(binary, polygons, valid)):
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_rasterize_without_polygons():
+    polygon_ids = rasterize_polygons(create_polygons(), TRANSFORM, SHAPE)
+
+    assert polygon_ids.shape == (1,) + SHAPE
+    assert not polygon_ids.any()
+
+    total_pixels, irrigated_pixels, scores = calc_validation_scores(np.ones(SHAPE), polygon_ids, 0)
+
+    assert len(total_pixels) == len(irrigated_pixels) == len(scores) == 0
+
+
+def test_validate_irrigated_area(tmp_path):
+    rng = np.random.default_rng(1)
+    irrigated_area = rng.integers(0, 4, SHAPE).astype(np.uint8)
+    irrigated_area[rng.random(SHAPE) < .1] = 255
+    write_map(tmp_path / 'ia.tif', irrigated_area)
+
+    # overlapping polygons, a polygon partially outside of the map and a polygon outside of the map
+    polygons = create_polygons((2, 2, 12, 12), (8, 8, 20, 20), (45, 30, 60, 45), (60, 0, 70, 10))
+
+    score, scored = validate_irrigated_area(str(tmp_path / 'ia.tif'), polygons, ia_classes=[1, 2])
+
+    valid = irrigated_area != 255
+    binary = np.isin(irrigated_area, [1, 2]).astype(np.uint8)
+    total_pixels, irrigated_pixels, scores = calc_reference_scores(binary, polygons.iloc[:3], valid)
+
+    assert len(scored) == 3
+    np.testing.assert_array_equal(scored['total_pixels'], total_pixels)
+    np.testing.assert_array_equal(scored['irrigated_pixels'], irrigated_pixels)
+    np.testing.assert_allclose(scored['score'], np.round(irrigated_pixels) / total_pixels)
+    assert score == pytest.approx(np.mean(scores))
+
+
+@pytest.mark.parametrize('bounds', [[], [(60, 0, 70, 10)], [(50, 0, 60, 10)]])
+def test_validate_without_polygons_on_the_map(tmp_path, bounds):
+    write_map(tmp_path / 'ia.tif', np.ones(SHAPE, dtype=np.uint8))
+
+    # no polygons, a polygon outside of the map and a polygon only touching the border of the map
+    score, scored = validate_irrigated_area(str(tmp_path / 'ia.tif'), create_polygons(*bounds), ia_classes=[1])
+
+    assert np.isnan(score)
+    assert len(scored) == 0
+    assert {'total_pixels', 'irrigated_pixels', 'score'} <= set(scored.columns)